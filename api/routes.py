@@ -1,13 +1,156 @@
-from fastapi import APIRouter, UploadFile, HTTPException, BackgroundTasks, Query
-from fastapi.responses import JSONResponse
-from services.storage import upload_image
-from services.task_handler import submit_pipeline
+from fastapi import APIRouter, UploadFile, HTTPException, BackgroundTasks, Query, File, Form, Body
+from fastapi.responses import JSONResponse, StreamingResponse
+from services.storage import upload_stream, UploadTooLarge
+from services.pipeline import submit_pipeline, submit_batch
+from services.result_status import fetch_states, batch_task_ids, watch_states, supports_streaming
+from utils.config import (
+    API_IO_CONCURRENCY,
+    INLINE_MAX_SIZE,
+    MAX_UPLOAD_SIZE,
+    MAX_BATCH_ITEMS,
+    MAX_TOP_K,
+    MODELS,
+    PIPELINE_TRANSPORT,
+    STATUS_STREAM_TIMEOUT,
+    STATUS_STREAM_HEARTBEAT,
+    TASK_STATUS_MAX_WAIT,
+)
 from utils.logger import logger
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from functools import partial
+from typing import BinaryIO, List, Optional
+import asyncio
+import tarfile
+import threading
+import zipfile
 import uuid
 import json
 
 router = APIRouter()
 
+# Bounded pool for blocking MinIO/Celery calls so they never run on the event loop
+_io_executor = ThreadPoolExecutor(max_workers=API_IO_CONCURRENCY, thread_name_prefix="api-io")
+
+async def run_io(fn, *args, **kwargs):
+    """
+    Runs a blocking call in the API I/O pool and awaits its result.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, partial(fn, *args, **kwargs))
+
+IMAGE_EXTENSIONS = ("jpg", "jpeg", "png")
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz")
+
+def image_content_type(filename: str) -> Optional[str]:
+    """
+    Returns the content type for a supported image filename, else None.
+    """
+    ext = filename.rsplit(".", 1)[-1].lower()
+    if ext not in IMAGE_EXTENSIONS:
+        return None
+    return f"image/{'jpeg' if ext == 'jpg' else ext}"
+
+def _store_image(stream: BinaryIO, filename: str, metadata: dict) -> dict:
+    """
+    Streams one image to MinIO and returns its pipeline metadata.
+    """
+    content_type = image_content_type(filename)
+    if content_type is None:
+        raise ValueError("Unsupported file type")
+    object_name = f"{uuid.uuid4()}.{filename.rsplit('.', 1)[-1].lower()}"
+    stored = upload_stream(stream, object_name, content_type=content_type)
+    return dict(
+        metadata,
+        filename=filename,
+        object_name=object_name,
+        url=stored.url,
+        content_hash=stored.sha256,
+    )
+
+class _BatchSlots:
+    """
+    Images a batch may still accept, shared by archives extracted in parallel.
+    """
+
+    def __init__(self, count: int):
+        self._count = count
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self._count <= 0:
+                return False
+            self._count -= 1
+            return True
+
+def _store_archive(stream: BinaryIO, archive_name: str, metadata: dict, slots: _BatchSlots) -> List[dict]:
+    """
+    Streams every image member of a zip or tar archive to MinIO, one after
+    another, taking a batch slot per member. Returns one entry per member:
+    its metadata or an "error". Extraction stops once the batch is full.
+    """
+    entries = []
+
+    def store_member(name, open_member) -> bool:
+        if image_content_type(name) is None:
+            return True
+        if not slots.take():
+            entries.append({"filename": name, "error": f"Batch exceeds {MAX_BATCH_ITEMS} images"})
+            return False
+        try:
+            with open_member() as member:
+                entries.append(_store_image(member, name, dict(metadata, archive=archive_name)))
+        except Exception as e:
+            entries.append({"filename": name, "error": str(e)})
+        return True
+
+    if archive_name.lower().endswith(".zip"):
+        with zipfile.ZipFile(stream) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and not store_member(info.filename, partial(archive.open, info)):
+                    break
+    else:
+        with tarfile.open(fileobj=stream, mode="r:*") as archive:
+            for member in archive:
+                if member.isfile() and not store_member(member.name, partial(archive.extractfile, member)):
+                    break
+    return entries
+
+def _select_options(model: Optional[str], top_k: Optional[int], metadata: dict):
+    """
+    Validates the requested model and number of labels (query parameters,
+    else metadata["model"] / metadata["top_k"]) and records them in the
+    metadata; none given means MODEL_NAME and TOP_K.
+    """
+    model = model or metadata.get("model")
+    if model is not None:
+        if model not in MODELS:
+            logger.warning(f"Rejected unknown model {model!r}")
+            raise HTTPException(status_code=400, detail=f"Unknown model; available: {', '.join(MODELS)}")
+        metadata["model"] = model
+
+    top_k = top_k or metadata.get("top_k")
+    if top_k is not None:
+        if not isinstance(top_k, int) or isinstance(top_k, bool) or not 1 <= top_k <= MAX_TOP_K:
+            raise HTTPException(status_code=400, detail=f"top_k must be an integer from 1 to {MAX_TOP_K}")
+        metadata["top_k"] = top_k
+
+MODEL_QUERY = Query(
+    default=None,
+    title="Model",
+    description="torchvision model to classify with; one of MODELS (default MODEL_NAME)",
+    example="resnet50"
+)
+TOP_K_QUERY = Query(
+    default=None,
+    ge=1,
+    le=MAX_TOP_K,
+    title="Labels per image",
+    description="Number of top labels to return per image (default TOP_K)",
+    example=5
+)
+
 @router.post("/upload-image")
 async def upload_image_endpoint(
     file: UploadFile,
@@ -24,30 +167,25 @@ async def upload_image_endpoint(
         description="Optional JSON string containing metadata about the image",
         example='{"source": "user", "label": "test"}'
     ),
+    model: str = MODEL_QUERY,
+    top_k: int = TOP_K_QUERY,
 ):
     """
-    Accepts an image, uploads to MinIO, and triggers the Celery pipeline.
+    Accepts an image, streams it to MinIO, and triggers the Celery pipeline.
     """
-    contents = await file.read()
     if not file.filename:
         logger.error("Uploaded file has no filename")
         raise HTTPException(status_code=400, detail="Uploaded file has no filename")
     ext = file.filename.split(".")[-1].lower()
+    content_type = image_content_type(file.filename)
 
-    if ext not in ("jpg", "jpeg", "png"):
+    if content_type is None:
         logger.warning(f"Rejected file {file.filename} with unsupported type '{ext}'")
         raise HTTPException(status_code=400, detail="Unsupported file type")
 
-    # Generate unique object name for storage
-    object_name = f"{uuid.uuid4()}.{ext}"
-    content_type = f"image/{'jpeg' if ext == 'jpg' else ext}"
-
-    try:
-        image_url = upload_image(contents, object_name, content_type=content_type)
-        logger.info(f"Uploaded {file.filename} as {object_name} to {image_url}")
-    except Exception as e:
-        logger.exception("Image upload failed")
-        raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
+    if file.size is not None and file.size > MAX_UPLOAD_SIZE:
+        logger.warning(f"Rejected file {file.filename} of {file.size} bytes")
+        raise HTTPException(status_code=413, detail="Upload too large")
 
     # Prepare metadata for the pipeline
     try:
@@ -55,16 +193,39 @@ async def upload_image_endpoint(
     except json.JSONDecodeError:
         logger.error("Invalid metadata JSON")
         raise HTTPException(status_code=400, detail="Invalid metadata JSON")
+    _select_options(model, top_k, metadata_dict)
+
+    # Generate unique object name for storage
+    object_name = f"{uuid.uuid4()}.{ext}"
+
+    try:
+        await file.seek(0)
+        # Inline transport ships small uploads in the task message, kept while streaming
+        keep_bytes = INLINE_MAX_SIZE if PIPELINE_TRANSPORT != "claim_check" else 0
+        stored = await run_io(
+            upload_stream, file.file, object_name, content_type=content_type, keep_bytes=keep_bytes
+        )
+        logger.info(f"Uploaded {file.filename} as {object_name} to {stored.url}")
+    except UploadTooLarge:
+        logger.warning(f"Rejected file {file.filename}: exceeds {MAX_UPLOAD_SIZE} bytes")
+        raise HTTPException(status_code=413, detail="Upload too large")
+    except Exception as e:
+        logger.exception("Image upload failed")
+        raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
 
     metadata_dict.update({
         "filename": file.filename,
         "object_name": object_name,
-        "url": image_url
+        "url": stored.url,
+        "content_hash": stored.sha256,
     })
 
+    # Without kept bytes (claim-check, or larger than INLINE_MAX_SIZE) workers read the object from MinIO
+    contents = stored.data
+
     # Trigger Celery pipeline
     logger.info(f"Received callback_url: {callback_url}")
-    async_result = submit_pipeline(contents, metadata_dict, callback_url)
+    async_result = await run_io(submit_pipeline, contents, metadata_dict, callback_url)
     if async_result is None or not hasattr(async_result, "id"):
         logger.error("Pipeline submission failed: async_result is None or missing 'id'")
         raise HTTPException(status_code=500, detail="Pipeline submission failed")
@@ -72,22 +233,211 @@ async def upload_image_endpoint(
 
     return JSONResponse({"task_id": async_result.id})
 
-@router.get("/task-status/{task_id}")
-def task_status(task_id: str):
+@router.post("/upload-batch")
+async def upload_batch_endpoint(
+    files: Optional[List[UploadFile]] = File(default=None),
+    object_keys: Optional[List[str]] = Form(default=None),
+    callback_url: str = Query(
+        default=None,
+        title="Callback Webhook URL",
+        description="Optional webhook URL notified once per image on completion",
+        example="https://webhook.site/test-url"
+    ),
+    metadata: str = Query(
+        default=None,
+        title="Batch Metadata (JSON)",
+        description="Optional JSON string merged into the metadata of every image",
+        example='{"source": "ingest-job"}'
+    ),
+    model: str = MODEL_QUERY,
+    top_k: int = TOP_K_QUERY,
+):
     """
-    Check Celery task status and get classification result.
+    Accepts many images (multipart files, zip/tar archives of images, or keys of
+    objects already in MinIO), uploads them in parallel and enqueues one Celery
+    group per chunk. Returns the batch id and a task id per accepted image.
     """
-    from services.celery_worker import celery_app
-    res = celery_app.AsyncResult(task_id)
+    try:
+        base_metadata = json.loads(metadata) if metadata else {}
+    except json.JSONDecodeError:
+        logger.error("Invalid metadata JSON")
+        raise HTTPException(status_code=400, detail="Invalid metadata JSON")
+    _select_options(model, top_k, base_metadata)
+
+    files = files or []
+    object_keys = object_keys or []
+    if not files and not object_keys:
+        raise HTTPException(status_code=400, detail="No files or object keys provided")
+    # Reject before uploading anything; archives count as one image here and
+    # share the slots left by the other items while they are extracted
+    if len(files) + len(object_keys) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_ITEMS} images")
+    archives = [(upload.filename or "").lower().endswith(ARCHIVE_SUFFIXES) for upload in files]
+    slots = _BatchSlots(MAX_BATCH_ITEMS - len(object_keys) - archives.count(False))
+
+    uploads = []
+    for upload, is_archive in zip(files, archives):
+        filename = upload.filename or ""
+        await upload.seek(0)
+        if is_archive:
+            uploads.append(run_io(_store_archive, upload.file, filename, base_metadata, slots))
+        else:
+            uploads.append(run_io(_store_image, upload.file, filename, base_metadata))
+    outcomes = await asyncio.gather(*uploads, return_exceptions=True)
+
+    items, errors = [], []
+    for upload, outcome in zip(files, outcomes):
+        if isinstance(outcome, Exception):
+            logger.warning(f"Batch upload of {upload.filename} failed: {outcome}")
+            errors.append({"filename": upload.filename, "error": str(outcome)})
+            continue
+        for entry in outcome if isinstance(outcome, list) else [outcome]:
+            (errors if "error" in entry else items).append(entry)
+
+    for key in object_keys:
+        if image_content_type(key) is None:
+            errors.append({"object_name": key, "error": "Unsupported file type"})
+        else:
+            items.append(dict(base_metadata, filename=key, object_name=key))
 
-    if res.state == "PENDING":
-        return {"state": res.state, "status": "Task is waiting in queue"}
-    elif res.state in ("FAILURE", "REVOKED"):
-        return {"state": res.state, "error": str(res.result)}
-    elif res.state == "SUCCESS":
+    if not items:
+        raise HTTPException(status_code=400, detail={"message": "No valid images in batch", "errors": errors})
+
+    try:
+        batch_id, task_ids = await run_io(submit_batch, items, callback_url)
+    except Exception as e:
+        logger.exception("Batch submission failed")
+        raise HTTPException(status_code=500, detail=f"Batch submission failed: {e}")
+    logger.info(f"Batch submitted: batch_id={batch_id} ({len(task_ids)} images, {len(errors)} rejected)")
+
+    return JSONResponse({
+        "batch_id": batch_id,
+        "tasks": [
+            {"filename": item["filename"], "object_name": item["object_name"], "task_id": task_id}
+            for item, task_id in zip(items, task_ids)
+        ],
+        "errors": errors,
+    })
+
+def _status_body(state: str, result) -> dict:
+    """
+    Renders a task state and result the way /task-status reports them.
+    """
+    if state == "PENDING":
+        return {"state": state, "status": "Task is waiting in queue"}
+    elif state in ("FAILURE", "REVOKED"):
+        return {"state": state, "error": str(result)}
+    elif state == "SUCCESS":
         return {
-            "state": res.state,
-            "result": res.result  # this should contain classification result
+            "state": state,
+            "result": result  # this should contain classification result
         }
     else:
-        return {"state": res.state, "status": "Task is running"}
+        return {"state": state, "status": "Task is running"}
+
+def _task_state(task_id: str) -> dict:
+    from services.celery_worker import celery_app
+    res = celery_app.AsyncResult(task_id)
+    return _status_body(res.state, res.result)
+
+@router.get("/task-status/{task_id}")
+async def task_status(
+    task_id: str,
+    wait: float = Query(
+        default=0,
+        ge=0,
+        description="Seconds to hold the request open until the task finishes (long poll); "
+                    "capped at TASK_STATUS_MAX_WAIT"
+    ),
+):
+    """
+    Check Celery task status and get classification result.
+    With `wait`, responds as soon as the task reaches a terminal state, or
+    with its current state once `wait` seconds (at most TASK_STATUS_MAX_WAIT) pass.
+    """
+    wait = min(wait, TASK_STATUS_MAX_WAIT)
+    if wait > 0 and supports_streaming():
+        async with aclosing(watch_states([task_id], timeout=wait)) as finished:
+            async for _, meta in finished:
+                return _status_body(meta["status"], meta["result"])
+    return await run_io(_task_state, task_id)
+
+@router.post("/task-status")
+async def task_status_bulk(task_ids: List[str] = Body(..., embed=True)):
+    """
+    Returns the status of many tasks, read from the result backend in one round trip.
+    """
+    if len(task_ids) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_ITEMS} task ids per request")
+    metas = await run_io(fetch_states, task_ids)
+    return {
+        "tasks": {task_id: _status_body(meta["status"], meta["result"]) for task_id, meta in metas.items()}
+    }
+
+async def _batch_ids_or_404(batch_id: str) -> List[str]:
+    task_ids = await run_io(batch_task_ids, batch_id)
+    if task_ids is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return task_ids
+
+@router.get("/batch-status/{batch_id}")
+async def batch_status(batch_id: str):
+    """
+    Returns per-task status and state counts for a batch from /upload-batch.
+    """
+    task_ids = await _batch_ids_or_404(batch_id)
+    metas = await run_io(fetch_states, task_ids)
+    counts: dict = {}
+    for meta in metas.values():
+        counts[meta["status"]] = counts.get(meta["status"], 0) + 1
+    return {
+        "batch_id": batch_id,
+        "total": len(task_ids),
+        "counts": counts,
+        "tasks": {task_id: _status_body(meta["status"], meta["result"]) for task_id, meta in metas.items()},
+    }
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _stream_states(task_ids: List[str]) -> StreamingResponse:
+    """
+    Server-sent events: one "task" event per completed task, then a "done"
+    event once all are finished or STATUS_STREAM_TIMEOUT expires.
+    """
+    if not supports_streaming():
+        raise HTTPException(status_code=501, detail="Status streaming requires the Redis result backend")
+
+    async def events():
+        completed = 0
+        async for task_id, meta in watch_states(
+            task_ids, timeout=STATUS_STREAM_TIMEOUT, heartbeat=STATUS_STREAM_HEARTBEAT
+        ):
+            if task_id is None:
+                yield ": keep-alive\n\n"
+                continue
+            completed += 1
+            yield _sse("task", dict(task_id=task_id, **_status_body(meta["status"], meta["result"])))
+        yield _sse("done", {"total": len(set(task_ids)), "completed": completed})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/task-events")
+async def task_events(task_ids: List[str] = Query(..., description="Task ids to follow")):
+    """
+    Streams completions of the given tasks as server-sent events.
+    """
+    if len(task_ids) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_ITEMS} task ids per request")
+    return _stream_states(task_ids)
+
+@router.get("/batch-status/{batch_id}/events")
+async def batch_events(batch_id: str):
+    """
+    Streams completions of a batch's tasks as server-sent events.
+    """
+    return _stream_states(await _batch_ids_or_404(batch_id))
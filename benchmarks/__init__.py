@@ -0,0 +1,9 @@
+"""
+Offline throughput/latency benchmarks for the pipeline stages. Broker, result
+backend, database and object storage are replaced by local stand-ins, so the
+suite runs without the docker-compose services.
+
+Usage:
+    python -m benchmarks run [--suites preprocess,classify,...] [--output results.json]
+    python -m benchmarks compare base.json new.json [--threshold 10]
+"""
@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+# Per-task INFO lines would be timed along with the tasks and bury the report
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from benchmarks.harness import (  # noqa: E402
+    DEFAULT_THRESHOLD,
+    compare,
+    environment,
+    format_comparison,
+    format_results,
+    parse_resolution,
+    synthetic_image,
+)
+
+DEFAULT_RESOLUTIONS = "320x240,640x480,1920x1080,3840x2160"
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def run(args) -> dict:
+    from benchmarks import standins
+    from benchmarks.suites import SUITES, BenchContext
+
+    names = list(SUITES) if args.suites == "all" else [s.strip() for s in args.suites.split(",") if s.strip()]
+    unknown = [name for name in names if name not in SUITES]
+    if unknown:
+        raise SystemExit(f"Unknown suites {', '.join(unknown)}; available: {', '.join(SUITES)}")
+
+    images = {}
+    for i, resolution in enumerate(args.resolutions.split(",")):
+        width, height = parse_resolution(resolution.strip())
+        images[f"{width}x{height}"] = synthetic_image(width, height, seed=i)
+
+    env = environment()
+    standins.use_broker(args.broker)
+    with tempfile.TemporaryDirectory(prefix="visionqueue-bench-") as workdir:
+        ctx = BenchContext(
+            images=images,
+            iterations=args.iterations,
+            warmup=args.warmup,
+            batch_size=args.batch_size,
+            database=standins.use_database(args.database, workdir),
+        )
+        results = {}
+        # Keep SUITES order whatever order they were asked for in
+        for name in (name for name in SUITES if name in names):
+            print(f"Running {name}...", file=sys.stderr)
+            results.update(SUITES[name](ctx))
+
+    return {
+        "environment": env,
+        "parameters": {
+            "suites": names,
+            "resolutions": list(images),
+            "image_bytes": {resolution: len(image) for resolution, image in images.items()},
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "batch_size": args.batch_size,
+            "broker": args.broker,
+            "database": ctx.database,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = commands.add_parser("run", help="Run the suites and write their results as JSON")
+    run_cmd.add_argument("--suites", default="all", help="Comma-separated suites, or all")
+    run_cmd.add_argument("--resolutions", default=DEFAULT_RESOLUTIONS, help="Comma-separated WIDTHxHEIGHT list")
+    run_cmd.add_argument("--iterations", type=int, default=50, help="Timed calls per benchmark")
+    run_cmd.add_argument("--warmup", type=int, default=5, help="Untimed calls before each benchmark")
+    run_cmd.add_argument("--batch-size", type=int, default=8, help="Images per batched classify call")
+    run_cmd.add_argument("--broker", default="memory", help="memory, or a broker URL such as redis://localhost:6379/0")
+    run_cmd.add_argument("--database", default="sqlite", choices=("sqlite", "postgres"))
+    run_cmd.add_argument("--output", help="Result file (default: benchmarks/results/<commit>.json)")
+
+    compare_cmd = commands.add_parser("compare", help="Compare two result files")
+    compare_cmd.add_argument("base")
+    compare_cmd.add_argument("new")
+    compare_cmd.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD,
+        help="Percent drop in images/sec (or rise in p95) reported as a regression",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = run(args)
+        output = args.output or os.path.join(RESULTS_DIR, f"{(report['environment']['commit'] or 'local')[:12]}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(format_results(report["results"]))
+        print(f"Wrote {output}")
+    else:
+        with open(args.base) as f:
+            base = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        rows = compare(base, new, args.threshold)
+        print(format_comparison(rows))
+        if any(row["regressed"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Timing, synthetic inputs and result files shared by the benchmark suites.
+"""
+
+import io
+import os
+import platform
+import subprocess
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Relative change (percent) beyond which `compare` reports a regression
+DEFAULT_THRESHOLD = 10.0
+
+
+def parse_resolution(value: str) -> Tuple[int, int]:
+    """
+    Parses "WIDTHxHEIGHT" into (width, height).
+    """
+    width, _, height = value.lower().partition("x")
+    try:
+        size = (int(width), int(height))
+    except ValueError:
+        raise ValueError(f"Resolution must look like 640x480, got {value!r}")
+    if min(size) < 1:
+        raise ValueError(f"Resolution must be positive, got {value!r}")
+    return size
+
+
+def synthetic_image(width: int, height: int, seed: int = 0, fmt: str = "JPEG") -> bytes:
+    """
+    Encodes a deterministic photo-like image: coarse random noise upscaled
+    bicubically, so it compresses like a photo rather than like flat colour
+    (too small) or per-pixel noise (too large).
+    """
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, size=(max(1, height // 8), max(1, width // 8), 3), dtype=np.uint8)
+    img = Image.fromarray(coarse).resize((width, height), Image.BICUBIC)
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, quality=90)
+    return buf.getvalue()
+
+
+def summarize(latencies: Sequence[float], items_per_call: int = 1) -> dict:
+    """
+    Turns per-call latencies (seconds) into throughput and percentiles (ms).
+    Calls run one after another, so images/sec is items over summed latency.
+    """
+    ms = np.asarray(latencies, dtype=np.float64) * 1000
+    total = float(ms.sum()) / 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "calls": len(ms),
+        "images": len(ms) * items_per_call,
+        "images_per_sec": round(len(ms) * items_per_call / total, 2) if total else 0.0,
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def time_calls(fn: Callable[[], object], iterations: int, warmup: int = 0, items_per_call: int = 1) -> dict:
+    """
+    Calls `fn` `warmup` times untimed, then `iterations` times timed.
+    """
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, items_per_call)
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        out = subprocess.run(["git", *args], capture_output=True, text=True, timeout=10, check=True)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip()
+
+
+def environment() -> dict:
+    """
+    Describes the commit, machine and settings a result file was produced with.
+    """
+    import torch
+    from utils import config
+
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch_threads": torch.get_num_threads(),
+        "settings": {
+            key: getattr(config, key)
+            for key in (
+                "MODEL_NAME", "INFERENCE_MODE", "MODEL_CACHE", "FAST_DECODE", "TOP_K",
+                "INFERENCE_BATCH_SIZE", "RESULT_BATCH_SIZE", "PIPELINE_MODE", "PIPELINE_TRANSPORT",
+            )
+        },
+    }
+
+
+def compare(base: dict, new: dict, threshold: float = DEFAULT_THRESHOLD) -> List[dict]:
+    """
+    Compares the benchmarks present in both result files. A benchmark
+    regressed if its images/sec fell or its p95 rose by more than `threshold` percent.
+    """
+    rows = []
+    for name, before in base["results"].items():
+        after = new["results"].get(name)
+        if after is None:
+            continue
+        throughput = _change(before["images_per_sec"], after["images_per_sec"])
+        p95 = _change(before["p95_ms"], after["p95_ms"])
+        rows.append({
+            "name": name,
+            "images_per_sec": (before["images_per_sec"], after["images_per_sec"], throughput),
+            "p50_ms": (before["p50_ms"], after["p50_ms"], _change(before["p50_ms"], after["p50_ms"])),
+            "p95_ms": (before["p95_ms"], after["p95_ms"], p95),
+            "regressed": throughput < -threshold or p95 > threshold,
+        })
+    return rows
+
+
+def _change(before: float, after: float) -> float:
+    return round((after - before) / before * 100, 1) if before else 0.0
+
+
+def format_results(results: Dict[str, dict]) -> str:
+    lines = [f"{'benchmark':<34} {'img/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+    for name, stats in results.items():
+        lines.append(
+            f"{name:<34} {stats['images_per_sec']:>9.1f} {stats['p50_ms']:>9.2f} "
+            f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+        )
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[dict]) -> str:
+    lines = [f"{'benchmark':<34} {'img/s':>22} {'p50 ms':>22} {'p95 ms':>22}"]
+    for row in rows:
+        cells = [
+            f"{before:.1f}->{after:.1f} ({change:+.1f}%)"
+            for before, after, change in (row["images_per_sec"], row["p50_ms"], row["p95_ms"])
+        ]
+        flag = "  REGRESSED" if row["regressed"] else ""
+        lines.append(f"{row['name']:<34} {cells[0]:>22} {cells[1]:>22} {cells[2]:>22}{flag}")
+    return "\n".join(lines)
@@ -0,0 +1,86 @@
+"""
+Local replacements for the external services, so the suites measure this
+code rather than the network: an in-memory (or any given) Celery broker, a
+SQLite (or the configured PostgreSQL) results database, and an object store
+that hashes uploads like services.storage but keeps nothing.
+"""
+
+import os
+from contextlib import contextmanager
+from typing import BinaryIO, Optional
+
+from sqlalchemy import create_engine
+
+from services import db
+from services.celery_worker import celery_app
+from services.storage import StoredObject, _HashingReader
+from utils.config import MAX_UPLOAD_SIZE, MINIO_PART_SIZE
+from utils.logger import logger
+
+# kombu's in-memory transport polls every second by default, which would dominate every chain
+MEMORY_POLL_INTERVAL = 0.001
+
+
+def use_broker(url: str = "memory"):
+    """
+    Points the Celery app at `url` ("memory" for the in-process transport
+    and result backend; e.g. redis://localhost:6379/0 for a local Redis).
+    Must run before the app first connects.
+    """
+    if url == "memory":
+        celery_app.conf.update(
+            broker_url="memory://",
+            result_backend="cache+memory://",
+            broker_transport_options={"polling_interval": MEMORY_POLL_INTERVAL},
+        )
+    else:
+        celery_app.conf.update(broker_url=url, result_backend=url)
+    logger.info(f"Benchmark broker: {celery_app.conf.broker_url}")
+
+
+def use_database(kind: str, workdir: str) -> str:
+    """
+    "sqlite" installs a file-backed SQLite engine under `workdir` as the
+    process engine; "postgres" keeps the engine configured by PG_*.
+    Creates the results table either way and returns a label for the results.
+    """
+    if kind == "sqlite":
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'results.db')}")
+        db._engine, db._engine_pid = engine, os.getpid()
+    elif kind != "postgres":
+        raise ValueError(f"Unknown database {kind!r}; use sqlite or postgres")
+    db.metadata.create_all(db.get_engine())
+    return db.get_engine().dialect.name
+
+
+@contextmanager
+def eager():
+    """
+    Runs every task of a submitted workflow inline in the calling thread.
+    """
+    conf = celery_app.conf
+    previous = conf.task_always_eager, conf.task_eager_propagates
+    conf.task_always_eager, conf.task_eager_propagates = True, True
+    try:
+        yield
+    finally:
+        conf.task_always_eager, conf.task_eager_propagates = previous
+
+
+def upload_stream(
+    stream: BinaryIO,
+    object_name: str,
+    content_type: str = "image/jpeg",
+    max_size: Optional[int] = MAX_UPLOAD_SIZE,
+    keep_bytes: int = 0,
+) -> StoredObject:
+    """
+    Drop-in for services.storage.upload_stream: reads and hashes the stream
+    in MinIO part-sized chunks, then discards it (unless it fits keep_bytes).
+    """
+    reader = _HashingReader(stream, max_size, keep_bytes)
+    while reader.read(MINIO_PART_SIZE):
+        pass
+    return StoredObject(
+        url=f"memory://{object_name}", size=reader.size, sha256=reader.hexdigest(), data=reader.kept()
+    )
@@ -0,0 +1,122 @@
+"""
+One function per benchmarked stage. Each takes the run's BenchContext and
+returns {benchmark name: stats}, with the input resolution in the name
+where the stage depends on it. Calls run one at a time, so images/sec is
+single-request throughput except for the batched classify.
+"""
+
+from typing import Callable, Dict, NamedTuple
+from unittest import mock
+
+from benchmarks import standins
+from benchmarks.harness import time_calls
+
+# Result payload the size of a default top-5 classification
+SAMPLE_CLASSIFICATION = [{"label": f"{i}, label", "probability": 0.2} for i in range(5)]
+
+
+class BenchContext(NamedTuple):
+    images: Dict[str, bytes]  # "WIDTHxHEIGHT" -> encoded JPEG
+    iterations: int
+    warmup: int
+    batch_size: int
+    database: str  # dialect the results table lives in
+
+
+def bench_preprocess(ctx: BenchContext) -> dict:
+    from core.classifier import preprocess_image
+
+    return {
+        f"preprocess_image/{resolution}": time_calls(lambda: preprocess_image(image), ctx.iterations, ctx.warmup)
+        for resolution, image in ctx.images.items()
+    }
+
+
+def bench_classify(ctx: BenchContext) -> dict:
+    from core.classifier import classify, classify_batch, preprocess_image
+
+    tensor = preprocess_image(next(iter(ctx.images.values())))
+    batch = [tensor] * ctx.batch_size
+    return {
+        "classify/batch=1": time_calls(lambda: classify(tensor), ctx.iterations, ctx.warmup),
+        f"classify_batch/batch={ctx.batch_size}": time_calls(
+            lambda: classify_batch(batch), ctx.iterations, ctx.warmup, items_per_call=ctx.batch_size
+        ),
+    }
+
+
+def bench_store_result(ctx: BenchContext) -> dict:
+    from services.task_handler import store_result
+
+    metadata = {"filename": "bench.jpg", "source": "benchmark"}
+    run = lambda: store_result.apply(args=(SAMPLE_CLASSIFICATION, metadata)).get()  # noqa: E731
+    return {f"store_result/{ctx.database}": time_calls(run, ctx.iterations, ctx.warmup)}
+
+
+def bench_pipeline_eager(ctx: BenchContext) -> dict:
+    """
+    The whole workflow (as PIPELINE_MODE/PIPELINE_TRANSPORT build it) run
+    inline: task overhead and stage cost without a broker round trip.
+    """
+    from services.pipeline import submit_pipeline
+    import services.task_handler  # noqa: F401  registers the tasks
+
+    results = {}
+    with standins.eager():
+        for resolution, image in ctx.images.items():
+            run = lambda: submit_pipeline(image, {"source": "benchmark"}).get()  # noqa: E731
+            results[f"pipeline_eager/{resolution}"] = time_calls(run, ctx.iterations, ctx.warmup)
+    return results
+
+
+def bench_pipeline_worker(ctx: BenchContext) -> dict:
+    """
+    The workflow submitted through the broker to a solo worker running in
+    this process, each result awaited before the next submission. Starting
+    the worker fires the worker signals, so its torch thread plan applies.
+    """
+    from celery.contrib.testing.worker import start_worker
+    from services.celery_worker import celery_app
+    from services.pipeline import submit_pipeline
+    import services.task_handler  # noqa: F401  registers the tasks
+
+    results = {}
+    with start_worker(celery_app, pool="solo", perform_ping_check=False, shutdown_timeout=30):
+        for resolution, image in ctx.images.items():
+            run = lambda: submit_pipeline(image, {"source": "benchmark"}).get(  # noqa: E731
+                timeout=60, interval=standins.MEMORY_POLL_INTERVAL
+            )
+            results[f"pipeline_worker/{resolution}"] = time_calls(run, ctx.iterations, ctx.warmup)
+    return results
+
+
+def bench_upload(ctx: BenchContext) -> dict:
+    """
+    POST /api/upload-image through the full app (middleware included) with
+    the stand-in object store; the pipeline is only enqueued, not run.
+    """
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+
+    def post(image: bytes):
+        response = client.post("/api/upload-image", files={"file": ("bench.jpg", image, "image/jpeg")})
+        response.raise_for_status()
+
+    results = {}
+    with mock.patch("api.routes.upload_stream", standins.upload_stream):
+        for resolution, image in ctx.images.items():
+            results[f"upload_image/{resolution}"] = time_calls(lambda: post(image), ctx.iterations, ctx.warmup)
+    return results
+
+
+# Run order: the API last, so the messages it enqueues are never consumed by the worker suite
+SUITES: Dict[str, Callable[[BenchContext], dict]] = {
+    "preprocess": bench_preprocess,
+    "classify": bench_classify,
+    "store_result": bench_store_result,
+    "pipeline_eager": bench_pipeline_eager,
+    "pipeline_worker": bench_pipeline_worker,
+    "upload": bench_upload,
+}
@@ -1,67 +1,218 @@
 """
-Encapsulates image preprocessing and classification logic.
+Encapsulates image preprocessing and classification logic. Imported only by
+workers; models load on first use (get_inference_model) into a per-process
+registry.
 """
 
-import io
-from PIL import Image
+import numpy as np
 import torch
 import torchvision.transforms as T
+from functools import partial
 from torchvision import models
-from utils.config import MODEL_NAME
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from utils.config import (
+    MODEL_NAME, INFERENCE_BATCH_SIZE, INFERENCE_BATCH_WAIT_MS, INFERENCE_MODE, MODEL_SHARING,
+    MAX_LOADED_MODELS, MODEL_MEMORY_BUDGET_MB, TOP_K,
+)
+from utils.batching import MicroBatcher
+from core.preprocessing import (
+    RESIZE_SIZE, CROP_SIZE, MEAN, STD, decode_image, resize_crop,
+    pack_tensor, unpack_tensor, to_model_input
+)
+from core.inference_modes import run_model
+from core.model_cache import load_model
+from core.shared_weights import load_shared
+from core.model_registry import ModelRegistry, resolve_model
 from loguru import logger
-import numpy as np
+
+def _weights_enum(model_name: str):
+    """
+    Returns the torchvision weights enum registered for a model (e.g.
+    ResNet18_Weights for resnet18), or None if it has none.
+    """
+    try:
+        return models.get_model_weights(model_name)
+    except ValueError:
+        return None
+
+def weights_name(model_name: str = MODEL_NAME):
+    """
+    Returns the name of the default torchvision weights for a model, or None.
+    """
+    weights_enum = _weights_enum(model_name)
+    return str(weights_enum.DEFAULT) if weights_enum else None
 
 # Load model once
-def get_model():
+def get_model(model_name: str = MODEL_NAME):
     try:
-        model_fn = getattr(models, MODEL_NAME)
-        weights_enum = getattr(models, f"{MODEL_NAME.upper()}_Weights", None)
-        logger.info(f"Loading model: {MODEL_NAME} with weights: {weights_enum}")
+        model_fn = getattr(models, model_name)
+        weights_enum = _weights_enum(model_name)
+        logger.info(f"Loading model: {model_name} with weights: {weights_enum}")
         weights = weights_enum.DEFAULT if weights_enum else None
         model = model_fn(weights=weights)
         model.eval()
         return model
     except AttributeError as e:
-        logger.error(f"Model {MODEL_NAME} not found or has no default weights in torchvision.models")
+        logger.error(f"Model {model_name} not found or has no default weights in torchvision.models")
         raise e
 
-MODEL = get_model()
+def get_model_skeleton(model_name: str = MODEL_NAME):
+    """
+    Builds a model on the meta device: the module structure without
+    allocating or initializing any weights.
+    """
+    with torch.device("meta"):
+        return getattr(models, model_name)(weights=None)
+
+def build_inference_model(sharing: str = MODEL_SHARING, model_name: str = MODEL_NAME):
+    """
+    Loads (model, active mode) for this process; with sharing="mmap" the
+    weights are memory-mapped instead of copied (core.shared_weights).
+    """
+    build_eager = partial(get_model, model_name)
+    if sharing == "mmap":
+        build_skeleton = partial(get_model_skeleton, model_name)
+        return load_shared(build_eager, build_skeleton, INFERENCE_MODE, weights_name(model_name), model_name)
+    return load_model(build_eager, INFERENCE_MODE, weights_name(model_name), model_name)
+
+def _load_model(model_name: str):
+    model, mode = build_inference_model(model_name=model_name)
+    logger.info(f"Inference mode for {model_name}: {mode}")
+    return model, mode
+
+# Models load on first use or at worker_process_init, never at import time
+REGISTRY = ModelRegistry(_load_model, MAX_LOADED_MODELS, MODEL_MEMORY_BUDGET_MB * 2**20)
+
+def get_inference_model(model_name: Optional[str] = None):
+    """
+    Returns (model, active mode) for a model in MODELS (default MODEL_NAME),
+    loading it on first call (or inheriting it from the worker parent with
+    MODEL_SHARING=fork). The mode is INFERENCE_MODE unless it had to fall back
+    to fp32; with MODEL_CACHE=torchscript the model may be the cached
+    compiled artifact.
+    """
+    return REGISTRY.get(resolve_model(model_name))
+
+def __getattr__(name):
+    # MODEL and ACTIVE_MODE remain module attributes for the default model, resolved lazily
+    if name == "MODEL":
+        return get_inference_model()[0]
+    if name == "ACTIVE_MODE":
+        return get_inference_model()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Per-image reference pipeline; preprocess_batch reproduces it vectorized
 TRANSFORM = T.Compose([
-    T.Resize(256),
-    T.CenterCrop(224),
+    T.Resize(RESIZE_SIZE),
+    T.CenterCrop(CROP_SIZE),
     T.ToTensor(),
-    T.Normalize(mean=[0.485, 0.456, 0.406],
-                std=[0.229, 0.224, 0.225])
+    T.Normalize(mean=list(MEAN), std=list(STD))
 ])
 
 # Load ImageNet class labels
 LABELS = []
 with open("imagenet_classes.txt", "r") as f:
     LABELS = [line.strip() for line in f.readlines()]
+# Indexed with a whole (N, k) array of top-k indices at once
+LABEL_ARRAY = np.array(LABELS, dtype=object)
 
 def preprocess_image(image_bytes: bytes) -> bytes:
     """
-    Transforms an image and returns serialized tensor as bytes.
+    Decodes, resizes and crops an image and returns it serialized as a
+    versioned uint8 (224, 224, 3) tensor; normalization happens in classify.
+    """
+    return pack_tensor(resize_crop(decode_image(image_bytes)))
+
+def _per_row(top_k: Union[int, Sequence[int]], rows: int) -> List[int]:
+    return [top_k] * rows if isinstance(top_k, int) else list(top_k)
+
+def classify_batch(
+    tensors: List[bytes],
+    model_name: Optional[str] = None,
+    top_k: Union[int, Sequence[int]] = TOP_K,
+) -> list:
+    """
+    Classifies several serialized tensors with one model, with one forward
+    pass per distinct tensor shape (normally a single pass). `top_k` is one
+    k for every tensor or a k per tensor.
+    Payloads that fail to deserialize are returned as exceptions in their slot.
     """
-    img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-    tensor = TRANSFORM(img)
-    if not isinstance(tensor, torch.Tensor):
-        tensor = T.ToTensor()(img)
-    tensor = tensor.unsqueeze(0)  # batch dim
-    return tensor.numpy().astype(np.float32).tobytes()
+    ks = _per_row(top_k, len(tensors))
+    results: list = [None] * len(tensors)
+    groups: dict = {}
+    for i, tensor_bytes in enumerate(tensors):
+        try:
+            array = unpack_tensor(tensor_bytes)
+            groups.setdefault((array.dtype, array.shape), []).append((i, array))
+        except Exception as e:
+            results[i] = e
 
-def classify(tensor_bytes: bytes):
+    for items in groups.values():
+        batch = to_model_input([array for _, array in items])
+        for (i, _), top in zip(items, predict(batch, model_name, [ks[i] for i, _ in items])):
+            results[i] = top
+    return results
+
+def postprocess(logits: torch.Tensor, top_k: Union[int, Sequence[int]] = TOP_K) -> list:
+    """
+    Turns (N, classes) logits into the top-k labels and probabilities of each
+    row: one softmax and one topk for the whole batch (at the largest k asked
+    for), one conversion to numpy, and label lookup by array indexing.
+    """
+    ks = _per_row(top_k, logits.shape[0])
+    k_max = min(max(ks, default=1), logits.shape[1])
+    top = torch.nn.functional.softmax(logits, dim=1).topk(k_max, dim=1)
+    labels = LABEL_ARRAY[top.indices.numpy()].tolist()
+    probabilities = top.values.numpy().tolist()
+    return [
+        [{"label": label, "probability": prob} for label, prob in zip(labels[row][:k], probabilities[row][:k])]
+        for row, k in enumerate(ks)
+    ]
+
+def predict(
+    batch: torch.Tensor,
+    model_name: Optional[str] = None,
+    top_k: Union[int, Sequence[int]] = TOP_K,
+) -> list:
+    """
+    Runs one forward pass over an (N, 3, 224, 224) tensor and returns the
+    top-k labels for each row.
+    """
+    model, mode = get_inference_model(model_name)
+    return postprocess(run_model(model, batch, mode), top_k)
+
+def classify(tensor_bytes: bytes, model_name: Optional[str] = None, top_k: int = TOP_K):
     """
     Deserializes tensor from bytes and performs classification.
     """
-    tensor = torch.frombuffer(tensor_bytes, dtype=torch.float32).reshape(1, 3, 224, 224)
-    with torch.no_grad():
-        outputs = MODEL(tensor)
-        probs = torch.nn.functional.softmax(outputs[0], dim=0)
-        top5 = probs.topk(5)
-        results = [
-            {"label": LABELS[idx], "probability": float(prob)}
-            for idx, prob in zip(top5.indices, top5.values)
-        ]
-        logger.debug(f"Top-5 results: {results}")
-        return results
+    results = classify_batch([tensor_bytes], model_name, top_k)[0]
+    if isinstance(results, Exception):
+        raise results
+    # Formatted by loguru only when DEBUG is enabled
+    logger.debug("Top-{} results: {}", top_k, results)
+    return results
+
+def _classify_requests(requests: List[Tuple[bytes, int]], model_name: str) -> list:
+    """
+    Batcher handler: classifies (tensor bytes, k) requests in one batch.
+    """
+    return classify_batch([tensor for tensor, _ in requests], model_name, [k for _, k in requests])
+
+# Lazily created so only processes that batch start a collector thread;
+# one batcher per model, since a forward pass runs a single model
+_batchers: Dict[str, MicroBatcher] = {}
+
+def get_batcher(model_name: Optional[str] = None) -> MicroBatcher:
+    """
+    Returns the process-wide inference batcher for a model; submit
+    (tensor bytes, k) requests.
+    """
+    model_name = resolve_model(model_name)
+    if model_name not in _batchers:
+        _batchers.setdefault(model_name, MicroBatcher(
+            partial(_classify_requests, model_name=model_name),
+            max_batch_size=INFERENCE_BATCH_SIZE,
+            max_wait_ms=INFERENCE_BATCH_WAIT_MS,
+            name="classify" if model_name == MODEL_NAME else f"classify_{model_name}",
+        ))
+    return _batchers[model_name]
@@ -0,0 +1,254 @@
+"""
+CPU inference modes for the classifier:
+
+- fp32: the torchvision model as loaded
+- channels_last: fp32 with weights and inputs in NHWC memory format
+- bf16: channels_last under bfloat16 autocast, on CPUs with native bf16
+- int8: FX graph-mode static post-training quantization, loaded from the
+  artifact written by the `calibrate` command
+
+Usage:
+    python -m core.inference_modes calibrate --images <folder> [--limit 512]
+    python -m core.inference_modes check --images <folder> [--modes channels_last bf16 int8]
+"""
+
+import argparse
+import contextlib
+import copy
+import json
+import os
+from typing import Callable, Dict, List, Tuple
+
+import torch
+
+from core.preprocessing import CROP_SIZE, preprocess_batch
+from utils.config import MODEL_NAME, MODEL_ARTIFACT_DIR, QUANTIZED_MODEL_PATH
+from utils.logger import logger
+
+INFERENCE_MODES = ("fp32", "channels_last", "bf16", "int8")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+CALIBRATION_BATCH_SIZE = 32
+
+
+def bf16_supported() -> bool:
+    """
+    True when oneDNN can run bfloat16 natively (AVX512-BF16/AMX); elsewhere
+    autocast would emulate it and run slower than fp32.
+    """
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def quantization_engine() -> str:
+    """
+    Returns the quantized kernel backend for this CPU: x86/fbgemm, else qnnpack (ARM).
+    """
+    engines = torch.backends.quantized.supported_engines
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in engines:
+            return engine
+    raise RuntimeError("No quantized engine available in this torch build")
+
+
+def quantize_static(model: torch.nn.Module, calibration_batches) -> torch.nn.Module:
+    """
+    Static post-training quantization of an fp32 eval-mode model: observers
+    are inserted with FX, fed the calibration batches, then folded into int8 ops.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    engine = quantization_engine()
+    torch.backends.quantized.engine = engine
+    example = torch.zeros(1, 3, CROP_SIZE, CROP_SIZE)
+    prepared = prepare_fx(model, get_default_qconfig_mapping(engine), (example,))
+    with torch.no_grad():
+        for batch in calibration_batches:
+            prepared(batch)
+    return convert_fx(prepared)
+
+
+def save_quantized(model: torch.nn.Module, path: str, images: int):
+    """
+    Saves a quantized model as TorchScript with the source model name and engine.
+    """
+    example = torch.zeros(1, 3, CROP_SIZE, CROP_SIZE)
+    with torch.no_grad():
+        scripted = torch.jit.trace(model, example)
+    meta = {
+        "model_name": MODEL_NAME,
+        "engine": torch.backends.quantized.engine,
+        "torch": torch.__version__,
+        "calibration_images": images,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    torch.jit.save(scripted, path, _extra_files={"meta.json": json.dumps(meta)})
+    logger.info(f"Saved int8 model to {path} ({meta})")
+
+
+def quantized_path(model_name: str = MODEL_NAME) -> str:
+    """
+    QUANTIZED_MODEL_PATH for MODEL_NAME, <MODEL_ARTIFACT_DIR>/<model>_int8.pt for other models.
+    """
+    if model_name == MODEL_NAME:
+        return QUANTIZED_MODEL_PATH
+    return os.path.join(MODEL_ARTIFACT_DIR, f"{model_name}_int8.pt")
+
+
+def load_quantized(path: str = QUANTIZED_MODEL_PATH, model_name: str = MODEL_NAME) -> torch.nn.Module:
+    """
+    Loads the int8 artifact, refusing one calibrated for a different model.
+    """
+    extra = {"meta.json": ""}
+    model = torch.jit.load(path, map_location="cpu", _extra_files=extra)
+    meta = json.loads(extra["meta.json"] or "{}")
+    if meta.get("model_name") != model_name:
+        raise ValueError(f"{path} was calibrated for {meta.get('model_name')!r}, not {model_name!r}")
+    torch.backends.quantized.engine = meta.get("engine", quantization_engine())
+    return model.eval()
+
+
+def build_prepared(
+    build_eager: Callable[[], torch.nn.Module], mode: str, model_name: str = MODEL_NAME
+) -> Tuple[torch.nn.Module, str]:
+    """
+    Returns the model for `mode` with the mode actually in effect: bf16 and
+    int8 fall back to fp32 when unavailable. The fp32 eval-mode model is only
+    built (and converted in place) when needed, i.e. not when int8 loads its
+    own artifact.
+    """
+    if mode not in INFERENCE_MODES:
+        raise ValueError(f"Unsupported INFERENCE_MODE: {mode}")
+    if mode == "bf16" and not bf16_supported():
+        logger.warning("bf16 is not supported natively on this CPU; using fp32")
+        mode = "fp32"
+    if mode == "int8":
+        path = quantized_path(model_name)
+        try:
+            return load_quantized(path, model_name), mode
+        except Exception as e:
+            logger.error(f"Could not load int8 model from {path}: {e}; using fp32")
+            mode = "fp32"
+    model = build_eager()
+    if mode in ("channels_last", "bf16"):
+        model = model.to(memory_format=torch.channels_last)
+    return model, mode
+
+
+def prepare_model(model: torch.nn.Module, mode: str, model_name: str = MODEL_NAME) -> Tuple[torch.nn.Module, str]:
+    """
+    Converts an already built fp32 eval-mode model (in place) for `mode`; see build_prepared.
+    """
+    return build_prepared(lambda: model, mode, model_name)
+
+
+def format_input(batch: torch.Tensor, mode: str) -> torch.Tensor:
+    """
+    Lays out an NCHW batch the way `mode` expects.
+    """
+    if mode in ("channels_last", "bf16"):
+        return batch.contiguous(memory_format=torch.channels_last)
+    return batch
+
+
+def autocast(mode: str):
+    """
+    Returns the autocast context for `mode` (a no-op except for bf16).
+    """
+    if mode == "bf16":
+        return torch.autocast("cpu", dtype=torch.bfloat16)
+    return contextlib.nullcontext()
+
+
+def run_model(model: torch.nn.Module, batch: torch.Tensor, mode: str) -> torch.Tensor:
+    """
+    One forward pass in `mode`, returning fp32 logits.
+    """
+    with torch.no_grad(), autocast(mode):
+        return model(format_input(batch, mode)).float()
+
+
+def agreement(reference: torch.Tensor, candidate: torch.Tensor) -> Dict[str, float]:
+    """
+    Compares two logit batches: top-1 is the share of rows with the same
+    argmax, top-5 the mean overlap of the two top-5 label sets.
+    """
+    top1 = (reference.argmax(dim=1) == candidate.argmax(dim=1)).float().mean().item()
+    ref5 = reference.topk(5, dim=1).indices
+    cand5 = candidate.topk(5, dim=1).indices
+    overlap = (ref5.unsqueeze(2) == cand5.unsqueeze(1)).any(dim=2).float().sum(dim=1) / 5
+    return {"top1": top1, "top5": overlap.mean().item()}
+
+
+def image_batches(folder: str, limit: int = 0, batch_size: int = CALIBRATION_BATCH_SIZE):
+    """
+    Yields preprocessed (N, 3, 224, 224) batches from the images in `folder`.
+    """
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(folder)
+        for name in names
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    if limit:
+        paths = paths[:limit]
+    if not paths:
+        raise ValueError(f"No images found in {folder}")
+    for start in range(0, len(paths), batch_size):
+        images = []
+        for path in paths[start:start + batch_size]:
+            with open(path, "rb") as f:
+                images.append(f.read())
+        yield preprocess_batch(images)
+
+
+def check_modes(model: torch.nn.Module, folder: str, modes: List[str], limit: int = 0) -> Dict[str, dict]:
+    """
+    Runs each mode over the images in `folder` and reports its agreement with fp32.
+    Every mode converts its own copy, so none is measured on another's layout.
+    """
+    batches = list(image_batches(folder, limit))
+    reference = torch.cat([run_model(model, batch, "fp32") for batch in batches])
+    report = {}
+    for requested in modes:
+        candidate, mode = build_prepared(lambda: copy.deepcopy(model), requested)
+        logits = torch.cat([run_model(candidate, batch, mode) for batch in batches])
+        report[requested] = dict(agreement(reference, logits), mode=mode, images=reference.shape[0])
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.inference_modes")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    calibrate = commands.add_parser("calibrate", help="Quantize MODEL_NAME to int8 with a local image folder")
+    calibrate.add_argument("--images", required=True, help="Folder of representative images")
+    calibrate.add_argument("--limit", type=int, default=512, help="Max calibration images (0 = all)")
+    calibrate.add_argument("--output", default=QUANTIZED_MODEL_PATH)
+
+    check = commands.add_parser("check", help="Report top-1/top-5 agreement of each mode with fp32")
+    check.add_argument("--images", required=True, help="Folder of evaluation images")
+    check.add_argument("--limit", type=int, default=0, help="Max images (0 = all)")
+    check.add_argument("--modes", nargs="+", default=list(INFERENCE_MODES[1:]), choices=INFERENCE_MODES)
+
+    args = parser.parse_args(argv)
+    from core.classifier import get_model
+    model = get_model()
+
+    if args.command == "calibrate":
+        batches = list(image_batches(args.images, args.limit))
+        quantized = quantize_static(model, batches)
+        save_quantized(quantized, args.output, images=sum(b.shape[0] for b in batches))
+        # Agreement on the calibration images themselves, so an optimistic bound
+        reference = torch.cat([run_model(model, batch, "fp32") for batch in batches])
+        logits = torch.cat([run_model(quantized, batch, "int8") for batch in batches])
+        report = {"int8": dict(agreement(reference, logits), mode="int8", images=reference.shape[0])}
+    else:
+        report = check_modes(model, args.images, args.modes, args.limit)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+On-disk cache of traced and frozen TorchScript models, one per MODEL_NAME and
+inference mode. Loading the artifact skips building the torchvision model
+and initializing its weights, and the frozen graph has batch norm folded into
+the convolutions. Artifacts record what they were built from; a missing or
+stale artifact is rebuilt from the eager model (or skipped) at worker start.
+
+Usage:
+    python -m core.model_cache build [--mode fp32|channels_last]
+"""
+
+import argparse
+import json
+import os
+from typing import Callable, Optional, Tuple
+
+import torch
+import torchvision
+
+from core.inference_modes import build_prepared, prepare_model
+from core.preprocessing import CROP_SIZE
+from utils.config import MODEL_NAME, MODEL_ARTIFACT_DIR, MODEL_CACHE, MODEL_CACHE_BUILD, INFERENCE_MODE
+from utils.logger import logger
+
+# bf16 autocast does not survive tracing and int8 is already a TorchScript artifact
+COMPILABLE_MODES = ("fp32", "channels_last")
+
+
+def artifact_path(mode: str, model_name: str = MODEL_NAME) -> str:
+    return os.path.join(MODEL_ARTIFACT_DIR, f"{model_name}_{mode}.ts")
+
+
+def artifact_meta(mode: str, weights: Optional[str], model_name: str = MODEL_NAME) -> dict:
+    """
+    Everything that must match for a cached artifact to be reused.
+    """
+    return {
+        "model_name": model_name,
+        "mode": mode,
+        "weights": weights,
+        "crop_size": CROP_SIZE,
+        "torch": torch.__version__,
+        "torchvision": torchvision.__version__,
+    }
+
+
+def build_artifact(model: torch.nn.Module, mode: str, meta: dict, path: str) -> torch.jit.ScriptModule:
+    """
+    Traces and freezes a prepared eval-mode model and saves it atomically.
+    """
+    example = torch.zeros(1, 3, CROP_SIZE, CROP_SIZE)
+    if mode == "channels_last":
+        example = example.contiguous(memory_format=torch.channels_last)
+    with torch.no_grad():
+        frozen = torch.jit.freeze(torch.jit.trace(model, example).eval())
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Several children may build at once; each renames a complete file into place
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    torch.jit.save(frozen, tmp_path, _extra_files={"meta.json": json.dumps(meta)})
+    os.replace(tmp_path, path)
+    logger.info(f"Saved compiled model to {path}")
+    return frozen
+
+
+def load_artifact(path: str, meta: dict) -> Optional[torch.jit.ScriptModule]:
+    """
+    Loads a cached artifact, or returns None if it is missing or was built
+    from a different model, mode, weights or torch/torchvision version.
+    """
+    if not os.path.exists(path):
+        logger.info(f"No compiled model at {path}")
+        return None
+    extra = {"meta.json": ""}
+    try:
+        model = torch.jit.load(path, map_location="cpu", _extra_files=extra)
+        cached = json.loads(extra["meta.json"] or "{}")
+    except Exception as e:
+        logger.warning(f"Could not load compiled model {path}: {e}")
+        return None
+    if cached != meta:
+        stale = sorted(k for k in meta if cached.get(k) != meta[k])
+        logger.warning(f"Compiled model {path} is stale ({', '.join(stale)} changed)")
+        return None
+    return model.eval()
+
+
+def load_model(
+    build_eager: Callable[[], torch.nn.Module],
+    mode: str,
+    weights: Optional[str],
+    model_name: str = MODEL_NAME,
+) -> Tuple[torch.nn.Module, str]:
+    """
+    Returns (model, active mode). With MODEL_CACHE=torchscript and a compilable
+    mode, a fresh cached artifact is used as-is; int8 loads its quantized
+    artifact; otherwise the eager model is built, prepared for `mode` and, if
+    MODEL_CACHE_BUILD, traced into the cache.
+    Any failure of the cache falls back to the eager model.
+    """
+    use_cache = MODEL_CACHE == "torchscript" and mode in COMPILABLE_MODES
+    if use_cache:
+        path, meta = artifact_path(mode, model_name), artifact_meta(mode, weights, model_name)
+        cached = load_artifact(path, meta)
+        if cached is not None:
+            logger.info(f"Loaded compiled model from {path}")
+            return cached, mode
+
+    model, mode = build_prepared(build_eager, mode, model_name)
+    if use_cache and MODEL_CACHE_BUILD and mode in COMPILABLE_MODES:
+        try:
+            return build_artifact(model, mode, meta, path), mode
+        except Exception as e:
+            logger.warning(f"Could not compile model, serving eager: {e}")
+    return model, mode
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.model_cache")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Trace, freeze and cache MODEL_NAME for a mode")
+    build.add_argument(
+        "--mode",
+        default=INFERENCE_MODE if INFERENCE_MODE in COMPILABLE_MODES else "fp32",
+        choices=COMPILABLE_MODES,
+    )
+    args = parser.parse_args(argv)
+
+    from core.classifier import get_model, weights_name
+    model, mode = prepare_model(get_model(), args.mode)
+    path = artifact_path(mode)
+    build_artifact(model, mode, artifact_meta(mode, weights_name()), path)
+    print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Keeps several models loaded in a worker process. Models are loaded on first
+use and the least recently used one is evicted once more than `max_models`
+are loaded or their weights exceed the memory budget. Requests still running
+on an evicted model keep their reference to it until they finish.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
+
+from utils.config import MODEL_NAME, MODELS
+from utils.logger import logger
+
+MODEL_LOADS = Counter("model_loads_total", "Models loaded into a worker process", ["model"])
+MODEL_EVICTIONS = Counter("model_evictions_total", "Models evicted from a worker process", ["model"])
+LOADED_MODEL_BYTES = Gauge("loaded_model_bytes", "Weight bytes of each loaded model", ["model"])
+
+
+class LoadedModel(NamedTuple):
+    model: object
+    mode: str
+    nbytes: int
+
+
+def resolve_model(model_name: Optional[str] = None) -> str:
+    """
+    Returns the model to serve for a request: MODEL_NAME when none is given.
+    Raises ValueError for a model that is not listed in MODELS.
+    """
+    model_name = model_name or MODEL_NAME
+    if model_name not in MODELS:
+        raise ValueError(f"Unknown model {model_name!r}; available: {', '.join(MODELS)}")
+    return model_name
+
+
+def _tensors(model) -> list:
+    tensors = list(model.parameters()) + list(model.buffers())
+    if not tensors and hasattr(model, "graph"):
+        # A frozen TorchScript module holds its weights as graph constants
+        import torch
+        tensors = [
+            node.output().toIValue()
+            for node in model.graph.findAllNodes("prim::Constant")
+            if isinstance(node.output().type(), torch._C.TensorType)
+        ]
+    return tensors
+
+
+def model_bytes(model) -> int:
+    """
+    Bytes held by a model's parameters and buffers (or frozen constants),
+    counting shared storage once.
+    """
+    seen, total = set(), 0
+    for tensor in _tensors(model):
+        ptr = tensor.data_ptr()
+        if ptr not in seen:
+            seen.add(ptr)
+            total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class ModelRegistry:
+    """
+    LRU of loaded models. `loader(name)` returns (model, active mode); two
+    callers asking for the same unloaded model share a single load.
+    """
+
+    def __init__(self, loader: Callable[[str], Tuple[object, str]], max_models: int, budget_bytes: int = 0):
+        self._loader = loader
+        self.max_models = max(1, max_models)
+        self.budget_bytes = budget_bytes
+        self._models: "OrderedDict[str, LoadedModel]" = OrderedDict()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str) -> Tuple[object, str]:
+        with self._lock:
+            entry = self._lookup(model_name)
+            if entry is not None:
+                return entry.model, entry.mode
+            load_lock = self._load_locks.setdefault(model_name, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._lookup(model_name)
+            if entry is not None:
+                return entry.model, entry.mode
+
+            model, mode = self._loader(model_name)
+            entry = LoadedModel(model, mode, model_bytes(model))
+            MODEL_LOADS.labels(model=model_name).inc()
+            LOADED_MODEL_BYTES.labels(model=model_name).set(entry.nbytes)
+            logger.info(f"Loaded {model_name} ({mode}, {entry.nbytes / 2**20:.0f} MB)")
+            with self._lock:
+                self._models[model_name] = entry
+                self._evict(keep=model_name)
+        return entry.model, entry.mode
+
+    def loaded(self) -> List[str]:
+        """
+        Loaded model names, least recently used first.
+        """
+        with self._lock:
+            return list(self._models)
+
+    def _lookup(self, model_name: str):
+        entry = self._models.get(model_name)
+        if entry is not None:
+            self._models.move_to_end(model_name)
+        return entry
+
+    def _evict(self, keep: str):
+        while len(self._models) > 1 and (
+            len(self._models) > self.max_models
+            or (self.budget_bytes and sum(e.nbytes for e in self._models.values()) > self.budget_bytes)
+        ):
+            name = next(iter(self._models))
+            if name == keep:
+                break
+            del self._models[name]
+            MODEL_EVICTIONS.labels(model=name).inc()
+            LOADED_MODEL_BYTES.labels(model=name).set(0)
+            logger.info(f"Evicted {name} from the model registry")
@@ -0,0 +1,143 @@
+"""
+Batch preprocessing engine: decode, resize and crop images to uint8 arrays,
+then normalize the whole batch in place into one preallocated float tensor.
+
+Matches torchvision's Resize(256) -> CenterCrop(224) -> ToTensor -> Normalize
+on PIL images without per-image float temporaries. Between pipeline stages
+images travel as cropped uint8 HWC arrays (pack_tensor) and are normalized
+only when the model input is built (to_model_input).
+"""
+
+import io
+import math
+import struct
+from typing import List, Optional
+
+import numpy as np
+import torch
+from PIL import Image
+
+from utils.config import FAST_DECODE
+
+RESIZE_SIZE = 256
+CROP_SIZE = 224
+MEAN = (0.485, 0.456, 0.406)
+STD = (0.229, 0.224, 0.225)
+
+# Serialized intermediate format: magic, version, dtype code, ndim, dims, raw C-order data
+TENSOR_MAGIC = b"VQT"
+TENSOR_VERSION = 1
+_TENSOR_HEADER = struct.Struct("<3sBBB")
+_DTYPE_CODES = {np.dtype(np.uint8): 0, np.dtype(np.float32): 1}
+_CODE_DTYPES = {code: dtype for dtype, code in _DTYPE_CODES.items()}
+# Pre-versioning payloads were bare normalized float32 (1, 3, 224, 224) buffers
+_LEGACY_SHAPE = (1, 3, CROP_SIZE, CROP_SIZE)
+_LEGACY_NBYTES = 4 * 3 * CROP_SIZE * CROP_SIZE
+
+# Normalize((x / 255 - mean) / std) folded into a single scale and shift
+_SCALE = torch.tensor([1.0 / (255.0 * s) for s in STD], dtype=torch.float32).view(1, 3, 1, 1)
+_SHIFT = torch.tensor([m / s for m, s in zip(MEAN, STD)], dtype=torch.float32).view(1, 3, 1, 1)
+
+
+def pack_tensor(array: np.ndarray) -> bytes:
+    """
+    Serializes an array with a versioned header carrying dtype and shape.
+    """
+    code = _DTYPE_CODES.get(array.dtype)
+    if code is None:
+        raise ValueError(f"Unsupported tensor dtype: {array.dtype}")
+    header = _TENSOR_HEADER.pack(TENSOR_MAGIC, TENSOR_VERSION, code, array.ndim)
+    dims = struct.pack(f"<{array.ndim}I", *array.shape)
+    return header + dims + np.ascontiguousarray(array).tobytes()
+
+
+def unpack_tensor(data: bytes) -> np.ndarray:
+    """
+    Deserializes pack_tensor output into a read-only array view. Legacy bare
+    float32 payloads are accepted so in-flight messages survive an upgrade.
+    """
+    if data[:len(TENSOR_MAGIC)] != TENSOR_MAGIC:
+        if len(data) == _LEGACY_NBYTES:
+            return np.frombuffer(data, dtype=np.float32).reshape(_LEGACY_SHAPE)
+        raise ValueError("Payload is not a serialized tensor")
+
+    _, version, code, ndim = _TENSOR_HEADER.unpack_from(data)
+    if version != TENSOR_VERSION:
+        raise ValueError(f"Unsupported tensor format version: {version}")
+    if code not in _CODE_DTYPES:
+        raise ValueError(f"Unsupported tensor dtype code: {code}")
+    shape = struct.unpack_from(f"<{ndim}I", data, _TENSOR_HEADER.size)
+    offset = _TENSOR_HEADER.size + 4 * ndim
+    return np.frombuffer(data, dtype=_CODE_DTYPES[code], offset=offset).reshape(shape)
+
+
+def decode_image(image_bytes: bytes, min_side: int = RESIZE_SIZE) -> Image.Image:
+    """
+    Decodes image bytes to RGB. With FAST_DECODE, JPEGs are downscaled by
+    libjpeg in the DCT domain (1/2, 1/4 or 1/8) to the smallest size whose
+    short side still covers min_side, so Resize never sees discarded pixels.
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    if FAST_DECODE and img.format == "JPEG":
+        width, height = img.size
+        scale = min_side / min(width, height)
+        if scale < 1:
+            # draft() only picks scales that keep both sides >= the requested size
+            img.draft("RGB", (math.ceil(width * scale), math.ceil(height * scale)))
+    return img.convert("RGB")
+
+
+def resize_crop(img: Image.Image, resize: int = RESIZE_SIZE, crop: int = CROP_SIZE) -> np.ndarray:
+    """
+    Resizes the short side to `resize` (bilinear) and center-crops to
+    `crop` x `crop`, returning a uint8 HWC array.
+    """
+    width, height = img.size
+    if width <= height:
+        new_width, new_height = resize, int(resize * height / width)
+    else:
+        new_width, new_height = int(resize * width / height), resize
+    if (new_width, new_height) != (width, height):
+        img = img.resize((new_width, new_height), Image.BILINEAR)
+
+    top = int(round((new_height - crop) / 2.0))
+    left = int(round((new_width - crop) / 2.0))
+    return np.asarray(img)[top:top + crop, left:left + crop]
+
+
+def normalize_batch(arrays: List[np.ndarray], out: Optional[torch.Tensor] = None) -> torch.Tensor:
+    """
+    Stacks uint8 HWC arrays and normalizes them into an NCHW float32 tensor.
+    `out` may be a preallocated tensor of shape (N, 3, H, W) to reuse.
+    """
+    n = len(arrays)
+    height, width = arrays[0].shape[:2]
+    batch = np.empty((n, height, width, 3), dtype=np.uint8)
+    for i, array in enumerate(arrays):
+        batch[i] = array
+
+    if out is None:
+        out = torch.empty((n, 3, height, width), dtype=torch.float32)
+    # One cast-copy from the NHWC uint8 view, then in-place scale and shift
+    out.copy_(torch.from_numpy(batch).permute(0, 3, 1, 2))
+    out.mul_(_SCALE).sub_(_SHIFT)
+    return out
+
+
+def preprocess_batch(images: List[bytes], out: Optional[torch.Tensor] = None) -> torch.Tensor:
+    """
+    Decodes, resizes, crops and normalizes a batch of encoded images into a
+    single (N, 3, 224, 224) tensor ready for the model.
+    """
+    return normalize_batch([resize_crop(decode_image(data)) for data in images], out=out)
+
+
+def to_model_input(arrays: List[np.ndarray]) -> torch.Tensor:
+    """
+    Builds a model input batch from unpacked intermediate arrays that share
+    dtype and shape: uint8 HWC crops are normalized here, float32 NCHW
+    (legacy, already normalized) arrays are concatenated as-is.
+    """
+    if arrays[0].dtype == np.uint8:
+        return normalize_batch(arrays)
+    return torch.from_numpy(np.concatenate(arrays))
@@ -0,0 +1,199 @@
+"""
+Model weights shared between prefork worker children instead of copied into
+each of them:
+
+- fork: the parent loads the model before forking and freezes the GC, so the
+  children inherit its tensor pages copy-on-write and never write to them
+- mmap: each child builds the model on the meta device (no allocation) and
+  assigns weights memory-mapped from a state-dict file in MODEL_ARTIFACT_DIR,
+  so all children read the same page-cache pages
+
+Usage:
+    python -m core.shared_weights measure [--children 4] [--sharing off|fork|mmap]
+"""
+
+import argparse
+import gc
+import json
+import os
+from typing import Callable, Optional, Tuple
+
+import torch
+
+from core.inference_modes import prepare_model, run_model
+from core.model_cache import artifact_meta, load_model
+from core.preprocessing import CROP_SIZE
+from utils.config import MODEL_NAME, MODEL_ARTIFACT_DIR, MODEL_CACHE_BUILD, MODEL_SHARING, WARM_MODELS
+from utils.logger import logger
+from utils.process_memory import process_memory
+
+SHARING_MODES = ("off", "fork", "mmap")
+# int8 is a TorchScript artifact, which torch.jit.load always copies into the process
+MMAP_MODES = ("fp32", "channels_last", "bf16")
+
+
+def weights_path(mode: str, model_name: str = MODEL_NAME) -> str:
+    return os.path.join(MODEL_ARTIFACT_DIR, f"{model_name}_{mode}.weights.pt")
+
+
+def save_weights(model: torch.nn.Module, meta: dict, path: str):
+    """
+    Saves a prepared model's state dict (in its memory format) atomically.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    torch.save({"meta": json.dumps(meta), "state_dict": model.state_dict()}, tmp_path)
+    os.replace(tmp_path, path)
+    logger.info(f"Saved shared weights to {path}")
+
+
+def load_weights(build_skeleton: Callable[[], torch.nn.Module], path: str, meta: dict) -> Optional[torch.nn.Module]:
+    """
+    Returns the skeleton with memory-mapped weights assigned, or None if the
+    file is missing, stale or does not cover every parameter and buffer.
+    """
+    if not os.path.exists(path):
+        logger.info(f"No shared weights at {path}")
+        return None
+    try:
+        saved = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+        if json.loads(saved.get("meta") or "{}") != meta:
+            logger.warning(f"Shared weights {path} are stale")
+            return None
+        model = build_skeleton()
+        model.load_state_dict(saved["state_dict"], assign=True)
+    except Exception as e:
+        logger.warning(f"Could not map shared weights {path}: {e}")
+        return None
+    # Non-persistent buffers are not in the state dict and would stay on meta
+    if any(t.is_meta for t in list(model.parameters()) + list(model.buffers())):
+        logger.warning(f"Shared weights {path} do not cover every tensor of the model")
+        return None
+    return model.eval()
+
+
+def load_shared(
+    build_eager: Callable[[], torch.nn.Module],
+    build_skeleton: Callable[[], torch.nn.Module],
+    mode: str,
+    weights: Optional[str],
+    model_name: str = MODEL_NAME,
+) -> Tuple[torch.nn.Module, str]:
+    """
+    Returns (model, active mode) with weights memory-mapped from
+    weights_path(mode). A missing or stale file is written from the eager
+    model (if MODEL_CACHE_BUILD) and then mapped, so the first child shares too.
+    """
+    if mode not in MMAP_MODES:
+        logger.warning(f"{mode} weights cannot be memory-mapped; loading a private copy")
+        return load_model(build_eager, mode, weights, model_name)
+
+    path, meta = weights_path(mode, model_name), artifact_meta(mode, weights, model_name)
+    model = load_weights(build_skeleton, path, meta)
+    if model is not None:
+        logger.info(f"Mapped shared weights from {path}")
+        # Weights were saved in the mode's memory format, so this does not copy them
+        return prepare_model(model, mode, model_name)
+
+    model, active = prepare_model(build_eager(), mode, model_name)
+    if MODEL_CACHE_BUILD:
+        try:
+            save_weights(model, meta, path)
+            mapped = load_weights(build_skeleton, path, meta)
+            if mapped is not None:
+                return prepare_model(mapped, mode, model_name)[0], active
+        except Exception as e:
+            logger.warning(f"Could not save shared weights, serving a private copy: {e}")
+    return model, active
+
+
+def share_before_fork():
+    """
+    MODEL_SHARING=fork: loads WARM_MODELS in the prefork parent and moves every
+    object it allocated to the GC's permanent generation, so collections in
+    the children do not touch (and copy) those pages.
+    """
+    from core.classifier import get_inference_model
+
+    # Parallel kernels would start an OpenMP pool that does not survive fork
+    torch.set_num_threads(1)
+    for model_name in WARM_MODELS:
+        get_inference_model(model_name)
+    gc.freeze()
+    logger.info(f"Loaded {', '.join(WARM_MODELS)} in the worker parent for copy-on-write sharing")
+
+
+def measure(children: int, sharing: str, threads: int = 1) -> dict:
+    """
+    Forks `children` processes that each load the model the way `sharing`
+    asks and run one forward pass, then reads their memory while all of them
+    are alive (PSS depends on who else maps the same pages).
+    """
+    from core.classifier import build_inference_model, get_inference_model
+
+    torch.set_num_threads(1)
+    if sharing == "fork":
+        share_before_fork()
+        load = get_inference_model
+    else:
+        load = lambda: build_inference_model(sharing)  # noqa: E731
+
+    pids, ready, release = [], [], []
+    for _ in range(children):
+        ready_r, ready_w = os.pipe()
+        release_r, release_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                os.close(ready_r)
+                os.close(release_w)
+                torch.set_num_threads(threads)
+                model, mode = load()
+                run_model(model, torch.zeros(1, 3, CROP_SIZE, CROP_SIZE), mode)
+                os.write(ready_w, b"1")
+                os.read(release_r, 1)  # returns once the parent closes its end
+                code = 0
+            finally:
+                os._exit(code)
+        os.close(ready_w)
+        os.close(release_r)
+        pids.append(pid)
+        ready.append(ready_r)
+        release.append(release_w)
+
+    loaded = [os.read(fd, 1) == b"1" for fd in ready]
+    per_child = [process_memory(pid) for pid in pids]
+    for fd in release + ready:
+        os.close(fd)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    if not all(loaded):
+        raise RuntimeError(f"{loaded.count(False)} of {children} children failed to load the model")
+
+    mb = 1024 * 1024
+    return {
+        "model_name": MODEL_NAME,
+        "sharing": sharing,
+        "children": children,
+        "parent_rss_mb": round(process_memory().get("rss", 0) / mb, 1),
+        "per_child_mb": [{k: round(v / mb, 1) for k, v in usage.items()} for usage in per_child],
+        "mean_child_uss_mb": round(sum(u.get("uss", 0) for u in per_child) / children / mb, 1),
+        "total_child_pss_mb": round(sum(u.get("pss", 0) for u in per_child) / mb, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.shared_weights")
+    commands = parser.add_subparsers(dest="command", required=True)
+    measure_cmd = commands.add_parser("measure", help="Per-child memory of N children with a sharing mode")
+    measure_cmd.add_argument("--children", type=int, default=4)
+    measure_cmd.add_argument("--sharing", default=MODEL_SHARING, choices=SHARING_MODES)
+    measure_cmd.add_argument("--threads", type=int, default=1, help="Torch threads per child")
+    args = parser.parse_args(argv)
+
+    print(json.dumps(measure(args.children, args.sharing, args.threads), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+PyTorch thread budgets for worker processes. Each concurrent forward pass gets
+an equal share of the CPUs the worker may actually use (CPU affinity and
+cgroup quota), so N pool processes never start N x cores threads.
+"""
+
+import math
+import os
+from typing import Optional, Tuple
+
+import torch
+from prometheus_client import Gauge
+
+from utils.config import TORCH_NUM_THREADS, TORCH_INTEROP_THREADS
+from utils.logger import logger
+
+AVAILABLE_CPUS = Gauge("worker_available_cpus", "CPUs usable by the worker (affinity and cgroup quota)")
+TORCH_THREADS = Gauge("torch_threads", "PyTorch thread pool size per worker process", ["pool"])
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def cgroup_cpu_limit(root: str = "/sys/fs/cgroup") -> Optional[float]:
+    """
+    Returns the cgroup CPU quota in CPUs (v2 cpu.max or v1 cfs quota), or
+    None when the cgroup is unlimited or unreadable.
+    """
+    try:
+        with open(os.path.join(root, "cpu.max")) as f:
+            quota, period = f.read().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(os.path.join(root, "cpu", "cpu.cfs_quota_us")) as f:
+            quota = int(f.read())
+        with open(os.path.join(root, "cpu", "cpu.cfs_period_us")) as f:
+            period = int(f.read())
+    except (OSError, ValueError):
+        return None
+    return quota / period if quota > 0 and period > 0 else None
+
+
+def available_cpus() -> int:
+    """
+    Returns the number of CPUs this process may run on, bounded by the cgroup quota.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+    return cpus
+
+
+def thread_budget(slots: int, cpus: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Returns (intra-op, inter-op) threads for one of `slots` concurrent forward
+    passes. TORCH_NUM_THREADS / TORCH_INTEROP_THREADS override the derived values.
+    """
+    cpus = cpus or available_cpus()
+    intra = TORCH_NUM_THREADS or max(1, cpus // max(slots, 1))
+    interop = TORCH_INTEROP_THREADS or 1
+    return intra, interop
+
+
+def set_thread_env(intra: int):
+    """
+    Exports the budget to OpenMP/MKL/OpenBLAS for runtimes initialized later
+    (e.g. in forked children); values already set in the environment win.
+    """
+    for var in THREAD_ENV_VARS:
+        os.environ.setdefault(var, str(intra))
+
+
+def configure_torch_threads(slots: int) -> Tuple[int, int]:
+    """
+    Applies the thread budget to this process and publishes it as metrics.
+    """
+    intra, interop = thread_budget(slots)
+    set_thread_env(intra)
+    torch.set_num_threads(intra)
+    try:
+        torch.set_num_interop_threads(interop)
+    except RuntimeError as e:
+        # Only settable once per process, before any inter-op work has started
+        logger.warning(f"Could not set inter-op threads to {interop}: {e}")
+
+    AVAILABLE_CPUS.set(available_cpus())
+    TORCH_THREADS.labels(pool="intra_op").set(torch.get_num_threads())
+    TORCH_THREADS.labels(pool="inter_op").set(torch.get_num_interop_threads())
+    logger.info(
+        f"Torch threads: intra_op={torch.get_num_threads()}, "
+        f"inter_op={torch.get_num_interop_threads()} for {slots} concurrent slot(s)"
+    )
+    return torch.get_num_threads(), torch.get_num_interop_threads()
@@ -9,6 +9,9 @@ from prometheus_fastapi_instrumentator import Instrumentator
 from api.routes import router
 from utils.logger import logger
 from services.storage import get_minio_client
+from services.queue_monitor import get_sampler
+from services.db import dispose_engine
+from utils.config import QUEUE_SAMPLE_INTERVAL
 
 app = FastAPI(title="Celery Image Pipeline API")
 app.include_router(router, prefix="/api")
@@ -56,6 +59,13 @@ def startup_event():
         get_minio_client()
     except Exception as e:
         logger.error(f"Failed to connect to MinIO: {e}")
+    if QUEUE_SAMPLE_INTERVAL > 0:
+        get_sampler().start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    get_sampler().stop(timeout=5)
+    dispose_engine()
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000)
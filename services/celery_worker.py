@@ -1,5 +1,10 @@
 from celery import Celery
-from utils.config import CELERY_BROKER_URL, CELERY_RESULT_BACKEND
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, worker_shutdown, task_postrun
+from kombu import Exchange, Queue
+from utils.config import (
+    CELERY_BROKER_URL, CELERY_RESULT_BACKEND, INFERENCE_BATCH_SIZE, MODEL_PRELOAD, MODEL_SHARING,
+    MODEL_NAME, RESULT_BATCH_SIZE, MODELS, MODEL_ROUTING, WARM_MODELS,
+)
 from utils.logger import logger
 # from services.task_handler import preprocess 
 # Define Celery app
@@ -10,20 +15,172 @@ celery_app = Celery(
     include=["services.task_handler"]
 )
 
+# Stage queues: CPU-bound preprocess/inference, I/O-bound storage and webhooks,
+# so a backlog in one stage never occupies the worker slots of another
+DEFAULT_QUEUE = "image_tasks"
+PREPROCESS_QUEUE = "preprocess"
+INFERENCE_QUEUE = "inference"
+STORAGE_QUEUE = "storage"
+WEBHOOK_QUEUE = "webhooks"
+STAGE_QUEUES = (PREPROCESS_QUEUE, INFERENCE_QUEUE, STORAGE_QUEUE, WEBHOOK_QUEUE)
+
+
+def model_queue(model_name: str) -> str:
+    """
+    Inference queue for a model: with MODEL_ROUTING=per_model every model
+    other than MODEL_NAME has its own queue, consumed by workers that keep it warm.
+    """
+    if MODEL_ROUTING == "per_model" and model_name != MODEL_NAME:
+        return f"{INFERENCE_QUEUE}.{model_name}"
+    return INFERENCE_QUEUE
+
+
+MODEL_QUEUES = tuple(q for q in dict.fromkeys(model_queue(m) for m in MODELS) if q != INFERENCE_QUEUE)
+
+image_exchange = Exchange("image", type="direct")
+
 # Global Celery configuration
 celery_app.conf.update(
     task_acks_late=True,         # Acknowledge only after success
     worker_prefetch_multiplier=1,
     task_default_retry_delay=10, # seconds
-    task_routes={                # dead-letter exchange pattern (example)
-        "services.task_handler.*": {"queue": "image_tasks"},
+    # A worker started without -Q consumes every queue listed here
+    task_queues=[
+        Queue(name, image_exchange, routing_key=name)
+        for name in (DEFAULT_QUEUE, *STAGE_QUEUES, *MODEL_QUEUES)
+    ],
+    task_routes={
+        "services.task_handler.preprocess": {"queue": PREPROCESS_QUEUE},
+        "services.task_handler.preprocess_object": {"queue": PREPROCESS_QUEUE},
+        "services.task_handler.classify_task": {"queue": INFERENCE_QUEUE},
+        "services.task_handler.classify_object": {"queue": INFERENCE_QUEUE},
+        "services.task_handler.process_image": {"queue": INFERENCE_QUEUE},
+        "services.task_handler.store_result": {"queue": STORAGE_QUEUE},
+        "services.task_handler.send_webhook": {"queue": WEBHOOK_QUEUE},
+        "services.task_handler.*": {"queue": DEFAULT_QUEUE},
     },
-    task_default_queue="image_tasks",
+    task_default_queue=DEFAULT_QUEUE,
     task_default_exchange="image",
     task_default_exchange_type="direct",
-    task_default_routing_key="image",
+    task_default_routing_key=DEFAULT_QUEUE,
 )
 
+# Concurrent forward passes per worker process, recorded in the parent before prefork
+_inference_slots = 1
+# Cleared at worker start when the pool runs one task per process, so no batch could form
+_batching_allowed = True
+
+
+def _pool_name(pool_cls) -> str:
+    return pool_cls if isinstance(pool_cls, str) else f"{pool_cls.__module__}.{pool_cls.__name__}"
+
+
+def _is_prefork(pool_cls) -> bool:
+    return "prefork" in _pool_name(pool_cls)
+
+
+def batching_allowed() -> bool:
+    """
+    Whether tasks in this process may share a micro-batch (inference) or a
+    write-behind flush (result rows).
+    """
+    return _batching_allowed
+
+
+@worker_init.connect
+def plan_batching(sender=None, **kwargs):
+    """
+    The micro-batcher only gathers tasks running at the same time in one
+    process. Prefork and solo children run one task at a time, so there
+    INFERENCE_BATCH_SIZE > 1 would only delay every task by
+    INFERENCE_BATCH_WAIT_MS (and RESULT_BATCH_SIZE > 1 by RESULT_BATCH_WAIT_MS);
+    classify and write directly instead and say so.
+    """
+    global _batching_allowed
+    pool = _pool_name(getattr(sender, "pool_cls", "prefork"))
+    concurrency = getattr(sender, "concurrency", None) or 1
+    single_task = "prefork" in pool or "solo" in pool or concurrency == 1
+    _batching_allowed = not single_task
+    if INFERENCE_BATCH_SIZE > 1 and single_task:
+        logger.warning(
+            f"INFERENCE_BATCH_SIZE={INFERENCE_BATCH_SIZE} has no effect with a {pool} pool running one task "
+            "per process; micro-batching is off. Use -P threads with --concurrency >= INFERENCE_BATCH_SIZE."
+        )
+    if RESULT_BATCH_SIZE > 1 and single_task:
+        logger.warning(
+            f"RESULT_BATCH_SIZE={RESULT_BATCH_SIZE} has no effect with a {pool} pool running one task "
+            "per process; results are written directly."
+        )
+
+
+@worker_init.connect
+def plan_torch_threads(sender=None, **kwargs):
+    """
+    Prefork children each run one forward pass at a time and split the CPUs
+    between them; thread pools share one process, where concurrent tasks split
+    them too unless the micro-batcher serializes inference into one pass.
+    """
+    global _inference_slots
+    # Imported here so processes that never start a worker do not load torch for it
+    from core.torch_threads import configure_torch_threads, set_thread_env, thread_budget
+
+    concurrency = getattr(sender, "concurrency", None) or 1
+    if _is_prefork(getattr(sender, "pool_cls", "prefork")):
+        _inference_slots = concurrency
+        set_thread_env(thread_budget(_inference_slots)[0])
+    else:
+        _inference_slots = 1 if INFERENCE_BATCH_SIZE > 1 else concurrency
+        configure_torch_threads(_inference_slots)
+
+
+@worker_init.connect
+def share_model(sender=None, **kwargs):
+    """
+    With MODEL_SHARING=fork, loads the model in the prefork parent so every
+    child inherits the same weight pages instead of loading its own copy.
+    """
+    if MODEL_SHARING == "fork" and _is_prefork(getattr(sender, "pool_cls", "prefork")):
+        from core.shared_weights import share_before_fork
+        share_before_fork()
+
+
+@worker_process_init.connect
+def apply_torch_threads(**kwargs):
+    from core.torch_threads import configure_torch_threads
+    configure_torch_threads(_inference_slots)
+
+
+@worker_process_init.connect
+def preload_model(**kwargs):
+    """
+    Loads WARM_MODELS when a prefork child starts (after its thread budget is
+    set) so the first task does not pay for it. Thread pools load on first use.
+    """
+    if MODEL_PRELOAD:
+        from core.classifier import get_inference_model
+        for model_name in WARM_MODELS:
+            get_inference_model(model_name)
+    from utils.process_memory import record_memory
+    record_memory(force=True)
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def close_db_pool(**kwargs):
+    """
+    Closes pooled database connections when a prefork child exits, or when a
+    solo/thread-pool worker (whose tasks run in the main process) shuts down.
+    """
+    from services.db import dispose_engine
+    dispose_engine()
+
+
+@task_postrun.connect
+def sample_memory(**kwargs):
+    from utils.process_memory import record_memory
+    record_memory()
+
+
 # # Verify that all tasks are properly registered with Celery, only being used in development
 # import services.task_handler
 # print("Registered tasks:", celery_app.tasks.keys())
@@ -0,0 +1,70 @@
+"""
+Claim-check store: parks intermediate pipeline payloads outside the broker so
+chain messages only carry a short key.
+"""
+
+import os
+import uuid
+
+from services.storage import upload_image, download_image, delete_object
+from utils.config import CLAIM_CHECK_STORE, CLAIM_CHECK_DIR
+from utils.logger import logger
+
+TENSOR_PREFIX = "tensors/"
+
+
+def _parse_key(key: str):
+    store, sep, name = key.partition(":")
+    if not sep or store not in ("local", "minio") or not name:
+        raise ValueError(f"Invalid claim-check key: {key!r}")
+    if store == "local" and os.path.basename(name) != name:
+        raise ValueError(f"Invalid claim-check key: {key!r}")
+    return store, name
+
+
+def put_payload(data: bytes) -> str:
+    """
+    Stores bytes in the configured claim-check store and returns their key.
+    """
+    name = f"{uuid.uuid4().hex}.bin"
+    if CLAIM_CHECK_STORE == "local":
+        os.makedirs(CLAIM_CHECK_DIR, exist_ok=True)
+        path = os.path.join(CLAIM_CHECK_DIR, name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)  # readers never see a partial file
+        key = f"local:{name}"
+    elif CLAIM_CHECK_STORE == "minio":
+        object_name = f"{TENSOR_PREFIX}{name}"
+        upload_image(data, object_name, content_type="application/octet-stream")
+        key = f"minio:{object_name}"
+    else:
+        raise ValueError(f"Unsupported CLAIM_CHECK_STORE: {CLAIM_CHECK_STORE}")
+    logger.debug(f"Parked {len(data)} bytes under {key}")
+    return key
+
+
+def get_payload(key: str) -> bytes:
+    """
+    Reads bytes previously stored with put_payload.
+    """
+    store, name = _parse_key(key)
+    if store == "local":
+        with open(os.path.join(CLAIM_CHECK_DIR, name), "rb") as f:
+            return f.read()
+    return download_image(name)
+
+
+def delete_payload(key: str):
+    """
+    Removes a parked payload; missing payloads are ignored.
+    """
+    store, name = _parse_key(key)
+    try:
+        if store == "local":
+            os.remove(os.path.join(CLAIM_CHECK_DIR, name))
+        else:
+            delete_object(name)
+    except FileNotFoundError:
+        logger.debug(f"Claim-check payload {key} already removed")
@@ -0,0 +1,83 @@
+"""
+Process-wide SQLAlchemy engine and the results table schema.
+"""
+
+import os
+from typing import Optional
+
+from sqlalchemy import create_engine, Table, Column, Integer, String, JSON, MetaData
+from sqlalchemy.engine import Engine
+
+from utils.config import (
+    DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+)
+from utils.logger import logger
+
+metadata = MetaData()
+
+RESULTS = Table(
+    "results", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("task_id", String, unique=True),
+    Column("payload", JSON),
+)
+
+# Global engine cache, keyed to the process that created it
+_engine: Optional[Engine] = None
+_engine_pid: Optional[int] = None
+
+
+def get_engine() -> Engine:
+    """
+    Returns the pooled engine for this process, creating it on first use.
+
+    Pooled connections must not be shared across fork (Celery prefork), so a
+    child that inherits its parent's engine drops it and builds its own.
+    """
+    global _engine, _engine_pid
+    pid = os.getpid()
+    if _engine is not None and _engine_pid != pid:
+        # Forget inherited connections without closing the parent's sockets
+        _engine.dispose(close=False)
+        _engine = None
+    if _engine is None:
+        _engine = create_engine(
+            DATABASE_URL,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+        _engine_pid = pid
+        logger.info(f"Created database engine for pid {pid} (pool_size={DB_POOL_SIZE})")
+    return _engine
+
+
+def dispose_engine():
+    """
+    Closes this process's pooled connections on worker or API shutdown.
+    An engine inherited across fork is forgotten without closing its sockets.
+    """
+    global _engine, _engine_pid
+    if _engine is not None:
+        _engine.dispose(close=_engine_pid == os.getpid())
+    _engine = None
+    _engine_pid = None
+
+
+def init_schema():
+    """
+    One-time bootstrap: creates the results table if missing.
+    Run via `python -m services.db` before starting workers.
+    """
+    metadata.create_all(get_engine())
+    logger.info("Database schema is up to date")
+
+
+if __name__ == "__main__":
+    init_schema()
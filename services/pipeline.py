@@ -0,0 +1,117 @@
+"""
+Thin pipeline client: builds and enqueues the classification workflow by task
+name, so the API can submit work without importing services.task_handler
+(and with it torch and the model).
+"""
+
+import uuid
+from celery import chain, group
+from celery.canvas import Signature
+from celery.result import GroupResult
+from typing import List, Optional, Tuple
+
+from services.celery_worker import celery_app, model_queue
+from services.result_cache import get_cached
+from utils.logger import logger
+from utils.config import PIPELINE_TRANSPORT, PIPELINE_MODE, BATCH_CHUNK_SIZE, MODEL_NAME, TOP_K
+
+TASK_MODULE = "services.task_handler"
+
+
+def task_signature(name: str, *args, **kwargs) -> Signature:
+    """
+    Returns a signature for a task in services.task_handler, referenced by name.
+    """
+    return celery_app.signature(f"{TASK_MODULE}.{name}", args=args, kwargs=kwargs)
+
+
+def inference_signature(name: str, model_name: str, *args, top_k: Optional[int] = None, **kwargs) -> Signature:
+    """
+    Signature for a task that runs the model, sent to that model's inference
+    queue; top_k is only sent when a request asked for a non-default k.
+    """
+    if top_k:
+        kwargs["top_k"] = top_k
+    return task_signature(name, *args, model_name=model_name, **kwargs).set(queue=model_queue(model_name))
+
+
+def build_pipeline(image_bytes: Optional[bytes], metadata: dict, callback_url: Optional[str] = None):
+    """
+    Builds the workflow signature for one image:
+    preprocess -> classify -> store_result -> (optional send_webhook).
+
+    With PIPELINE_TRANSPORT=claim_check, or when no image bytes are given,
+    messages carry only the MinIO object key (metadata["object_name"]) and the
+    parked tensor key.
+    With PIPELINE_MODE=fused the first three steps run as a single process_image task.
+    metadata["model"] selects the model (default MODEL_NAME); it must be one of MODELS.
+    metadata["top_k"] sets the number of labels returned (default TOP_K).
+    If metadata["content_hash"] is already cached for that model and k, only store_result is enqueued.
+    """
+    object_name = metadata.get("object_name")
+    content_hash = metadata.get("content_hash")
+    model_name = metadata.get("model") or MODEL_NAME
+    top_k = metadata.get("top_k")
+    use_claim_check = object_name and (PIPELINE_TRANSPORT == "claim_check" or image_bytes is None)
+    cached = get_cached(content_hash, model_name, top_k or TOP_K)
+    if cached is not None:
+        logger.info(f"Result cache hit for {content_hash}; skipping classification")
+        workflow = task_signature("store_result", cached, dict(metadata, cache_hit=True))
+    elif PIPELINE_MODE == "fused":
+        if use_claim_check:
+            workflow = inference_signature("process_image", model_name, metadata, top_k=top_k, object_name=object_name)
+        else:
+            workflow = inference_signature("process_image", model_name, metadata, top_k=top_k, image_bytes=image_bytes)
+    elif use_claim_check:
+        workflow = chain(
+            task_signature("preprocess_object", object_name),
+            inference_signature("classify_object", model_name, top_k=top_k, content_hash=content_hash),
+            task_signature("store_result", metadata)
+        )
+    else:
+        workflow = chain(
+            task_signature("preprocess", image_bytes),
+            inference_signature("classify_task", model_name, top_k=top_k, content_hash=content_hash),
+            task_signature("store_result", metadata)
+        )
+
+    if callback_url:
+        logger.info(f"Callback URL provided: {callback_url}")
+        workflow = workflow | task_signature("send_webhook", callback_url)
+    else:
+        logger.info("No callback URL provided")
+
+    return workflow
+
+
+def submit_pipeline(image_bytes: Optional[bytes], metadata: dict, callback_url: Optional[str] = None):
+    """
+    Orchestrates: preprocess -> classify -> store_result -> (optional send_webhook).
+    Returns AsyncResult for the final task so result() always holds full_result.
+    """
+    return build_pipeline(image_bytes, metadata, callback_url).apply_async()
+
+
+def submit_batch(items: List[dict], callback_url: Optional[str] = None) -> Tuple[str, List[str]]:
+    """
+    Enqueues one Celery group per BATCH_CHUNK_SIZE items. Each item is the
+    metadata of an image already stored in MinIO (metadata["object_name"]).
+    The batch is saved as a GroupResult under the returned batch id so its
+    members can be looked up later; per-item task ids are returned in order.
+    """
+    batch_id = str(uuid.uuid4())
+    results = []
+    for start in range(0, len(items), BATCH_CHUNK_SIZE):
+        chunk = items[start:start + BATCH_CHUNK_SIZE]
+        group_result = group(
+            build_pipeline(None, dict(metadata, batch_id=batch_id), callback_url)
+            for metadata in chunk
+        ).apply_async()
+        results.extend(group_result.results)
+
+    try:
+        GroupResult(batch_id, results, app=celery_app).save()
+    except Exception as e:
+        logger.warning(f"Could not save batch {batch_id}: {e}")
+    logger.info(f"Submitted batch {batch_id} with {len(results)} items")
+    return batch_id, [r.id for r in results]
@@ -0,0 +1,105 @@
+"""
+Background sampler exporting broker queue depth and worker task counts.
+
+Reads queue lengths straight from the broker (LLEN on Redis, a passive
+queue_declare on AMQP) and, optionally, reserved/active counts via a
+worker broadcast, on a fixed interval so request handlers never pay for it.
+"""
+
+import threading
+from typing import List, Optional
+
+from amqp.exceptions import ChannelError
+from prometheus_client import Gauge
+
+from services.celery_worker import celery_app
+from utils.config import QUEUE_SAMPLE_INTERVAL, QUEUE_SAMPLE_QUEUES, QUEUE_SAMPLE_INSPECT
+from utils.logger import logger
+
+QUEUE_DEPTH = Gauge("celery_queue_depth", "Number of tasks waiting in the broker queue", ["queue"])
+WORKER_TASKS = Gauge("celery_worker_tasks", "Tasks held by workers", ["state"])
+
+
+def broker_queue_depth(queue: str) -> int:
+    """
+    Returns the number of messages waiting in a broker queue; a queue the
+    broker does not know holds none (Redis deletes a list once it drains).
+    """
+    with celery_app.connection_or_acquire() as conn:
+        conn.ensure_connection(max_retries=1)
+        try:
+            return conn.default_channel.queue_declare(queue=queue, passive=True).message_count
+        except ChannelError as e:
+            if str(e.reply_code) == "404":
+                return 0
+            raise
+
+
+def worker_task_counts(timeout: float = 1.0) -> dict:
+    """
+    Returns reserved and active task counts summed over all workers.
+    """
+    inspect = celery_app.control.inspect(timeout=timeout)
+    counts = {}
+    for state, fetch in (("reserved", inspect.reserved), ("active", inspect.active)):
+        replies = fetch() or {}
+        counts[state] = sum(len(tasks) for tasks in replies.values())
+    return counts
+
+
+class QueueDepthSampler:
+    """
+    Daemon thread that refreshes the queue gauges every `interval` seconds.
+    """
+
+    def __init__(self, queues: List[str], interval: float, inspect_workers: bool = True):
+        self.queues = queues
+        self.interval = interval
+        self.inspect_workers = inspect_workers
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self):
+        for queue in self.queues:
+            try:
+                QUEUE_DEPTH.labels(queue=queue).set(broker_queue_depth(queue))
+            except Exception as e:
+                logger.warning(f"Could not read depth of queue '{queue}': {e}")
+        if self.inspect_workers:
+            try:
+                for state, count in worker_task_counts().items():
+                    WORKER_TASKS.labels(state=state).set(count)
+            except Exception as e:
+                logger.warning(f"Could not inspect workers: {e}")
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="queue-depth-sampler", daemon=True)
+        self._thread.start()
+        logger.info(f"Sampling queues {self.queues} every {self.interval}s")
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+
+_sampler: Optional[QueueDepthSampler] = None
+
+
+def get_sampler() -> QueueDepthSampler:
+    """
+    Returns the process-wide sampler configured from the environment.
+    """
+    global _sampler
+    if _sampler is None:
+        _sampler = QueueDepthSampler(QUEUE_SAMPLE_QUEUES, QUEUE_SAMPLE_INTERVAL, QUEUE_SAMPLE_INSPECT)
+    return _sampler
@@ -0,0 +1,145 @@
+"""
+Deduplication cache for classification results, keyed by image content hash,
+model name and (when not TOP_K) the number of labels. Tier 1 is an in-process LRU with TTL, filled by
+the worker that ran the classification; tier 2 is an optional Redis instance shared by the API and every
+worker, and the only one the API's submission-time check can hit.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from prometheus_client import Counter
+
+from utils.config import (
+    MODEL_NAME,
+    RESULT_CACHE_ENABLED,
+    RESULT_CACHE_SIZE,
+    RESULT_CACHE_TTL,
+    RESULT_CACHE_REDIS_URL,
+    TOP_K,
+)
+from utils.logger import logger
+
+RESULT_CACHE_HITS = Counter("result_cache_hits_total", "Result cache hits", ["tier"])
+RESULT_CACHE_MISSES = Counter("result_cache_misses_total", "Result cache misses")
+RESULT_CACHE_EVICTIONS = Counter("result_cache_evictions_total", "Entries evicted from the in-process cache")
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU with per-entry expiry.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                RESULT_CACHE_EVICTIONS.inc()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_local = LRUCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
+
+# Lazily created Redis client for the shared tier
+_redis = None
+
+
+def _get_redis():
+    global _redis
+    if _redis is None and RESULT_CACHE_REDIS_URL:
+        import redis
+        _redis = redis.Redis.from_url(RESULT_CACHE_REDIS_URL)
+    return _redis
+
+
+def _key(digest: str, model_name: str, top_k: int = TOP_K) -> str:
+    if top_k != TOP_K:
+        return f"result-cache:{model_name}:top{top_k}:{digest}"
+    return f"result-cache:{model_name}:{digest}"
+
+
+def get_cached(
+    digest: Optional[str],
+    model_name: str = MODEL_NAME,
+    top_k: int = TOP_K,
+    record_miss: bool = True,
+) -> Optional[list]:
+    """
+    Looks up a cached classification; returns None on a miss or when disabled.
+    Shared-tier errors are logged and treated as misses. Workers re-checking an
+    image the submitter already missed on pass record_miss=False, so every
+    image counts at most one miss.
+    """
+    if not RESULT_CACHE_ENABLED or not digest:
+        return None
+    key = _key(digest, model_name, top_k)
+
+    value = _local.get(key)
+    if value is not None:
+        RESULT_CACHE_HITS.labels(tier="local").inc()
+        return value
+
+    client = _get_redis()
+    if client is not None:
+        try:
+            raw = client.get(key)
+        except Exception as e:
+            logger.warning(f"Result cache lookup failed: {e}")
+            raw = None
+        if raw is not None:
+            value = json.loads(raw)
+            _local.set(key, value)
+            RESULT_CACHE_HITS.labels(tier="redis").inc()
+            return value
+
+    if record_miss:
+        RESULT_CACHE_MISSES.inc()
+    return None
+
+
+def set_cached(digest: Optional[str], classification: list, model_name: str = MODEL_NAME, top_k: int = TOP_K):
+    """
+    Stores a classification in every enabled tier.
+    """
+    if not RESULT_CACHE_ENABLED or not digest:
+        return
+    key = _key(digest, model_name, top_k)
+    _local.set(key, classification)
+
+    client = _get_redis()
+    if client is not None:
+        try:
+            client.set(key, json.dumps(classification), ex=RESULT_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Result cache store failed: {e}")
@@ -0,0 +1,134 @@
+"""
+Bulk task-state lookups and completion streaming on the Celery result backend.
+
+With the Redis backend, states for many tasks are read with one MGET, and
+completions are pushed through the pub/sub message Celery publishes on each
+task's result key whenever its state is stored.
+"""
+
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from celery import states
+from celery.backends.redis import RedisBackend
+from celery.result import GroupResult
+
+from services.celery_worker import celery_app
+from utils.config import CELERY_RESULT_BACKEND
+from utils.logger import logger
+
+# Lazily created asyncio Redis client for pub/sub on the result backend
+_async_redis = None
+
+
+def supports_streaming() -> bool:
+    """
+    True when the result backend is Redis, which publishes every stored state.
+    """
+    return isinstance(celery_app.backend, RedisBackend)
+
+
+def get_async_redis():
+    """
+    Returns the process-wide asyncio client for the Celery result backend.
+    """
+    global _async_redis
+    if _async_redis is None:
+        import redis.asyncio as aioredis
+        _async_redis = aioredis.from_url(CELERY_RESULT_BACKEND)
+        logger.info("Connected async Redis client to result backend")
+    return _async_redis
+
+
+def _decode(value) -> dict:
+    if not value:
+        return {"status": states.PENDING, "result": None}
+    return celery_app.backend.decode_result(value)
+
+
+def fetch_states(task_ids: List[str]) -> Dict[str, dict]:
+    """
+    Returns {task_id: {"status", "result"}} for every id. The Redis backend is
+    read with a single MGET; other backends fall back to one lookup per task.
+    Unknown ids report PENDING, as AsyncResult does.
+    """
+    task_ids = list(dict.fromkeys(task_ids))
+    if not task_ids:
+        return {}
+    backend = celery_app.backend
+    if not isinstance(backend, RedisBackend):
+        return {
+            task_id: {"status": res.state, "result": res.result}
+            for task_id, res in ((t, celery_app.AsyncResult(t)) for t in task_ids)
+        }
+
+    values = backend.mget([backend.get_key_for_task(t) for t in task_ids])
+    return {task_id: _decode(value) for task_id, value in zip(task_ids, values)}
+
+
+def batch_task_ids(batch_id: str) -> Optional[List[str]]:
+    """
+    Returns the task ids saved for a batch by submit_batch, or None if unknown.
+    """
+    group_result = GroupResult.restore(batch_id, app=celery_app)
+    if group_result is None:
+        return None
+    return [res.id for res in group_result.results]
+
+
+async def watch_states(
+    task_ids: List[str],
+    timeout: float,
+    heartbeat: Optional[float] = None,
+) -> AsyncIterator[Tuple[Optional[str], Optional[dict]]]:
+    """
+    Yields (task_id, meta) once per task as it reaches a ready state, until all
+    are ready or `timeout` seconds pass. Tasks that are already finished are
+    yielded first. With `heartbeat`, (None, None) is yielded after that many
+    seconds without a completion so callers can keep connections alive.
+    Waits on Redis pub/sub; requires supports_streaming().
+    """
+    backend = celery_app.backend
+    channels = {backend.get_key_for_task(t): t for t in dict.fromkeys(task_ids)}
+    pending = set(channels.values())
+    if not pending:
+        return
+
+    client = get_async_redis()
+    pubsub = client.pubsub()
+    try:
+        # Subscribe before reading current states so no completion falls in between
+        await pubsub.subscribe(*channels)
+        keys = list(channels)
+        for key, value in zip(keys, await client.mget(keys)):
+            meta = _decode(value)
+            if meta["status"] in states.READY_STATES:
+                pending.discard(channels[key])
+                yield channels[key], meta
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        last_event = loop.time()
+        while pending:
+            now = loop.time()
+            if now >= deadline:
+                return
+            wait = min(deadline - now, heartbeat) if heartbeat else deadline - now
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=wait)
+            if message is None:
+                # Also returned right away for subscribe confirmations
+                if heartbeat and loop.time() - last_event >= heartbeat and loop.time() < deadline:
+                    last_event = loop.time()
+                    yield None, None
+                continue
+            task_id = channels.get(message["channel"])
+            if task_id not in pending:
+                continue
+            meta = _decode(message["data"])
+            if meta["status"] in states.READY_STATES:
+                pending.discard(task_id)
+                last_event = loop.time()
+                yield task_id, meta
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
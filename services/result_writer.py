@@ -0,0 +1,77 @@
+"""
+Write-behind results sink: buffers result rows from concurrent tasks and
+flushes them to the results table as one multi-row INSERT per batch.
+
+Durability: submitters block on their row's Future until the batch holding it
+has committed. Combined with task_acks_late, a task (and its broker message)
+is only acknowledged after its row is durable, so a crash loses nothing that
+was acked; unflushed rows are redelivered and written again.
+"""
+
+from typing import List, Optional
+
+from prometheus_client import Counter
+
+from services.db import get_engine, RESULTS
+from utils.batching import MicroBatcher
+from utils.config import RESULT_BATCH_SIZE, RESULT_BATCH_WAIT_MS
+from utils.logger import logger
+
+RESULT_ROWS_WRITTEN = Counter("result_rows_written_total", "Result rows committed to the database")
+RESULT_BATCH_FALLBACKS = Counter(
+    "result_batch_fallback_total", "Result batches retried row by row after a failed bulk insert"
+)
+
+
+def _insert(rows: List[dict]):
+    with get_engine().begin() as conn:
+        # A list of parameter sets compiles to a multi-row INSERT (insertmanyvalues)
+        conn.execute(RESULTS.insert(), rows)
+    RESULT_ROWS_WRITTEN.inc(len(rows))
+
+
+def write_results(rows: List[dict]) -> list:
+    """
+    Inserts rows in a single transaction and returns one entry per row: the
+    task_id on success or the Exception that prevented the write.
+
+    If the bulk insert fails (e.g. one duplicate task_id), rows are retried
+    individually so only the offending rows fail.
+    """
+    try:
+        _insert(rows)
+        logger.debug(f"Flushed {len(rows)} result rows")
+        return [row["task_id"] for row in rows]
+    except Exception as e:
+        if len(rows) == 1:
+            return [e]
+        RESULT_BATCH_FALLBACKS.inc()
+        logger.warning(f"Bulk insert of {len(rows)} rows failed ({e}); retrying row by row")
+
+    outcomes: list = []
+    for row in rows:
+        try:
+            _insert([row])
+            outcomes.append(row["task_id"])
+        except Exception as row_error:
+            outcomes.append(row_error)
+    return outcomes
+
+
+# Lazily created so only processes that store results start the flusher thread
+_writer: Optional[MicroBatcher] = None
+
+
+def get_result_writer() -> MicroBatcher:
+    """
+    Returns the process-wide batcher feeding write_results.
+    """
+    global _writer
+    if _writer is None:
+        _writer = MicroBatcher(
+            write_results,
+            max_batch_size=RESULT_BATCH_SIZE,
+            max_wait_ms=RESULT_BATCH_WAIT_MS,
+            name="result_writer",
+        )
+    return _writer
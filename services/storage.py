@@ -1,4 +1,6 @@
 import io
+import hashlib
+from typing import BinaryIO, NamedTuple, Optional
 from urllib.parse import urlparse
 from minio import Minio
 from minio.error import S3Error
@@ -8,8 +10,55 @@ from utils.config import (
     MINIO_ACCESS_KEY,
     MINIO_SECRET_KEY,
     MINIO_BUCKET,
+    MINIO_PART_SIZE,
+    MAX_UPLOAD_SIZE,
 )
 
+class UploadTooLarge(ValueError):
+    """Raised when a streamed upload exceeds the configured size limit."""
+
+
+class StoredObject(NamedTuple):
+    url: str
+    size: int
+    sha256: str
+    data: Optional[bytes] = None  # the upload's bytes, when kept (see upload_stream)
+
+
+class _HashingReader:
+    """
+    File-like wrapper that hashes and counts bytes as MinIO reads them and
+    aborts once more than max_size bytes have been read. Keeps the bytes read
+    while they total at most keep_bytes.
+    """
+
+    def __init__(self, stream: BinaryIO, max_size: Optional[int], keep_bytes: int = 0):
+        self._stream = stream
+        self._max_size = max_size
+        self._hash = hashlib.sha256()
+        self._keep_bytes = keep_bytes
+        self._kept: Optional[list] = [] if keep_bytes > 0 else None
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._stream.read(size)
+        self.size += len(chunk)
+        if self._max_size is not None and self.size > self._max_size:
+            raise UploadTooLarge(f"Upload exceeds {self._max_size} bytes")
+        self._hash.update(chunk)
+        if self._kept is not None:
+            if self.size <= self._keep_bytes:
+                self._kept.append(chunk)
+            else:
+                self._kept = None
+        return chunk
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+    def kept(self) -> Optional[bytes]:
+        return b"".join(self._kept) if self._kept is not None else None
+
 # Global client cache
 _client = None
 _host = None
@@ -91,3 +140,80 @@ def upload_image(image_bytes: bytes, object_name: str, content_type: str = "imag
         raise
 
     return f"http://{host}:{port}/{MINIO_BUCKET}/{object_name}"
+
+def upload_stream(
+    stream: BinaryIO,
+    object_name: str,
+    content_type: str = "image/jpeg",
+    max_size: Optional[int] = MAX_UPLOAD_SIZE,
+    keep_bytes: int = 0,
+) -> StoredObject:
+    """
+    Stream a file object to MinIO as a multipart upload of unknown length,
+    computing its size and SHA-256 on the way without buffering it in memory.
+    Uploads of at most keep_bytes are also returned in StoredObject.data, so
+    callers need not read them a second time.
+    """
+    if not isinstance(MINIO_BUCKET, str) or not MINIO_BUCKET:
+        raise ValueError("MINIO_BUCKET must be a non-empty string")
+    logger.info(f"Streaming '{object_name}' to bucket '{MINIO_BUCKET}'")
+    reader = _HashingReader(stream, max_size, keep_bytes)
+
+    client, host, port = get_minio_client()
+
+    try:
+        client.put_object(
+            MINIO_BUCKET,
+            object_name,
+            data=reader,
+            length=-1,
+            part_size=MINIO_PART_SIZE,
+            content_type=content_type,
+        )
+        logger.debug(f"Uploaded {object_name} ({reader.size} bytes)")
+    except S3Error as e:
+        logger.error(f"Failed to upload '{object_name}': {e}")
+        raise
+
+    return StoredObject(
+        url=f"http://{host}:{port}/{MINIO_BUCKET}/{object_name}",
+        size=reader.size,
+        sha256=reader.hexdigest(),
+        data=reader.kept(),
+    )
+
+def download_image(object_name: str) -> bytes:
+    """
+    Read an object from MinIO into memory.
+    """
+    if not isinstance(MINIO_BUCKET, str) or not MINIO_BUCKET:
+        raise ValueError("MINIO_BUCKET must be a non-empty string")
+    client, _, _ = get_minio_client()
+
+    response = None
+    try:
+        response = client.get_object(MINIO_BUCKET, object_name)
+        data = response.read()
+        logger.debug(f"Downloaded {object_name} ({len(data)} bytes)")
+        return data
+    except S3Error as e:
+        logger.error(f"Failed to download '{object_name}': {e}")
+        raise
+    finally:
+        if response is not None:
+            response.close()
+            response.release_conn()
+
+def delete_object(object_name: str):
+    """
+    Remove an object from MinIO.
+    """
+    if not isinstance(MINIO_BUCKET, str) or not MINIO_BUCKET:
+        raise ValueError("MINIO_BUCKET must be a non-empty string")
+    client, _, _ = get_minio_client()
+    try:
+        client.remove_object(MINIO_BUCKET, object_name)
+        logger.debug(f"Deleted {object_name}")
+    except S3Error as e:
+        logger.error(f"Failed to delete '{object_name}': {e}")
+        raise
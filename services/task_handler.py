@@ -4,20 +4,34 @@ Defines Celery tasks: preprocessing, classification, storage, webhook.
 
 import time
 import requests
-from celery import chain
+from contextlib import contextmanager
 from typing import Optional
-from prometheus_client import Counter, Histogram, Gauge
+from prometheus_client import Counter, Histogram
 
-from services.celery_worker import celery_app
-from core.classifier import preprocess_image, classify
+from services.celery_worker import celery_app, batching_allowed
+from core.classifier import preprocess_image, classify, get_batcher
+from core.model_registry import resolve_model
+from services.storage import download_image
+from services.claim_check import put_payload, get_payload, delete_payload
+from services.db import get_engine, RESULTS
+from services.result_writer import get_result_writer
+from services.result_cache import get_cached, set_cached
+from services.webhooks import get_dispatcher
+# Submission moved to the thin client; re-exported for existing callers
+from services.pipeline import build_pipeline, submit_pipeline, submit_batch  # noqa: F401
 from utils.logger import logger
-from utils.config import WEBHOOK_TIMEOUT
+from utils.config import (
+    WEBHOOK_TIMEOUT,
+    WEBHOOK_DISPATCHER,
+    INFERENCE_BATCH_SIZE,
+    RESULT_BATCH_SIZE,
+    TOP_K,
+)
 
 # Task metrics with labels
 TASK_SUCCESS = Counter("image_task_success_total", "Successful image tasks", ["task_name"])
 TASK_FAILURE = Counter("image_task_failure_total", "Failed image tasks", ["task_name"])
 TASK_LATENCY = Histogram("image_task_latency_seconds", "Latency of image tasks", ["task_name"])
-QUEUE_DEPTH = Gauge("celery_queue_depth", "Number of tasks in queue")
 
 # Webhook metrics
 WEBHOOK_SUCCESS = Counter("webhook_success_total", "Successful webhook sends")
@@ -25,6 +39,33 @@ WEBHOOK_FAILURE = Counter("webhook_failure_total", "Failed webhook sends")
 WEBHOOK_LATENCY = Histogram("webhook_latency_seconds", "Latency of webhook POST request")
 
 
+def _run_classification(
+    image_tensor: bytes,
+    content_hash: Optional[str] = None,
+    model_name: Optional[str] = None,
+    top_k: Optional[int] = None,
+    check_cache: bool = True,
+):
+    """
+    Classifies one tensor, re-checking the result cache first unless the
+    caller already did (check_cache=False), and caches the result.
+    """
+    model_name = resolve_model(model_name)
+    top_k = top_k or TOP_K
+    if check_cache:
+        # The submitter already counted this image's miss
+        cached = get_cached(content_hash, model_name, top_k, record_miss=False)
+        if cached is not None:
+            return cached
+    if INFERENCE_BATCH_SIZE > 1 and batching_allowed():
+        # Share one forward pass with other tasks running in this process
+        result = get_batcher(model_name).submit((image_tensor, top_k)).result()
+    else:
+        result = classify(image_tensor, model_name, top_k)
+    set_cached(content_hash, result, model_name, top_k)
+    return result
+
+
 @celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3})
 def preprocess(self, image_bytes: bytes):
     task_name = "preprocess"
@@ -42,12 +83,18 @@ def preprocess(self, image_bytes: bytes):
 
 
 @celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3})
-def classify_task(self, image_tensor):
+def classify_task(
+    self,
+    image_tensor,
+    content_hash: Optional[str] = None,
+    model_name: Optional[str] = None,
+    top_k: Optional[int] = None,
+):
     task_name = "classify_task"
     logger.info(f"[{self.request.id}] Classifying image")
     start = time.time()
     try:
-        result = classify(image_tensor)
+        result = _run_classification(image_tensor, content_hash, model_name, top_k)
         TASK_SUCCESS.labels(task_name=task_name).inc()
         return result
     except Exception as e:
@@ -57,38 +104,90 @@ def classify_task(self, image_tensor):
         TASK_LATENCY.labels(task_name=task_name).observe(time.time() - start)
 
 
-@celery_app.task(bind=True)
-def store_result(self, classification, metadata: dict):
+@celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3})
+def preprocess_object(self, object_name: str):
     """
-    Stores classification result in PostgreSQL and returns the full result.
+    Claim-check preprocess: reads the upload from MinIO and returns the key of the parked tensor.
     """
-    task_name = "store_result"
-    from sqlalchemy import create_engine, Table, Column, Integer, String, JSON, MetaData
-    from utils.config import DATABASE_URL
-
-    engine = create_engine(DATABASE_URL)
-    meta = MetaData()
-    results = Table(
-        "results", meta,
-        Column("id", Integer, primary_key=True),
-        Column("task_id", String, unique=True),
-        Column("payload", JSON),
-    )
-    meta.create_all(engine)
+    task_name = "preprocess_object"
+    logger.info(f"[{self.request.id}] Preprocessing object {object_name}")
+    start = time.time()
+    try:
+        result = put_payload(preprocess_image(download_image(object_name)))
+        TASK_SUCCESS.labels(task_name=task_name).inc()
+        return result
+    except Exception as e:
+        TASK_FAILURE.labels(task_name=task_name).inc()
+        raise self.retry(exc=e)
+    finally:
+        TASK_LATENCY.labels(task_name=task_name).observe(time.time() - start)
 
+
+@celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3})
+def classify_object(
+    self,
+    tensor_key: str,
+    content_hash: Optional[str] = None,
+    model_name: Optional[str] = None,
+    top_k: Optional[int] = None,
+):
+    """
+    Claim-check classify: loads the parked tensor, classifies it, then discards it.
+    """
+    task_name = "classify_object"
+    logger.info(f"[{self.request.id}] Classifying tensor {tensor_key}")
+    start = time.time()
+    try:
+        result = _run_classification(get_payload(tensor_key), content_hash, model_name, top_k)
+        TASK_SUCCESS.labels(task_name=task_name).inc()
+    except Exception as e:
+        TASK_FAILURE.labels(task_name=task_name).inc()
+        raise self.retry(exc=e)
+    finally:
+        TASK_LATENCY.labels(task_name=task_name).observe(time.time() - start)
+
+    # Only drop the tensor once classification succeeded so retries can re-read it
+    try:
+        delete_payload(tensor_key)
+    except Exception as e:
+        logger.warning(f"[{self.request.id}] Could not delete {tensor_key}: {e}")
+    return result
+
+
+def _persist_result(task_id: str, classification, metadata: dict) -> dict:
+    """
+    Writes one classification row to PostgreSQL and returns the stored payload.
+    With RESULT_BATCH_SIZE > 1, in a pool that runs tasks concurrently, the row
+    goes through the write-behind sink and this call returns only once its
+    batch has committed.
+    """
     full_result = {
-        "task_id": self.request.id,
+        "task_id": task_id,
         "metadata": metadata,
         "classification": classification
     }
 
+    if RESULT_BATCH_SIZE > 1 and batching_allowed():
+        get_result_writer().submit({"task_id": task_id, "payload": full_result}).result()
+        return full_result
+
+    with get_engine().begin() as conn:
+        ins = RESULTS.insert().values(task_id=task_id, payload=full_result)
+        conn.execute(ins)
+    return full_result
+
+
+@celery_app.task(bind=True)
+def store_result(self, classification, metadata: dict):
+    """
+    Stores classification result in PostgreSQL and returns the full result.
+    """
+    task_name = "store_result"
     start = time.time()
     try:
-        with engine.connect() as conn:
-            ins = results.insert().values(task_id=self.request.id, payload=full_result)
-            conn.execute(ins)
-            logger.info(f"[{self.request.id}] Stored result")
-            TASK_SUCCESS.labels(task_name=task_name).inc()
+        full_result = _persist_result(self.request.id, classification, metadata)
+        logger.info(f"[{self.request.id}] Stored result")
+        TASK_SUCCESS.labels(task_name=task_name).inc()
     except Exception as e:
         TASK_FAILURE.labels(task_name=task_name).inc()
         logger.error(f"[{self.request.id}] Failed to store result: {e}")
@@ -99,6 +198,60 @@ def store_result(self, classification, metadata: dict):
     return full_result
 
 
+@contextmanager
+def _stage(task_name: str):
+    """
+    Records a fused-pipeline stage under the same TASK_LATENCY label as its standalone task.
+    """
+    start = time.time()
+    try:
+        yield
+    finally:
+        TASK_LATENCY.labels(task_name=task_name).observe(time.time() - start)
+
+
+@celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3})
+def process_image(
+    self,
+    metadata: dict,
+    image_bytes: Optional[bytes] = None,
+    object_name: Optional[str] = None,
+    model_name: Optional[str] = None,
+    top_k: Optional[int] = None,
+):
+    """
+    Fused pipeline: decode, transform, infer and persist in one task invocation.
+    Takes either the raw image bytes or the MinIO object key of the upload.
+    """
+    task_name = "process_image"
+    logger.info(f"[{self.request.id}] Processing image (fused)")
+    start = time.time()
+    try:
+        content_hash = metadata.get("content_hash")
+        model_name = resolve_model(model_name)
+        classification = get_cached(content_hash, model_name, top_k or TOP_K, record_miss=False)
+        if classification is None:
+            with _stage("preprocess"):
+                if image_bytes is None:
+                    image_bytes = download_image(object_name)
+                image_tensor = preprocess_image(image_bytes)
+            with _stage("classify_task"):
+                classification = _run_classification(
+                    image_tensor, content_hash, model_name, top_k, check_cache=False
+                )
+        with _stage("store_result"):
+            full_result = _persist_result(self.request.id, classification, metadata)
+        logger.info(f"[{self.request.id}] Stored result")
+        TASK_SUCCESS.labels(task_name=task_name).inc()
+        return full_result
+    except Exception as e:
+        TASK_FAILURE.labels(task_name=task_name).inc()
+        logger.error(f"[{self.request.id}] Fused pipeline failed: {e}")
+        raise self.retry(exc=e)
+    finally:
+        TASK_LATENCY.labels(task_name=task_name).observe(time.time() - start)
+
+
 @celery_app.task(
     bind=True,
     autoretry_for=(Exception,),
@@ -108,16 +261,22 @@ def store_result(self, classification, metadata: dict):
 def send_webhook(self, full_result: dict, callback_url: str):
     """
     Sends classification result to callback_url, records metrics, and returns the payload.
+    With WEBHOOK_DISPATCHER=async the POST goes through the pooled dispatcher,
+    which may coalesce it with other results for the same URL.
     """
     task_name = "send_webhook"
     logger.info(f"[{self.request.id}] Sending webhook to {callback_url}")
     start = time.time()
     try:
-        resp = requests.post(callback_url, json=full_result, timeout=WEBHOOK_TIMEOUT)
-        resp.raise_for_status()
+        if WEBHOOK_DISPATCHER == "async":
+            status_code = get_dispatcher().submit(callback_url, full_result).result()
+        else:
+            resp = requests.post(callback_url, json=full_result, timeout=WEBHOOK_TIMEOUT)
+            resp.raise_for_status()
+            status_code = resp.status_code
         WEBHOOK_SUCCESS.inc()
         TASK_SUCCESS.labels(task_name=task_name).inc()
-        logger.info(f"[{self.request.id}] Webhook sent ({resp.status_code}) to {callback_url}")
+        logger.info(f"[{self.request.id}] Webhook sent ({status_code}) to {callback_url}")
     except Exception as e:
         WEBHOOK_FAILURE.inc()
         TASK_FAILURE.labels(task_name=task_name).inc()
@@ -128,30 +287,3 @@ def send_webhook(self, full_result: dict, callback_url: str):
         TASK_LATENCY.labels(task_name=task_name).observe(time.time() - start)
 
     return full_result
-
-
-def submit_pipeline(image_bytes: bytes, metadata: dict, callback_url: Optional[str] = None):
-    """
-    Orchestrates: preprocess -> classify -> store_result -> (optional send_webhook).
-    Returns AsyncResult for the final task so result() always holds full_result.
-    """
-    try:
-        reserved = celery_app.control.inspect().reserved() or {}
-        QUEUE_DEPTH.set(sum(len(v) for v in reserved.values()))
-    except Exception as e:
-        logger.warning(f"Could not inspect broker: {e}")
-
-    # Build the pipeline
-    workflow = chain(
-        preprocess.s(image_bytes),
-        classify_task.s(),
-        store_result.s(metadata)
-    )
-
-    if callback_url:
-        logger.info(f"Callback URL provided: {callback_url}")
-        workflow = workflow | send_webhook.s(callback_url)
-    else:
-        logger.info("No callback URL provided")
-
-    return workflow.apply_async()
@@ -0,0 +1,195 @@
+"""
+Pooled asynchronous webhook delivery. One asyncio loop per worker process
+sends every callback over a shared keep-alive connection pool, caps
+concurrent requests per destination host, and can coalesce results bound
+for the same URL into one POST.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from prometheus_client import Histogram
+
+from utils.config import (
+    WEBHOOK_TIMEOUT,
+    WEBHOOK_MAX_CONNECTIONS,
+    WEBHOOK_HOST_CONCURRENCY,
+    WEBHOOK_COALESCE_MS,
+    WEBHOOK_COALESCE_MAX,
+)
+from utils.logger import logger
+
+WEBHOOK_BATCH_SIZE = Histogram(
+    "webhook_batch_size",
+    "Results delivered per webhook POST",
+    buckets=(1, 2, 5, 10, 20, 50, 100),
+)
+
+
+class WebhookDispatcher:
+    """
+    Background event loop that POSTs JSON payloads with httpx.
+
+    `submit` is thread-safe and returns a Future resolving to the HTTP status
+    code, or raising on connection errors and non-2xx responses. With
+    `coalesce_ms` > 0, payloads for the same URL that arrive within that
+    window (up to `coalesce_max`) are sent together as {"results": [...]};
+    a lone payload is still sent as-is.
+    """
+
+    def __init__(
+        self,
+        timeout: float,
+        max_connections: int,
+        host_concurrency: int,
+        coalesce_ms: float = 0,
+        coalesce_max: int = 50,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.host_concurrency = host_concurrency
+        self.coalesce = max(coalesce_ms, 0) / 1000.0
+        self.coalesce_max = max(coalesce_max, 1)
+        self.transport = transport
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._pending: Dict[str, List[Tuple[Any, asyncio.Future]]] = {}
+        self._sends: set = set()
+
+    def submit(self, url: str, payload: Any) -> Future:
+        """
+        Schedule delivery of one JSON payload to `url`.
+        """
+        loop = self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(self._deliver(url, payload), loop)
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Send any coalesced payloads, wait for in-flight requests and close the pool.
+        """
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None or self._pid != os.getpid():
+                return
+            self._loop = self._thread = None
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            # Threads do not survive fork (Celery prefork), so restart per process
+            if self._loop is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return self._loop
+            self._pid = os.getpid()
+            self._host_limits = {}
+            self._pending = {}
+            self._sends = set()
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._run, args=(self._loop,), name="webhook-dispatcher", daemon=True
+            )
+            self._thread.start()
+            logger.info(
+                f"Started webhook dispatcher (max_connections={self.max_connections}, "
+                f"host_concurrency={self.host_concurrency}, coalesce={self.coalesce * 1000:.0f}ms)"
+            )
+            return self._loop
+
+    def _run(self, loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        # Created before the loop runs, so every scheduled delivery sees it
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            transport=self.transport,
+        )
+        loop.run_forever()
+        loop.close()
+
+    async def _deliver(self, url: str, payload: Any) -> int:
+        if self.coalesce <= 0:
+            return await self._post(url, payload, count=1)
+
+        future = asyncio.get_running_loop().create_future()
+        batch = self._pending.setdefault(url, [])
+        batch.append((payload, future))
+        if len(batch) == 1:
+            asyncio.get_running_loop().call_later(self.coalesce, self._flush, url, batch)
+        elif len(batch) >= self.coalesce_max:
+            self._flush(url, batch)
+        return await future
+
+    def _flush(self, url: str, batch: List[Tuple[Any, asyncio.Future]]):
+        # The timer of a batch that already went out on size must not cut the next one short
+        if self._pending.get(url) is not batch:
+            return
+        del self._pending[url]
+        send = asyncio.ensure_future(self._send_batch(url, batch))
+        self._sends.add(send)
+        send.add_done_callback(self._sends.discard)
+
+    async def _send_batch(self, url: str, batch: List[Tuple[Any, asyncio.Future]]):
+        payloads = [payload for payload, _ in batch]
+        body = payloads[0] if len(payloads) == 1 else {"results": payloads}
+        try:
+            status = await self._post(url, body, count=len(payloads))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for _, future in batch:
+            future.set_result(status)
+
+    async def _post(self, url: str, body: Any, count: int) -> int:
+        host = urlsplit(url).netloc
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.host_concurrency)
+        async with limit:
+            resp = await self._client.post(url, json=body)
+        resp.raise_for_status()
+        WEBHOOK_BATCH_SIZE.observe(count)
+        return resp.status_code
+
+    async def _shutdown(self):
+        for url, batch in list(self._pending.items()):
+            self._flush(url, batch)
+        if self._sends:
+            await asyncio.gather(*self._sends, return_exceptions=True)
+        await self._client.aclose()
+
+
+# Lazily created so only processes that send webhooks start the loop thread
+_dispatcher = None
+
+
+def get_dispatcher() -> WebhookDispatcher:
+    """
+    Returns the process-wide webhook dispatcher.
+    """
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = WebhookDispatcher(
+            timeout=WEBHOOK_TIMEOUT,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+            host_concurrency=WEBHOOK_HOST_CONCURRENCY,
+            coalesce_ms=WEBHOOK_COALESCE_MS,
+            coalesce_max=WEBHOOK_COALESCE_MAX,
+        )
+    return _dispatcher
@@ -25,6 +25,26 @@ def dummy_metadata():
 def dummy_result():
     return {"top5": [("goldfish", 0.99)]}
 
+@pytest.fixture
+def tiny_model():
+    """
+    Factory for a small seeded conv net standing in for the torchvision
+    model; every call builds a fresh, identically initialized copy.
+    """
+    import torch
+
+    def build():
+        torch.manual_seed(0)
+        return torch.nn.Sequential(
+            torch.nn.Conv2d(3, 8, 3, stride=4),
+            torch.nn.BatchNorm2d(8),
+            torch.nn.ReLU(),
+            torch.nn.AdaptiveAvgPool2d(1),
+            torch.nn.Flatten(),
+            torch.nn.Linear(8, 10),
+        ).eval()
+    return build
+
 # --- Custom pytest fixtures for integration tests (Environment Setup) ---
 
 @pytest.fixture(scope="session", autouse=True)
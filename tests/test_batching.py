@@ -0,0 +1,75 @@
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.batching import MicroBatcher
+
+# --- Tests for MicroBatcher ---
+
+def test_batcher_groups_concurrent_items():
+    """Items submitted together should be dispatched in a single handler call."""
+    calls = []
+    release = threading.Event()
+
+    def handler(items):
+        release.wait(1)
+        calls.append(list(items))
+        return [i * 2 for i in items]
+
+    batcher = MicroBatcher(handler, max_batch_size=4, max_wait_ms=200, name="test-group")
+    futures = [batcher.submit(i) for i in range(4)]
+    release.set()
+
+    assert [f.result(timeout=2) for f in futures] == [0, 2, 4, 6]
+    assert calls == [[0, 1, 2, 3]]
+    batcher.stop(timeout=2)
+
+def test_batcher_dispatches_partial_batch_after_wait():
+    """A lone item should not wait for the batch to fill beyond max_wait_ms."""
+    batcher = MicroBatcher(lambda items: items, max_batch_size=64, max_wait_ms=5, name="test-wait")
+    assert batcher.submit("x").result(timeout=2) == "x"
+    batcher.stop(timeout=2)
+
+def test_batcher_splits_at_max_batch_size():
+    """No dispatched batch should exceed max_batch_size."""
+    sizes = []
+
+    def handler(items):
+        sizes.append(len(items))
+        return items
+
+    batcher = MicroBatcher(handler, max_batch_size=3, max_wait_ms=50, name="test-split")
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda i: batcher.submit(i).result(timeout=2), range(10)))
+
+    assert results == list(range(10))
+    assert sum(sizes) == 10
+    assert max(sizes) <= 3
+    batcher.stop(timeout=2)
+
+def test_batcher_per_item_exception():
+    """An Exception returned for one item fails only that item's future."""
+    def handler(items):
+        return [ValueError("bad") if i == "bad" else i for i in items]
+
+    batcher = MicroBatcher(handler, max_batch_size=2, max_wait_ms=100, name="test-item-error")
+    good, bad = batcher.submit("ok"), batcher.submit("bad")
+
+    assert good.result(timeout=2) == "ok"
+    with pytest.raises(ValueError, match="bad"):
+        bad.result(timeout=2)
+    batcher.stop(timeout=2)
+
+def test_batcher_handler_failure_propagates():
+    """If the handler raises, every future in the batch receives the error."""
+    def handler(items):
+        raise RuntimeError("model down")
+
+    batcher = MicroBatcher(handler, max_batch_size=2, max_wait_ms=5, name="test-fail")
+    with pytest.raises(RuntimeError, match="model down"):
+        batcher.submit(1).result(timeout=2)
+    batcher.stop(timeout=2)
+
+def test_batcher_rejects_invalid_size():
+    with pytest.raises(ValueError):
+        MicroBatcher(lambda items: items, max_batch_size=0, max_wait_ms=1)
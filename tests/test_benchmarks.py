@@ -0,0 +1,89 @@
+import hashlib
+import io
+import json
+from unittest import mock
+
+import pytest
+from PIL import Image
+from sqlalchemy import func, select
+
+from benchmarks import harness, standins
+from benchmarks.__main__ import main
+from benchmarks.suites import BenchContext, bench_store_result
+from services import db
+
+
+@pytest.fixture
+def local_engine(monkeypatch):
+    # use_database installs a process engine; restore the previous one afterwards
+    monkeypatch.setattr(db, "_engine", None)
+    monkeypatch.setattr(db, "_engine_pid", None)
+
+
+def test_summarize_reports_throughput_and_percentiles():
+    stats = harness.summarize([0.01] * 98 + [0.1, 0.2], items_per_call=2)
+
+    assert stats["calls"] == 100 and stats["images"] == 200
+    assert stats["images_per_sec"] == pytest.approx(200 / 1.28)
+    assert stats["p50_ms"] == pytest.approx(10)
+    assert stats["p99_ms"] > stats["p95_ms"] >= stats["p50_ms"]
+    assert stats["max_ms"] == pytest.approx(200)
+
+
+def test_synthetic_image_has_requested_size():
+    data = harness.synthetic_image(*harness.parse_resolution("320x240"))
+    assert Image.open(io.BytesIO(data)).size == (320, 240)
+    assert data == harness.synthetic_image(320, 240)
+
+
+@pytest.mark.parametrize("value", ["640", "axb", "0x10"])
+def test_parse_resolution_rejects_malformed(value):
+    with pytest.raises(ValueError):
+        harness.parse_resolution(value)
+
+
+def test_compare_flags_throughput_and_tail_regressions():
+    def result(**results):
+        return {"results": {
+            name: {"images_per_sec": ips, "p50_ms": p95 / 2, "p95_ms": p95} for name, (ips, p95) in results.items()
+        }}
+
+    base = result(a=(100, 10), b=(100, 10), c=(100, 10), gone=(1, 1))
+    new = result(a=(95, 10.5), b=(80, 10), c=(100, 12))
+
+    rows = {row["name"]: row for row in harness.compare(base, new, threshold=10)}
+    assert set(rows) == {"a", "b", "c"}
+    assert not rows["a"]["regressed"]
+    assert rows["b"]["regressed"] and rows["b"]["images_per_sec"][2] == -20.0
+    assert rows["c"]["regressed"]
+
+
+def test_store_result_benchmark_writes_to_sqlite(tmp_path, local_engine):
+    database = standins.use_database("sqlite", str(tmp_path))
+    ctx = BenchContext(images={}, iterations=3, warmup=1, batch_size=1, database=database)
+
+    results = bench_store_result(ctx)
+
+    assert results["store_result/sqlite"]["calls"] == 3
+    with db.get_engine().connect() as conn:
+        assert conn.execute(select(func.count()).select_from(db.RESULTS)).scalar() == 4
+
+
+def test_upload_standin_hashes_the_stream():
+    stored = standins.upload_stream(io.BytesIO(b"image-bytes"), "a.jpg")
+    assert stored.size == 11
+    assert stored.sha256 == hashlib.sha256(b"image-bytes").hexdigest()
+
+
+def test_run_writes_json_results(tmp_path, local_engine):
+    output = tmp_path / "results.json"
+    with mock.patch("benchmarks.standins.use_broker"):
+        main([
+            "run", "--suites", "preprocess", "--resolutions", "64x48,32x32",
+            "--iterations", "2", "--warmup", "0", "--output", str(output),
+        ])
+
+    report = json.loads(output.read_text())
+    assert set(report["results"]) == {"preprocess_image/64x48", "preprocess_image/32x32"}
+    assert report["parameters"]["database"] == "sqlite"
+    assert "commit" in report["environment"]
@@ -0,0 +1,53 @@
+import pytest
+from unittest import mock
+
+from services import claim_check
+
+# --- Fixtures ---
+
+@pytest.fixture
+def local_store(monkeypatch, tmp_path):
+    monkeypatch.setattr("services.claim_check.CLAIM_CHECK_STORE", "local")
+    monkeypatch.setattr("services.claim_check.CLAIM_CHECK_DIR", str(tmp_path))
+    return tmp_path
+
+# --- Tests for claim-check store ---
+
+def test_local_roundtrip(local_store):
+    """Payload written to the local store can be read back and deleted."""
+    key = claim_check.put_payload(b"tensor-bytes")
+    assert key.startswith("local:")
+    assert claim_check.get_payload(key) == b"tensor-bytes"
+
+    claim_check.delete_payload(key)
+    assert list(local_store.iterdir()) == []
+
+def test_local_delete_missing_is_ignored(local_store):
+    claim_check.delete_payload("local:missing.bin")
+
+def test_minio_store_uses_storage(monkeypatch):
+    """MinIO-backed keys go through the storage helpers under the tensors/ prefix."""
+    monkeypatch.setattr("services.claim_check.CLAIM_CHECK_STORE", "minio")
+    with mock.patch("services.claim_check.upload_image") as up, \
+         mock.patch("services.claim_check.download_image", return_value=b"data") as down, \
+         mock.patch("services.claim_check.delete_object") as rm:
+        key = claim_check.put_payload(b"data")
+        assert key.startswith("minio:tensors/")
+        object_name = key.split(":", 1)[1]
+        up.assert_called_once_with(b"data", object_name, content_type="application/octet-stream")
+
+        assert claim_check.get_payload(key) == b"data"
+        down.assert_called_once_with(object_name)
+
+        claim_check.delete_payload(key)
+        rm.assert_called_once_with(object_name)
+
+@pytest.mark.parametrize("key", ["nokey", "ftp:thing", "local:../etc/passwd", "minio:"])
+def test_invalid_keys_rejected(key):
+    with pytest.raises(ValueError, match="Invalid claim-check key"):
+        claim_check.get_payload(key)
+
+def test_unsupported_store(monkeypatch):
+    monkeypatch.setattr("services.claim_check.CLAIM_CHECK_STORE", "s4")
+    with pytest.raises(ValueError, match="Unsupported CLAIM_CHECK_STORE"):
+        claim_check.put_payload(b"x")
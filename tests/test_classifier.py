@@ -19,10 +19,12 @@ def dummy_image_bytes():
 # --- Tests for classifier module ---
 
 def test_preprocess_image_shape(dummy_image_bytes):
-    """Ensure preprocess_image returns a tensor with shape (1, 3, 224, 224)."""
+    """Ensure preprocess_image returns a versioned uint8 (224, 224, 3) tensor."""
     tensor_bytes = classifier.preprocess_image(dummy_image_bytes)
-    array = np.frombuffer(tensor_bytes, dtype=np.float32).reshape(1, 3, 224, 224)
-    assert array.shape == (1, 3, 224, 224)
+    array = classifier.unpack_tensor(tensor_bytes)
+    assert array.shape == (224, 224, 3)
+    assert array.dtype == np.uint8
+    assert len(tensor_bytes) < 224 * 224 * 3 + 32
 
 def test_classify_returns_top5_format(dummy_image_bytes):
     """
@@ -48,3 +50,175 @@ def test_get_model_invalid(mock_getattr):
     """
     with pytest.raises(AttributeError, match="Model not found"):
         classifier.get_model()
+
+def test_weights_name_resolves_torchvision_enum():
+    """resnet18's enum is ResNet18_Weights, not RESNET18_Weights."""
+    assert classifier.weights_name("resnet18") == "ResNet18_Weights.IMAGENET1K_V1"
+    assert classifier.weights_name("not_a_model") is None
+
+def test_get_model_loads_default_weights():
+    from torchvision.models import ResNet18_Weights
+    with mock.patch("torchvision.models.resnet18") as build:
+        classifier.get_model("resnet18")
+    build.assert_called_once_with(weights=ResNet18_Weights.DEFAULT)
+
+def test_classify_batch_single_forward_pass(dummy_image_bytes):
+    """classify_batch should run one forward pass and return one result per input."""
+    tensor_bytes = classifier.preprocess_image(dummy_image_bytes)
+
+    torch.manual_seed(0)
+    mock_logits = torch.randn(3, 1000)
+    with mock.patch.object(classifier.MODEL, 'forward', return_value=mock_logits) as fwd:
+        results = classifier.classify_batch([tensor_bytes, tensor_bytes, tensor_bytes])
+
+    assert fwd.call_count == 1
+    assert fwd.call_args[0][0].shape == (3, 3, 224, 224)
+    assert len(results) == 3
+    assert all(len(r) == 5 for r in results)
+
+def test_classify_batch_isolates_bad_payload(dummy_image_bytes):
+    """A malformed payload is returned as an exception without failing the batch."""
+    tensor_bytes = classifier.preprocess_image(dummy_image_bytes)
+    results = classifier.classify_batch([b"garbage", tensor_bytes])
+
+    assert isinstance(results[0], Exception)
+    assert len(results[1]) == 5
+
+def test_classify_task_uses_batcher(dummy_image_bytes):
+    """With batching enabled, classify_task routes through the shared batcher."""
+    from services import task_handler
+
+    tensor_bytes = classifier.preprocess_image(dummy_image_bytes)
+    with mock.patch("services.task_handler.INFERENCE_BATCH_SIZE", 8), \
+         mock.patch("services.task_handler.classify") as direct:
+        result = task_handler.classify_task.run(tensor_bytes)
+
+    direct.assert_not_called()
+    assert len(result) == 5
+
+# --- Tests for reduced-size JPEG decode ---
+
+def _large_jpeg(size=(2400, 1600)):
+    """Smooth synthetic photo-like JPEG, large enough for DCT downscaling."""
+    from PIL import Image
+    import io
+    w, h = size
+    x = np.linspace(0, 1, w, dtype=np.float32)[None, :]
+    y = np.linspace(0, 1, h, dtype=np.float32)[:, None]
+    rgb = np.stack([
+        128 + 100 * np.sin(6 * x + 2 * y),
+        128 + 100 * np.cos(4 * y - 3 * x),
+        255 * x * y,
+    ], axis=-1).clip(0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(rgb).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+def test_decode_image_uses_draft_for_large_jpeg():
+    """Large JPEGs decode at a reduced scale that still covers the resize target."""
+    img = classifier.decode_image(_large_jpeg())
+    assert img.mode == "RGB"
+    assert min(img.size) >= classifier.RESIZE_SIZE
+    assert img.size[0] < 2400 and img.size[1] < 1600
+
+def test_decode_image_full_size_when_disabled():
+    with mock.patch("core.preprocessing.FAST_DECODE", False):
+        img = classifier.decode_image(_large_jpeg())
+    assert img.size == (2400, 1600)
+
+def test_decode_image_keeps_small_images(dummy_image_bytes):
+    img = classifier.decode_image(dummy_image_bytes)
+    assert img.size == (224, 224)
+
+def test_fast_decode_accuracy_parity():
+    """Fast and full decode paths must produce near-identical model inputs and predictions."""
+    data = _large_jpeg()
+    fast_bytes = classifier.preprocess_image(data)
+    with mock.patch("core.preprocessing.FAST_DECODE", False):
+        full_bytes = classifier.preprocess_image(data)
+
+    fast = classifier.to_model_input([classifier.unpack_tensor(fast_bytes)]).flatten().numpy()
+    full = classifier.to_model_input([classifier.unpack_tensor(full_bytes)]).flatten().numpy()
+    assert np.abs(fast - full).mean() < 0.05
+    cosine = float(fast @ full / (np.linalg.norm(fast) * np.linalg.norm(full)))
+    assert cosine > 0.99
+
+    fast_top = [r["label"] for r in classifier.classify(fast_bytes)]
+    full_top = [r["label"] for r in classifier.classify(full_bytes)]
+    assert fast_top[0] == full_top[0]
+
+
+def test_classify_accepts_legacy_float32_payload(dummy_image_bytes):
+    """Bare float32 payloads from before the versioned format still classify."""
+    from core.classifier import TRANSFORM, decode_image
+
+    legacy = TRANSFORM(decode_image(dummy_image_bytes)).unsqueeze(0).numpy().tobytes()
+    current = classifier.preprocess_image(dummy_image_bytes)
+
+    legacy_top = classifier.classify(legacy)
+    current_top = classifier.classify(current)
+    assert [r["label"] for r in legacy_top] == [r["label"] for r in current_top]
+
+
+def test_inference_model_loads_once(monkeypatch):
+    """The model is built on first use and shared by later calls."""
+    from core.model_registry import ModelRegistry
+    monkeypatch.setattr("core.classifier.REGISTRY", ModelRegistry(classifier._load_model, 2))
+    with mock.patch("core.classifier.build_inference_model", return_value=(torch.nn.Linear(1, 1), "fp32")) as load:
+        model, mode = classifier.get_inference_model()
+        assert classifier.get_inference_model() == (model, mode)
+        assert classifier.ACTIVE_MODE == "fp32"
+    load.assert_called_once_with(model_name=classifier.MODEL_NAME)
+
+
+def test_unknown_model_rejected():
+    with pytest.raises(ValueError, match="Unknown model"):
+        classifier.get_inference_model("not_a_model")
+
+
+# --- Tests for postprocessing ---
+
+def _reference_topk(logits, k):
+    """Per-row loop the vectorized postprocess replaced."""
+    probs = torch.nn.functional.softmax(logits, dim=1)
+    top = probs.topk(k, dim=1)
+    return [
+        [{"label": classifier.LABELS[idx], "probability": float(prob)} for idx, prob in zip(top.indices[row], top.values[row])]
+        for row in range(logits.shape[0])
+    ]
+
+def test_postprocess_matches_per_row_loop():
+    torch.manual_seed(1)
+    logits = torch.randn(32, 1000)
+    assert classifier.postprocess(logits, 5) == _reference_topk(logits, 5)
+
+def test_postprocess_per_row_k():
+    torch.manual_seed(2)
+    logits = torch.randn(3, 1000)
+    results = classifier.postprocess(logits, [1, 10, 3])
+
+    assert [len(r) for r in results] == [1, 10, 3]
+    assert results[1] == _reference_topk(logits, 10)[1]
+    assert results[2] == _reference_topk(logits, 3)[2]
+
+def test_batcher_requests_carry_their_k(dummy_image_bytes):
+    tensor_bytes = classifier.preprocess_image(dummy_image_bytes)
+    results = classifier._classify_requests([(tensor_bytes, 2), (tensor_bytes, 7)], classifier.MODEL_NAME)
+    assert [len(r) for r in results] == [2, 7]
+
+def test_debug_results_not_formatted_when_disabled():
+    class Counted:
+        formatted = 0
+        def __format__(self, spec):
+            Counted.formatted += 1
+            return "counted"
+        __repr__ = __str__ = lambda self: format(self)
+
+    from loguru import logger
+    logger.disable("core.classifier")
+    try:
+        with mock.patch("core.classifier.classify_batch", return_value=[Counted()]):
+            classifier.classify(b"tensor")
+    finally:
+        logger.enable("core.classifier")
+    assert Counted.formatted == 0
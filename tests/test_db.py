@@ -0,0 +1,81 @@
+import pytest
+from unittest import mock
+
+from services import db
+
+# --- Fixtures ---
+
+@pytest.fixture(autouse=True)
+def reset_engine_globals():
+    """Reset the cached engine before and after each test."""
+    db._engine = None
+    db._engine_pid = None
+    yield
+    db._engine = None
+    db._engine_pid = None
+
+# --- Tests for get_engine() ---
+
+@mock.patch("services.db.create_engine")
+def test_get_engine_created_once(mock_create):
+    """Engine is created with pool settings once and reused afterwards."""
+    first = db.get_engine()
+    second = db.get_engine()
+
+    assert first is second
+    mock_create.assert_called_once()
+    kwargs = mock_create.call_args.kwargs
+    assert kwargs["pool_size"] == db.DB_POOL_SIZE
+    assert kwargs["max_overflow"] == db.DB_MAX_OVERFLOW
+    assert kwargs["pool_pre_ping"] is True
+
+@mock.patch("services.db.create_engine")
+def test_get_engine_recreated_after_fork(mock_create, monkeypatch):
+    """A child process drops the inherited engine without closing parent sockets."""
+    inherited = mock.MagicMock()
+    db._engine = inherited
+    db._engine_pid = -1  # pretend the engine was built by a parent process
+
+    engine = db.get_engine()
+
+    inherited.dispose.assert_called_once_with(close=False)
+    assert engine is mock_create.return_value
+
+@mock.patch("services.db.create_engine")
+def test_dispose_engine(mock_create):
+    engine = db.get_engine()
+    db.dispose_engine()
+
+    engine.dispose.assert_called_once_with(close=True)
+    assert db._engine is None
+
+def test_dispose_inherited_engine_keeps_parent_sockets():
+    inherited = mock.MagicMock()
+    db._engine, db._engine_pid = inherited, -1
+
+    db.dispose_engine()
+
+    inherited.dispose.assert_called_once_with(close=False)
+    assert db._engine is None
+
+@mock.patch("services.db.create_engine")
+def test_worker_shutdown_closes_pool(mock_create):
+    from services.celery_worker import close_db_pool
+
+    engine = db.get_engine()
+    close_db_pool()
+
+    engine.dispose.assert_called_once_with(close=True)
+    assert db._engine is None
+
+# --- Tests for schema bootstrap ---
+
+@mock.patch("services.db.create_engine")
+def test_init_schema_creates_tables(mock_create):
+    with mock.patch.object(db.metadata, "create_all") as create_all:
+        db.init_schema()
+    create_all.assert_called_once_with(mock_create.return_value)
+
+def test_results_table_schema():
+    assert db.RESULTS.name == "results"
+    assert {c.name for c in db.RESULTS.columns} == {"id", "task_id", "payload"}
@@ -0,0 +1,119 @@
+import io
+import json
+from unittest import mock
+
+import pytest
+import torch
+from PIL import Image
+
+from core import inference_modes
+from core.inference_modes import agreement, prepare_model, run_model
+
+
+@pytest.fixture
+def image_folder(tmp_path):
+    for i in range(3):
+        buf = io.BytesIO()
+        Image.new("RGB", (300, 260), (40 * i, 90, 200 - 30 * i)).save(buf, format="JPEG")
+        (tmp_path / f"img{i}.jpg").write_bytes(buf.getvalue())
+    (tmp_path / "notes.txt").write_text("not an image")
+    return tmp_path
+
+
+# --- Agreement ---
+
+def test_agreement_identical_logits():
+    logits = torch.randn(4, 10)
+    assert agreement(logits, logits) == {"top1": 1.0, "top5": 1.0}
+
+
+def test_agreement_partial_overlap():
+    reference = torch.arange(10, dtype=torch.float32).repeat(2, 1)   # top-5: 9..5
+    candidate = reference.clone()
+    candidate[1] = torch.arange(10, 0, -1, dtype=torch.float32)       # top-5: 0..4
+    result = agreement(reference, candidate)
+    assert result == {"top1": 0.5, "top5": 0.5}
+
+
+# --- Modes ---
+
+def test_channels_last_matches_fp32(tiny_model):
+    batch = torch.randn(2, 3, 64, 64)
+    reference = run_model(tiny_model(), batch, "fp32")
+
+    model, mode = prepare_model(tiny_model(), "channels_last")
+    assert mode == "channels_last"
+    assert torch.allclose(run_model(model, batch, mode), reference, atol=1e-5)
+
+
+def test_bf16_falls_back_without_native_support(tiny_model):
+    with mock.patch("core.inference_modes.bf16_supported", return_value=False):
+        _, mode = prepare_model(tiny_model(), "bf16")
+    assert mode == "fp32"
+
+
+def test_int8_falls_back_without_artifact(tmp_path, monkeypatch, tiny_model):
+    monkeypatch.setattr("core.inference_modes.QUANTIZED_MODEL_PATH", str(tmp_path / "missing.pt"))
+    with mock.patch("core.inference_modes.load_quantized", side_effect=FileNotFoundError("missing")):
+        _, mode = prepare_model(tiny_model(), "int8")
+    assert mode == "fp32"
+
+
+def test_unknown_mode_rejected(tiny_model):
+    with pytest.raises(ValueError):
+        prepare_model(tiny_model(), "fp8")
+
+
+# --- Static quantization ---
+
+def test_quantize_save_and_load_roundtrip(tmp_path, tiny_model):
+    model = tiny_model()
+    calibration = [torch.randn(4, 3, 224, 224) for _ in range(2)]
+    quantized = inference_modes.quantize_static(model, calibration)
+
+    path = str(tmp_path / "int8.pt")
+    inference_modes.save_quantized(quantized, path, images=8)
+    loaded = inference_modes.load_quantized(path)
+
+    batch = calibration[0]
+    logits = run_model(loaded, batch, "int8")
+    assert logits.shape == (4, 10)
+    assert logits.dtype == torch.float32
+    # The fp32 model is left untouched by quantization
+    assert torch.allclose(run_model(model, batch, "fp32"), run_model(tiny_model(), batch, "fp32"))
+
+
+def test_load_rejects_other_model(tmp_path, tiny_model):
+    quantized = inference_modes.quantize_static(tiny_model(), [torch.randn(2, 3, 224, 224)])
+    path = str(tmp_path / "int8.pt")
+    inference_modes.save_quantized(quantized, path, images=2)
+
+    with pytest.raises(ValueError, match="calibrated for"):
+        inference_modes.load_quantized(path, model_name="some_other_model")
+
+
+# --- CLI ---
+
+def test_image_batches_reads_only_images(image_folder):
+    batches = list(inference_modes.image_batches(str(image_folder), batch_size=2))
+    assert [b.shape[0] for b in batches] == [2, 1]
+    assert batches[0].shape[1:] == (3, 224, 224)
+
+
+def test_check_command_reports_agreement(image_folder, capsys, tiny_model):
+    with mock.patch("core.classifier.get_model", return_value=tiny_model()):
+        inference_modes.main(["check", "--images", str(image_folder), "--modes", "channels_last"])
+
+    report = json.loads(capsys.readouterr().out)
+    assert report["channels_last"]["mode"] == "channels_last"
+    assert report["channels_last"]["top1"] == 1.0
+    assert report["channels_last"]["images"] == 3
+
+
+def test_check_modes_converts_a_copy_per_mode(image_folder, tiny_model):
+    model = tiny_model()
+    with mock.patch("core.inference_modes.bf16_supported", return_value=False):
+        report = inference_modes.check_modes(model, str(image_folder), ["channels_last", "bf16"])
+
+    assert report["bf16"]["mode"] == "fp32"
+    assert all(p.is_contiguous() for p in model.parameters())
@@ -137,3 +137,21 @@ def test_main_execution(monkeypatch):
     finally:
         # Restore original __name__
         main.__name__ = original_name
+
+
+def test_api_import_does_not_load_torch():
+    """The API process submits by task name and never imports the model."""
+    import pathlib
+    import subprocess
+    import sys
+
+    code = (
+        "import sys, main; "
+        "print('LOADED=' + ','.join(m for m in ('torch', 'torchvision', 'core.classifier', 'services.task_handler') "
+        "if m in sys.modules))"
+    )
+    root = pathlib.Path(__file__).resolve().parent.parent
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    loaded = [line for line in out.stdout.splitlines() if line.startswith("LOADED=")]
+    assert loaded == ["LOADED="]
@@ -0,0 +1,87 @@
+import json
+from unittest import mock
+
+import pytest
+import torch
+
+from core import model_cache
+from core.inference_modes import run_model
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr("core.model_cache.MODEL_ARTIFACT_DIR", str(tmp_path))
+    monkeypatch.setattr("core.model_cache.MODEL_CACHE", "torchscript")
+    monkeypatch.setattr("core.model_cache.MODEL_CACHE_BUILD", True)
+    return tmp_path
+
+
+@pytest.mark.parametrize("mode", ["fp32", "channels_last"])
+def test_first_start_builds_then_reuses_artifact(cache_dir, mode, tiny_model):
+    build = mock.Mock(side_effect=tiny_model)
+    batch = torch.randn(2, 3, 224, 224)
+    expected = run_model(tiny_model(), batch, "fp32")
+
+    model, active = model_cache.load_model(build, mode, weights="W1")
+    assert active == mode
+    assert isinstance(model, torch.jit.ScriptModule)
+    assert (cache_dir / f"{model_cache.MODEL_NAME}_{mode}.ts").exists()
+
+    cached, _ = model_cache.load_model(build, mode, weights="W1")
+    assert build.call_count == 1
+    assert torch.allclose(run_model(cached, batch, mode), expected, atol=1e-4)
+
+
+def test_stale_artifact_is_rebuilt(cache_dir, caplog, tiny_model):
+    build = mock.Mock(side_effect=tiny_model)
+    model_cache.load_model(build, "fp32", weights="W1")
+
+    with caplog.at_level("WARNING"):
+        model_cache.load_model(build, "fp32", weights="W2")
+    assert "stale (weights changed)" in caplog.text
+    assert build.call_count == 2
+
+    path = model_cache.artifact_path("fp32")
+    extra = {"meta.json": ""}
+    torch.jit.load(path, _extra_files=extra)
+    assert json.loads(extra["meta.json"])["weights"] == "W2"
+
+
+def test_missing_artifact_without_build_serves_eager(cache_dir, monkeypatch, tiny_model):
+    monkeypatch.setattr("core.model_cache.MODEL_CACHE_BUILD", False)
+    model, active = model_cache.load_model(tiny_model, "fp32", weights=None)
+
+    assert active == "fp32"
+    assert not isinstance(model, torch.jit.ScriptModule)
+    assert not list(cache_dir.iterdir())
+
+
+def test_corrupt_artifact_falls_back(cache_dir):
+    (cache_dir / f"{model_cache.MODEL_NAME}_fp32.ts").write_bytes(b"not a model")
+    assert model_cache.load_artifact(model_cache.artifact_path("fp32"), model_cache.artifact_meta("fp32", None)) is None
+
+
+def test_cache_off_or_uncompilable_mode_uses_eager(cache_dir, monkeypatch, tiny_model):
+    with mock.patch("core.model_cache.build_prepared", side_effect=lambda build, mode, model_name: (build(), mode)):
+        model, active = model_cache.load_model(tiny_model, "bf16", weights=None)
+    assert active == "bf16"
+    assert not isinstance(model, torch.jit.ScriptModule)
+
+    monkeypatch.setattr("core.model_cache.MODEL_CACHE", "off")
+    model, _ = model_cache.load_model(tiny_model, "fp32", weights=None)
+    assert not isinstance(model, torch.jit.ScriptModule)
+
+
+def test_int8_does_not_build_eager_model(cache_dir):
+    build = mock.Mock()
+    with mock.patch("core.inference_modes.load_quantized", return_value="quantized"):
+        assert model_cache.load_model(build, "int8", weights=None) == ("quantized", "int8")
+    build.assert_not_called()
+
+
+def test_int8_fallback_builds_eager_model(cache_dir, tiny_model):
+    build = mock.Mock(side_effect=tiny_model)
+    with mock.patch("core.inference_modes.load_quantized", side_effect=FileNotFoundError("missing")):
+        model, active = model_cache.load_model(build, "int8", weights=None)
+    assert active == "fp32"
+    build.assert_called_once()
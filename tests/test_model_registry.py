@@ -0,0 +1,89 @@
+import threading
+import time
+from unittest import mock
+
+import pytest
+import torch
+
+from core.model_registry import ModelRegistry, model_bytes, resolve_model
+
+
+def _loader(sizes):
+    """Loader returning a Linear layer whose weights take `sizes[name]` floats."""
+    def load(name):
+        return torch.nn.Linear(sizes[name], 1, bias=False), "fp32"
+    return mock.Mock(side_effect=load)
+
+
+def test_model_bytes_counts_parameters_and_buffers():
+    model = torch.nn.Sequential(torch.nn.Linear(10, 10), torch.nn.BatchNorm1d(10))
+    # 110 + 20 parameters, 20 running stats (fp32) and one int64 counter
+    assert model_bytes(model) == (110 + 20 + 20) * 4 + 8
+
+
+def test_loaded_models_are_reused():
+    loader = _loader({"a": 4})
+    registry = ModelRegistry(loader, max_models=2)
+    first = registry.get("a")
+    assert registry.get("a") == first
+    loader.assert_called_once_with("a")
+
+
+def test_least_recently_used_model_is_evicted():
+    loader = _loader({"a": 4, "b": 4, "c": 4})
+    registry = ModelRegistry(loader, max_models=2)
+    registry.get("a")
+    registry.get("b")
+    registry.get("a")          # b is now the least recently used
+    registry.get("c")
+
+    assert registry.loaded() == ["a", "c"]
+    registry.get("b")
+    assert loader.call_count == 4
+
+
+def test_memory_budget_evicts_before_count_limit():
+    loader = _loader({"a": 1000, "b": 1000, "c": 10})
+    registry = ModelRegistry(loader, max_models=10, budget_bytes=6000)
+    registry.get("a")
+    registry.get("b")
+    assert registry.loaded() == ["b"]
+    registry.get("c")
+    assert registry.loaded() == ["b", "c"]
+
+
+def test_model_over_budget_still_served():
+    registry = ModelRegistry(_loader({"big": 10_000}), max_models=2, budget_bytes=100)
+    model, _ = registry.get("big")
+    assert registry.loaded() == ["big"]
+    assert model is not None
+
+
+def test_concurrent_requests_share_one_load():
+    def slow_load(name):
+        time.sleep(0.05)
+        return torch.nn.Linear(2, 1), "fp32"
+    loader = mock.Mock(side_effect=slow_load)
+    registry = ModelRegistry(loader, max_models=2)
+
+    threads = [threading.Thread(target=registry.get, args=("a",)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    loader.assert_called_once()
+
+
+def test_resolve_model(monkeypatch):
+    monkeypatch.setattr("core.model_registry.MODELS", ["resnet18", "resnet50"])
+    monkeypatch.setattr("core.model_registry.MODEL_NAME", "resnet18")
+    assert resolve_model(None) == "resnet18"
+    assert resolve_model("resnet50") == "resnet50"
+    with pytest.raises(ValueError):
+        resolve_model("vit_b_16")
+
+
+def test_model_bytes_counts_frozen_constants():
+    model = torch.nn.Sequential(torch.nn.Conv2d(3, 4, 3), torch.nn.ReLU()).eval()
+    frozen = torch.jit.freeze(torch.jit.trace(model, torch.zeros(1, 3, 8, 8)))
+    assert model_bytes(frozen) == model_bytes(model)
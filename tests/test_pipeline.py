@@ -0,0 +1,119 @@
+from unittest.mock import patch, MagicMock
+from services import pipeline
+
+
+# submit_pipeline
+
+def test_submit_pipeline_with_webhook(dummy_image_bytes, dummy_metadata):
+    """Test pipeline chaining with webhook step included."""
+    pipeline_result = pipeline.submit_pipeline(dummy_image_bytes, dummy_metadata, "https://callback")
+    assert pipeline_result is not None
+    assert hasattr(pipeline_result, "id")
+
+
+def test_submit_pipeline_without_webhook(dummy_image_bytes, dummy_metadata):
+    """Test pipeline chaining without webhook step."""
+    pipeline_result = pipeline.submit_pipeline(dummy_image_bytes, dummy_metadata)
+    assert pipeline_result is not None
+    assert hasattr(pipeline_result, "id")
+
+
+def test_build_pipeline_references_tasks_by_name(dummy_image_bytes, dummy_metadata):
+    """The chain names each stage without importing the task module."""
+    workflow = pipeline.build_pipeline(dummy_image_bytes, dummy_metadata, "https://callback")
+
+    assert [s.task for s in workflow.tasks] == [
+        "services.task_handler.preprocess",
+        "services.task_handler.classify_task",
+        "services.task_handler.store_result",
+        "services.task_handler.send_webhook",
+    ]
+    assert workflow.tasks[0].args == (dummy_image_bytes,)
+    assert workflow.tasks[3].args == ("https://callback",)
+
+
+def test_requested_model_routes_to_its_queue(dummy_image_bytes, dummy_metadata, monkeypatch):
+    """With per-model routing, a non-default model's inference goes to its own queue."""
+    monkeypatch.setattr("services.celery_worker.MODEL_ROUTING", "per_model")
+    metadata = dict(dummy_metadata, model="resnet50")
+    workflow = pipeline.build_pipeline(dummy_image_bytes, metadata)
+
+    classify = workflow.tasks[1]
+    assert classify.kwargs["model_name"] == "resnet50"
+    assert classify.options["queue"] == "inference.resnet50"
+
+    default = pipeline.build_pipeline(dummy_image_bytes, dummy_metadata).tasks[1]
+    assert default.kwargs["model_name"] == pipeline.MODEL_NAME
+    assert default.options["queue"] == "inference"
+
+
+def test_requested_top_k_travels_with_inference(dummy_image_bytes, dummy_metadata):
+    workflow = pipeline.build_pipeline(dummy_image_bytes, dummy_metadata)
+    assert "top_k" not in workflow.tasks[1].kwargs
+
+    workflow = pipeline.build_pipeline(dummy_image_bytes, dict(dummy_metadata, top_k=10))
+    assert workflow.tasks[1].kwargs["top_k"] == 10
+
+
+@patch("services.pipeline.PIPELINE_TRANSPORT", "claim_check")
+@patch("services.pipeline.chain")
+def test_submit_pipeline_claim_check(mock_chain, dummy_image_bytes, dummy_metadata):
+    """In claim-check mode the chain carries the object key instead of image bytes."""
+    metadata = dict(dummy_metadata, object_name="abc.jpg")
+    pipeline.submit_pipeline(dummy_image_bytes, metadata)
+
+    first, second, _ = mock_chain.call_args[0]
+    assert first.task == "services.task_handler.preprocess_object"
+    assert first.args == ("abc.jpg",)
+    assert second.task == "services.task_handler.classify_object"
+    mock_chain.return_value.apply_async.assert_called_once()
+
+
+@patch("services.pipeline.PIPELINE_MODE", "fused")
+@patch("services.pipeline.task_signature")
+def test_submit_pipeline_fused(mock_signature, dummy_image_bytes, dummy_metadata):
+    """In fused mode a single task is enqueued instead of a chain."""
+    pipeline.submit_pipeline(dummy_image_bytes, dummy_metadata)
+
+    mock_signature.assert_called_once_with(
+        "process_image", dummy_metadata, model_name=pipeline.MODEL_NAME, image_bytes=dummy_image_bytes
+    )
+    mock_signature.return_value.set.return_value.apply_async.assert_called_once()
+
+
+@patch("services.pipeline.celery_app.control.inspect")
+@patch("services.pipeline.chain")
+def test_submit_pipeline_never_inspects_workers(mock_chain, mock_inspect, dummy_image_bytes, dummy_metadata):
+    """The upload hot path must not broadcast to workers."""
+    pipeline.submit_pipeline(dummy_image_bytes, dummy_metadata)
+    mock_inspect.assert_not_called()
+
+
+# submit_batch
+
+@patch("services.pipeline.GroupResult")
+@patch("services.pipeline.group")
+def test_submit_batch_chunks_into_groups(mock_group, mock_group_result, dummy_metadata, monkeypatch):
+    """Items are enqueued as one group per chunk and saved under the batch id."""
+    monkeypatch.setattr("services.pipeline.BATCH_CHUNK_SIZE", 2)
+
+    def fake_group(signatures):
+        signatures = list(signatures)
+        result = MagicMock()
+        result.results = [MagicMock(id=f"task-{len(signatures)}-{i}") for i in range(len(signatures))]
+        fake_group.sizes.append(len(signatures))
+        fake_group.first = fake_group.first or signatures[0]
+        return MagicMock(apply_async=MagicMock(return_value=result))
+    fake_group.sizes, fake_group.first = [], None
+    mock_group.side_effect = fake_group
+
+    items = [dict(dummy_metadata, object_name=f"{i}.jpg") for i in range(5)]
+    batch_id, task_ids = pipeline.submit_batch(items)
+
+    assert fake_group.sizes == [2, 2, 1]
+    assert len(task_ids) == 5
+    # Batch members always travel by object key
+    assert fake_group.first.tasks[0].task == "services.task_handler.preprocess_object"
+    mock_group_result.assert_called_once()
+    assert mock_group_result.call_args[0][0] == batch_id
+    mock_group_result.return_value.save.assert_called_once()
@@ -0,0 +1,86 @@
+import io
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+
+from core import preprocessing
+from core.classifier import TRANSFORM
+
+# --- Fixtures ---
+
+def _encode(img: Image.Image, fmt: str = "PNG") -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format=fmt)
+    return buf.getvalue()
+
+@pytest.fixture
+def random_images():
+    """Lossless images of several sizes and aspect ratios."""
+    rng = np.random.default_rng(0)
+    sizes = [(224, 224), (640, 480), (300, 800), (1024, 257)]
+    return [
+        Image.fromarray(rng.integers(0, 256, (h, w, 3), dtype=np.uint8))
+        for w, h in sizes
+    ]
+
+# --- Tests for preprocessing engine ---
+
+@pytest.mark.parametrize("size", [(640, 480), (300, 800), (256, 256), (1024, 257)])
+def test_resize_crop_shape(size):
+    img = Image.new("RGB", size)
+    array = preprocessing.resize_crop(img)
+    assert array.shape == (224, 224, 3)
+    assert array.dtype == np.uint8
+
+def test_preprocess_batch_matches_transform(random_images):
+    """Vectorized output must match the torchvision Compose reference."""
+    batch = preprocessing.preprocess_batch([_encode(img) for img in random_images])
+    reference = torch.stack([TRANSFORM(img) for img in random_images])
+
+    assert batch.shape == (len(random_images), 3, 224, 224)
+    assert batch.dtype == torch.float32
+    assert torch.allclose(batch, reference, atol=1e-5)
+
+def test_normalize_batch_reuses_out_tensor(random_images):
+    arrays = [preprocessing.resize_crop(img) for img in random_images]
+    out = torch.empty((len(arrays), 3, 224, 224))
+    result = preprocessing.normalize_batch(arrays, out=out)
+    assert result.data_ptr() == out.data_ptr()
+
+
+# --- Tests for the serialized intermediate format ---
+
+@pytest.mark.parametrize("shape,dtype", [((224, 224, 3), np.uint8), ((299, 299, 3), np.uint8), ((1, 3, 8, 8), np.float32)])
+def test_pack_unpack_roundtrip(shape, dtype):
+    array = (np.arange(np.prod(shape)) % 251).astype(dtype).reshape(shape)
+    restored = preprocessing.unpack_tensor(preprocessing.pack_tensor(array))
+    assert restored.dtype == dtype
+    assert restored.shape == shape
+    assert np.array_equal(restored, array)
+
+def test_uint8_payload_is_quarter_of_float32():
+    payload = preprocessing.pack_tensor(np.zeros((224, 224, 3), dtype=np.uint8))
+    assert len(payload) <= preprocessing._LEGACY_NBYTES // 4 + 32
+
+def test_unpack_rejects_unknown_version():
+    payload = bytearray(preprocessing.pack_tensor(np.zeros((2, 2, 3), dtype=np.uint8)))
+    payload[3] = 99
+    with pytest.raises(ValueError, match="version"):
+        preprocessing.unpack_tensor(bytes(payload))
+
+def test_unpack_rejects_garbage():
+    with pytest.raises(ValueError, match="not a serialized tensor"):
+        preprocessing.unpack_tensor(b"garbage")
+
+def test_pack_rejects_unsupported_dtype():
+    with pytest.raises(ValueError, match="Unsupported tensor dtype"):
+        preprocessing.pack_tensor(np.zeros(3, dtype=np.int64))
+
+def test_to_model_input_normalizes_uint8(random_images):
+    """uint8 crops normalized at classify time match the torchvision reference."""
+    arrays = [preprocessing.resize_crop(img) for img in random_images]
+    payloads = [preprocessing.pack_tensor(a) for a in arrays]
+    batch = preprocessing.to_model_input([preprocessing.unpack_tensor(p) for p in payloads])
+    reference = torch.stack([TRANSFORM(img) for img in random_images])
+    assert torch.allclose(batch, reference, atol=1e-5)
@@ -0,0 +1,69 @@
+from unittest import mock
+
+import pytest
+from kombu import Connection, Queue
+from kombu.transport import redis as redis_transport
+
+from services import queue_monitor
+from services.queue_monitor import QueueDepthSampler, QUEUE_DEPTH, WORKER_TASKS
+
+# --- Tests for QueueDepthSampler ---
+
+def _gauge_value(gauge, **labels):
+    return gauge.labels(**labels)._value.get()
+
+@mock.patch("services.queue_monitor.worker_task_counts", return_value={"reserved": 3, "active": 2})
+@mock.patch("services.queue_monitor.broker_queue_depth", side_effect=lambda q: {"a": 7, "b": 0}[q])
+def test_sample_sets_gauges_per_queue(mock_depth, mock_counts):
+    sampler = QueueDepthSampler(["a", "b"], interval=60)
+    sampler.sample()
+
+    assert _gauge_value(QUEUE_DEPTH, queue="a") == 7
+    assert _gauge_value(QUEUE_DEPTH, queue="b") == 0
+    assert _gauge_value(WORKER_TASKS, state="reserved") == 3
+    assert _gauge_value(WORKER_TASKS, state="active") == 2
+
+@mock.patch("services.queue_monitor.worker_task_counts")
+@mock.patch("services.queue_monitor.broker_queue_depth", side_effect=ConnectionError("broker down"))
+def test_sample_survives_broker_errors(mock_depth, mock_counts, caplog):
+    sampler = QueueDepthSampler(["a"], interval=60, inspect_workers=False)
+    with caplog.at_level("WARNING"):
+        sampler.sample()
+    assert "Could not read depth of queue 'a'" in caplog.text
+    mock_counts.assert_not_called()
+
+def test_worker_task_counts_sums_replies():
+    inspect = mock.MagicMock()
+    inspect.reserved.return_value = {"w1": [1, 2], "w2": [3]}
+    inspect.active.return_value = None
+    with mock.patch.object(queue_monitor.celery_app.control, "inspect", return_value=inspect):
+        assert queue_monitor.worker_task_counts() == {"reserved": 3, "active": 0}
+
+def test_sampler_thread_start_stop():
+    sampler = QueueDepthSampler(["a"], interval=0.01, inspect_workers=False)
+    with mock.patch.object(sampler, "sample") as sample:
+        sampler.start()
+        sampler.start()  # idempotent
+        sampler.stop(timeout=2)
+    assert sample.called
+    assert sampler._thread is None
+
+def test_drained_redis_queue_reports_zero():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    queue = Queue("depth", routing_key="depth")
+    broker = Connection("redis://localhost:6379/0")
+    fake_client = lambda channel, asynchronous=False: fakeredis.FakeStrictRedis(server=server)  # noqa: E731
+
+    with mock.patch.object(redis_transport.Channel, "_create_client", fake_client), \
+            mock.patch.object(queue_monitor.celery_app, "connection_or_acquire", return_value=broker):
+        with broker.Producer() as producer:
+            producer.publish({"n": 1}, routing_key="depth", declare=[queue])
+        sampler = QueueDepthSampler(["depth"], interval=60, inspect_workers=False)
+        sampler.sample()
+        assert _gauge_value(QUEUE_DEPTH, queue="depth") == 1
+
+        # Consuming the last message deletes the Redis list behind the queue
+        assert queue(broker.default_channel).get(no_ack=True).payload == {"n": 1}
+        sampler.sample()
+    assert _gauge_value(QUEUE_DEPTH, queue="depth") == 0
@@ -0,0 +1,133 @@
+import json
+import pytest
+from unittest import mock
+
+from services import result_cache
+from services.result_cache import LRUCache, get_cached, set_cached
+
+# --- Fixtures ---
+
+@pytest.fixture(autouse=True)
+def clean_cache(monkeypatch):
+    """Start each test with an empty local tier and no Redis tier."""
+    result_cache._local.clear()
+    monkeypatch.setattr("services.result_cache.RESULT_CACHE_ENABLED", True)
+    monkeypatch.setattr("services.result_cache.RESULT_CACHE_REDIS_URL", None)
+    monkeypatch.setattr("services.result_cache._redis", None)
+    yield
+    result_cache._local.clear()
+
+# --- Tests for LRUCache ---
+
+def test_lru_evicts_oldest():
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" becomes least recently used
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+def test_lru_entries_expire(monkeypatch):
+    cache = LRUCache(maxsize=2, ttl=10)
+    monkeypatch.setattr("services.result_cache.time.monotonic", lambda: 100.0)
+    cache.set("a", 1)
+    monkeypatch.setattr("services.result_cache.time.monotonic", lambda: 111.0)
+    assert cache.get("a") is None
+
+# --- Tests for get_cached() / set_cached() ---
+
+def test_roundtrip_local_tier():
+    top5 = [{"label": "goldfish", "probability": 0.9}]
+    assert get_cached("h1") is None
+    set_cached("h1", top5)
+    assert get_cached("h1") == top5
+
+def test_keys_include_model_name():
+    set_cached("h1", [1], model_name="resnet18")
+    assert get_cached("h1", model_name="resnet50") is None
+
+def test_disabled_cache_is_noop(monkeypatch):
+    monkeypatch.setattr("services.result_cache.RESULT_CACHE_ENABLED", False)
+    set_cached("h1", [1])
+    assert get_cached("h1") is None
+
+def test_redis_tier_hit_populates_local(monkeypatch):
+    client = mock.MagicMock()
+    client.get.return_value = json.dumps([{"label": "cat", "probability": 0.5}])
+    monkeypatch.setattr("services.result_cache._redis", client)
+
+    assert get_cached("h2") == [{"label": "cat", "probability": 0.5}]
+    client.get.reset_mock()
+    assert get_cached("h2") == [{"label": "cat", "probability": 0.5}]
+    client.get.assert_not_called()
+
+def test_redis_tier_set_uses_ttl(monkeypatch):
+    client = mock.MagicMock()
+    monkeypatch.setattr("services.result_cache._redis", client)
+    set_cached("h3", [1])
+    client.set.assert_called_once()
+    assert client.set.call_args.kwargs["ex"] == result_cache.RESULT_CACHE_TTL
+
+def test_redis_errors_are_misses(monkeypatch):
+    client = mock.MagicMock()
+    client.get.side_effect = ConnectionError("redis down")
+    monkeypatch.setattr("services.result_cache._redis", client)
+    assert get_cached("h4") is None
+
+# --- Tests for pipeline short-circuit ---
+
+def test_classify_task_uses_cache():
+    """A cached hash skips the forward pass entirely."""
+    from services import task_handler
+
+    set_cached("h5", [{"label": "cached", "probability": 1.0}])
+    with mock.patch("services.task_handler.classify") as classify:
+        result = task_handler.classify_task.run(b"tensor", content_hash="h5")
+    classify.assert_not_called()
+    assert result[0]["label"] == "cached"
+
+def test_classify_task_populates_cache():
+    from services import task_handler
+
+    with mock.patch("services.task_handler.classify", return_value=[{"label": "x", "probability": 1.0}]):
+        task_handler.classify_task.run(b"tensor", content_hash="h6")
+    assert get_cached("h6") == [{"label": "x", "probability": 1.0}]
+
+def test_submit_pipeline_cache_hit_skips_inference(dummy_image_bytes, dummy_metadata):
+    """On a hit only store_result is enqueued, with the cached top-5."""
+    from services import pipeline
+
+    set_cached("h7", [{"label": "cached", "probability": 1.0}])
+    metadata = dict(dummy_metadata, content_hash="h7")
+    with mock.patch("services.pipeline.task_signature") as signature:
+        pipeline.submit_pipeline(dummy_image_bytes, metadata)
+
+    signature.assert_called_once()
+    name, cached, stored_metadata = signature.call_args[0]
+    assert name == "store_result"
+    assert cached[0]["label"] == "cached"
+    assert stored_metadata["cache_hit"] is True
+    signature.return_value.apply_async.assert_called_once()
+
+def test_fused_pipeline_counts_one_miss_per_image(dummy_image_bytes, dummy_metadata):
+    """Submit and worker each look up once; only the submitter counts the miss."""
+    from services import pipeline, task_handler
+
+    metadata = dict(dummy_metadata, content_hash="h8")
+    misses = result_cache.RESULT_CACHE_MISSES._value.get()
+    with mock.patch("services.pipeline.PIPELINE_MODE", "fused"), \
+         mock.patch("services.pipeline.task_signature"):
+        pipeline.submit_pipeline(dummy_image_bytes, metadata)
+    with mock.patch("services.task_handler.get_cached", wraps=get_cached) as lookup, \
+         mock.patch("services.task_handler.preprocess_image", return_value=b"tensor"), \
+         mock.patch("services.task_handler.classify", return_value=[{"label": "x", "probability": 1.0}]), \
+         mock.patch("services.task_handler._persist_result"):
+        task_handler.process_image.run(metadata, image_bytes=dummy_image_bytes)
+
+    lookup.assert_called_once()
+    assert result_cache.RESULT_CACHE_MISSES._value.get() == misses + 1
+    assert get_cached("h8") == [{"label": "x", "probability": 1.0}]
@@ -0,0 +1,125 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from celery import Celery, states
+
+from services import result_status
+
+# Real Redis backend object (no connection is made until a command runs)
+redis_app = Celery("test", backend="redis://localhost:6379/0", set_as_current=False)
+backend = redis_app.backend
+
+
+def _encoded(status, result=None):
+    return backend.encode({"status": status, "result": result})
+
+
+class FakePubSub:
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.subscribed = ()
+        self.closed = False
+
+    async def subscribe(self, *channels):
+        self.subscribed = channels
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=None):
+        if self.messages:
+            return self.messages.pop(0)
+        await asyncio.sleep(timeout)
+        return None
+
+    async def unsubscribe(self):
+        pass
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FakeRedis:
+    def __init__(self, stored, messages=()):
+        self.stored = stored
+        self.pubsub_obj = FakePubSub(messages)
+
+    def pubsub(self):
+        return self.pubsub_obj
+
+    async def mget(self, keys):
+        return [self.stored.get(key) for key in keys]
+
+
+def _collect(gen):
+    async def run():
+        return [item async for item in gen]
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def redis_backend():
+    with mock.patch.object(result_status, "celery_app", redis_app):
+        yield backend
+
+
+# --- fetch_states ---
+
+def test_fetch_states_uses_one_mget(redis_backend):
+    stored = {
+        backend.get_key_for_task("a"): _encoded(states.SUCCESS, {"label": "cat"}),
+        backend.get_key_for_task("b"): _encoded(states.STARTED),
+    }
+    with mock.patch.object(type(backend), "mget", side_effect=lambda keys: [stored.get(k) for k in keys]) as mget:
+        metas = result_status.fetch_states(["a", "b", "c", "a"])
+
+    mget.assert_called_once()
+    assert metas["a"]["status"] == states.SUCCESS
+    assert metas["a"]["result"] == {"label": "cat"}
+    assert metas["b"]["status"] == states.STARTED
+    assert metas["c"] == {"status": states.PENDING, "result": None}
+
+
+def test_fetch_states_falls_back_without_redis_backend():
+    app = mock.MagicMock()
+    app.AsyncResult.side_effect = lambda t: mock.MagicMock(state=states.SUCCESS, result=t)
+    with mock.patch.object(result_status, "celery_app", app):
+        metas = result_status.fetch_states(["x", "y"])
+    assert metas == {
+        "x": {"status": states.SUCCESS, "result": "x"},
+        "y": {"status": states.SUCCESS, "result": "y"},
+    }
+
+
+def test_batch_task_ids_unknown_batch():
+    with mock.patch("services.result_status.GroupResult.restore", return_value=None):
+        assert result_status.batch_task_ids("missing") is None
+
+
+# --- watch_states ---
+
+def test_watch_states_yields_finished_then_published(redis_backend):
+    key_b = backend.get_key_for_task("b")
+    fake = FakeRedis(
+        stored={backend.get_key_for_task("a"): _encoded(states.SUCCESS, 1)},
+        messages=[
+            {"channel": key_b, "data": _encoded(states.STARTED)},
+            {"channel": key_b, "data": _encoded(states.FAILURE, {"exc_type": "ValueError", "exc_message": ["bad"]})},
+        ],
+    )
+    with mock.patch.object(result_status, "get_async_redis", return_value=fake):
+        events = _collect(result_status.watch_states(["a", "b"], timeout=5))
+
+    assert [(task_id, meta["status"]) for task_id, meta in events] == [
+        ("a", states.SUCCESS),
+        ("b", states.FAILURE),
+    ]
+    assert set(fake.pubsub_obj.subscribed) == {backend.get_key_for_task("a"), key_b}
+    assert fake.pubsub_obj.closed
+
+
+def test_watch_states_stops_at_timeout_with_heartbeats(redis_backend):
+    fake = FakeRedis(stored={})
+    with mock.patch.object(result_status, "get_async_redis", return_value=fake):
+        events = _collect(result_status.watch_states(["a"], timeout=0.25, heartbeat=0.1))
+
+    assert events and all(event == (None, None) for event in events)
+    assert fake.pubsub_obj.closed
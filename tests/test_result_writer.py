@@ -0,0 +1,94 @@
+import pytest
+from unittest import mock
+
+from services import result_writer
+
+# --- Fixtures ---
+
+@pytest.fixture
+def rows():
+    return [{"task_id": f"t{i}", "payload": {"i": i}} for i in range(3)]
+
+@pytest.fixture
+def mock_conn(monkeypatch):
+    engine = mock.MagicMock()
+    conn = engine.begin.return_value.__enter__.return_value
+    monkeypatch.setattr("services.result_writer.get_engine", lambda: engine)
+    return conn
+
+# --- Tests for write_results() ---
+
+def test_write_results_single_bulk_insert(rows, mock_conn):
+    """All rows go into one execute call inside one transaction."""
+    outcomes = result_writer.write_results(rows)
+
+    assert outcomes == ["t0", "t1", "t2"]
+    mock_conn.execute.assert_called_once()
+    assert mock_conn.execute.call_args[0][1] == rows
+
+def test_write_results_falls_back_per_row(rows, mock_conn):
+    """A failed bulk insert is retried row by row so only the bad row fails."""
+    def execute(stmt, params):
+        if len(params) > 1 or params[0]["task_id"] == "t1":
+            raise Exception("duplicate key")
+    mock_conn.execute.side_effect = execute
+
+    outcomes = result_writer.write_results(rows)
+
+    assert outcomes[0] == "t0"
+    assert isinstance(outcomes[1], Exception)
+    assert outcomes[2] == "t2"
+
+def test_write_results_single_row_failure(mock_conn):
+    mock_conn.execute.side_effect = Exception("db down")
+    outcomes = result_writer.write_results([{"task_id": "t0", "payload": {}}])
+    assert isinstance(outcomes[0], Exception)
+
+# --- Tests for the write-behind path ---
+
+def test_get_result_writer_singleton(monkeypatch):
+    monkeypatch.setattr("services.result_writer._writer", None)
+    assert result_writer.get_result_writer() is result_writer.get_result_writer()
+
+def test_persist_result_waits_for_flush(mock_conn, monkeypatch, dummy_result, dummy_metadata):
+    """store_result only returns once the batched row has been committed."""
+    from services import task_handler
+
+    monkeypatch.setattr("services.result_writer._writer", None)
+    monkeypatch.setattr("services.result_writer.RESULT_BATCH_SIZE", 4)
+    monkeypatch.setattr("services.task_handler.RESULT_BATCH_SIZE", 4)
+
+    result = task_handler.store_result.run(dummy_result, dummy_metadata)
+
+    assert result["classification"] == dummy_result
+    mock_conn.execute.assert_called_once()
+    result_writer.get_result_writer().stop(timeout=2)
+
+def test_persist_result_surfaces_flush_error(mock_conn, monkeypatch, dummy_result, dummy_metadata):
+    """A failed flush propagates to the task so it is retried instead of acked."""
+    from services import task_handler
+
+    mock_conn.execute.side_effect = Exception("db down")
+    monkeypatch.setattr("services.result_writer._writer", None)
+    monkeypatch.setattr("services.result_writer.RESULT_BATCH_SIZE", 4)
+    monkeypatch.setattr("services.task_handler.RESULT_BATCH_SIZE", 4)
+
+    with pytest.raises(Exception, match="db down"):
+        task_handler.store_result.run(dummy_result, dummy_metadata)
+    result_writer.get_result_writer().stop(timeout=2)
+
+def test_persist_result_writes_directly_in_single_task_pool(mock_conn, monkeypatch, dummy_result, dummy_metadata):
+    """Prefork/solo children have nothing to coalesce, so they skip the sink."""
+    from services import task_handler
+
+    monkeypatch.setattr("services.task_handler.RESULT_BATCH_SIZE", 4)
+    monkeypatch.setattr("services.celery_worker._batching_allowed", False)
+    mock_engine = mock.MagicMock()
+    monkeypatch.setattr("services.task_handler.get_engine", lambda: mock_engine)
+
+    with mock.patch("services.task_handler.get_result_writer") as writer:
+        result = task_handler.store_result.run(dummy_result, dummy_metadata)
+
+    writer.assert_not_called()
+    mock_engine.begin.return_value.__enter__.return_value.execute.assert_called_once()
+    assert result["classification"] == dummy_result
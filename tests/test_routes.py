@@ -70,7 +70,7 @@ def test_upload_image_unsupported_format(image_file):
 
 # --- Tests for error handling in image upload ---
 
-@patch("api.routes.upload_image", side_effect=Exception("Simulated failure"))
+@patch("api.routes.upload_stream", side_effect=Exception("Simulated failure"))
 def test_upload_image_storage_failure(mock_upload, client):
     file_data = io.BytesIO(b"dummy image bytes")
     response = client.post(
@@ -135,3 +135,407 @@ def test_task_status_running():
         mock_res.return_value.result = None
         resp = client.get("/api/task-status/fake-task")
         assert resp.json()["state"] == "STARTED"
+
+# --- Tests for the non-blocking upload path ---
+
+def test_upload_runs_blocking_calls_off_event_loop():
+    """MinIO upload and pipeline submission run in the bounded I/O pool."""
+    import threading
+    from types import SimpleNamespace
+    from services.storage import StoredObject
+
+    threads = {}
+
+    def fake_upload(stream, object_name, content_type, keep_bytes):
+        threads["upload"] = threading.current_thread().name
+        return StoredObject(f"http://minio/{object_name}", 3, "digest")
+
+    def fake_submit(contents, metadata, callback_url):
+        threads["submit"] = threading.current_thread().name
+        return SimpleNamespace(id="task-123")
+
+    with patch("api.routes.upload_stream", side_effect=fake_upload), \
+         patch("api.routes.submit_pipeline", side_effect=fake_submit):
+        response = client.post(
+            "/api/upload-image",
+            files={"file": ("test.jpg", io.BytesIO(b"img"), "image/jpeg")},
+        )
+
+    assert response.status_code == 200
+    assert response.json() == {"task_id": "task-123"}
+    assert threads["upload"].startswith("api-io")
+    assert threads["submit"].startswith("api-io")
+
+
+# --- Tests for streaming upload ---
+
+def test_upload_streams_file_and_uses_digest():
+    """The endpoint streams the spooled file and forwards the streamed digest."""
+    from types import SimpleNamespace
+    from api.routes import INLINE_MAX_SIZE
+    from services.storage import StoredObject
+
+    seen = {}
+
+    def fake_upload(stream, object_name, content_type, keep_bytes):
+        seen["body"] = body = stream.read()
+        seen["keep_bytes"] = keep_bytes
+        kept = body if len(body) <= keep_bytes else None
+        return StoredObject(f"http://minio/{object_name}", len(body), "abc123", kept)
+
+    with patch("api.routes.upload_stream", side_effect=fake_upload), \
+         patch("api.routes.submit_pipeline", return_value=SimpleNamespace(id="t1")) as submit:
+        response = client.post(
+            "/api/upload-image",
+            files={"file": ("test.jpg", io.BytesIO(b"image-body"), "image/jpeg")},
+        )
+
+    assert response.status_code == 200
+    assert seen["body"] == b"image-body"
+    assert seen["keep_bytes"] == INLINE_MAX_SIZE
+    contents, metadata, _ = submit.call_args[0]
+    assert contents == b"image-body"
+    assert metadata["content_hash"] == "abc123"
+
+def test_upload_above_inline_limit_ships_object_key():
+    """Bytes that were not kept while streaming are never read back."""
+    from types import SimpleNamespace
+    from services.storage import StoredObject
+
+    with patch("api.routes.upload_stream", return_value=StoredObject("http://minio/x", 3, "d", None)), \
+         patch("api.routes.submit_pipeline", return_value=SimpleNamespace(id="t1")) as submit, \
+         patch("starlette.datastructures.UploadFile.read") as read:
+        response = client.post(
+            "/api/upload-image",
+            files={"file": ("test.jpg", io.BytesIO(b"img"), "image/jpeg")},
+        )
+
+    assert response.status_code == 200
+    read.assert_not_called()
+    contents, metadata, _ = submit.call_args[0]
+    assert contents is None
+    assert metadata["object_name"].endswith(".jpg")
+
+def test_upload_claim_check_skips_reading_bytes():
+    from types import SimpleNamespace
+    from services.storage import StoredObject
+
+    with patch("api.routes.PIPELINE_TRANSPORT", "claim_check"), \
+         patch("api.routes.upload_stream", return_value=StoredObject("http://minio/x", 3, "d")) as upload, \
+         patch("api.routes.submit_pipeline", return_value=SimpleNamespace(id="t1")) as submit:
+        response = client.post(
+            "/api/upload-image",
+            files={"file": ("test.jpg", io.BytesIO(b"img"), "image/jpeg")},
+        )
+
+    assert response.status_code == 200
+    assert upload.call_args.kwargs["keep_bytes"] == 0
+    assert submit.call_args[0][0] is None
+
+def test_upload_selects_model():
+    from types import SimpleNamespace
+    from services.storage import StoredObject
+
+    with patch("api.routes.MODELS", ["resnet18", "resnet50"]), \
+         patch("api.routes.upload_stream", return_value=StoredObject("http://minio/x", 3, "d")), \
+         patch("api.routes.submit_pipeline", return_value=SimpleNamespace(id="t1")) as submit:
+        response = client.post(
+            "/api/upload-image?model=resnet50",
+            files={"file": ("test.jpg", io.BytesIO(b"img"), "image/jpeg")},
+        )
+        rejected = client.post(
+            "/api/upload-image?model=vit_b_16",
+            files={"file": ("test.jpg", io.BytesIO(b"img"), "image/jpeg")},
+        )
+
+    assert response.status_code == 200
+    assert submit.call_args[0][1]["model"] == "resnet50"
+    assert rejected.status_code == 400
+    assert submit.call_count == 1
+
+def test_upload_top_k_validated():
+    from types import SimpleNamespace
+    from services.storage import StoredObject
+
+    with patch("api.routes.upload_stream", return_value=StoredObject("http://minio/x", 3, "d")), \
+         patch("api.routes.submit_pipeline", return_value=SimpleNamespace(id="t1")) as submit:
+        response = client.post(
+            "/api/upload-image?top_k=10",
+            files={"file": ("test.jpg", io.BytesIO(b"img"), "image/jpeg")},
+        )
+        too_many = client.post(
+            "/api/upload-image?top_k=100000",
+            files={"file": ("test.jpg", io.BytesIO(b"img"), "image/jpeg")},
+        )
+        bad_metadata = client.post(
+            "/api/upload-image",
+            params={"metadata": '{"top_k": "all"}'},
+            files={"file": ("test.jpg", io.BytesIO(b"img"), "image/jpeg")},
+        )
+
+    assert response.status_code == 200
+    assert submit.call_args[0][1]["top_k"] == 10
+    assert too_many.status_code == 422
+    assert bad_metadata.status_code == 400
+
+def test_upload_too_large_returns_413():
+    from services.storage import UploadTooLarge
+
+    with patch("api.routes.upload_stream", side_effect=UploadTooLarge("too big")):
+        response = client.post(
+            "/api/upload-image",
+            files={"file": ("test.jpg", io.BytesIO(b"img"), "image/jpeg")},
+        )
+    assert response.status_code == 413
+
+def test_upload_rejected_early_by_declared_size():
+    with patch("api.routes.MAX_UPLOAD_SIZE", 2), \
+         patch("api.routes.upload_stream") as upload:
+        response = client.post(
+            "/api/upload-image",
+            files={"file": ("test.jpg", io.BytesIO(b"image"), "image/jpeg")},
+        )
+    assert response.status_code == 413
+    upload.assert_not_called()
+
+# --- Tests for batch upload endpoint ---
+
+def _fake_stored(stream, object_name, content_type):
+    from services.storage import StoredObject
+    data = stream.read()
+    return StoredObject(f"http://minio/{object_name}", len(data), f"hash-{len(data)}")
+
+def test_upload_batch_files_and_keys():
+    """Files and existing object keys are submitted as one batch."""
+    with patch("api.routes.upload_stream", side_effect=_fake_stored) as upload, \
+         patch("api.routes.submit_batch", return_value=("batch-1", ["t1", "t2", "t3"])) as submit:
+        response = client.post(
+            "/api/upload-batch",
+            files=[
+                ("files", ("a.jpg", io.BytesIO(b"aaa"), "image/jpeg")),
+                ("files", ("b.png", io.BytesIO(b"bbbb"), "image/png")),
+            ],
+            data={"object_keys": ["existing.jpg"]},
+        )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["batch_id"] == "batch-1"
+    assert [t["task_id"] for t in body["tasks"]] == ["t1", "t2", "t3"]
+    assert body["errors"] == []
+    assert upload.call_count == 2
+
+    items = submit.call_args[0][0]
+    assert [i["filename"] for i in items] == ["a.jpg", "b.png", "existing.jpg"]
+    assert items[2]["object_name"] == "existing.jpg"
+
+def test_upload_batch_expands_zip_archive():
+    import zipfile
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("one.jpg", b"1")
+        zf.writestr("two.jpeg", b"22")
+        zf.writestr("notes.txt", b"skip me")
+    buf.seek(0)
+
+    with patch("api.routes.upload_stream", side_effect=_fake_stored), \
+         patch("api.routes.submit_batch", return_value=("batch-2", ["t1", "t2"])) as submit:
+        response = client.post(
+            "/api/upload-batch",
+            files=[("files", ("images.zip", buf, "application/zip"))],
+        )
+
+    assert response.status_code == 200
+    items = submit.call_args[0][0]
+    assert sorted(i["filename"] for i in items) == ["one.jpg", "two.jpeg"]
+    assert all(i["archive"] == "images.zip" for i in items)
+
+def test_upload_batch_expands_tar_archive():
+    import tarfile
+
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tf:
+        for name, data in (("x.png", b"xx"), ("y.jpg", b"y")):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    buf.seek(0)
+
+    with patch("api.routes.upload_stream", side_effect=_fake_stored), \
+         patch("api.routes.submit_batch", return_value=("batch-3", ["t1", "t2"])) as submit:
+        response = client.post(
+            "/api/upload-batch",
+            files=[("files", ("images.tar.gz", buf, "application/gzip"))],
+        )
+
+    assert response.status_code == 200
+    assert [i["filename"] for i in submit.call_args[0][0]] == ["x.png", "y.jpg"]
+
+def test_upload_batch_reports_rejected_items():
+    with patch("api.routes.upload_stream", side_effect=_fake_stored), \
+         patch("api.routes.submit_batch", return_value=("batch-4", ["t1"])):
+        response = client.post(
+            "/api/upload-batch",
+            files=[
+                ("files", ("ok.jpg", io.BytesIO(b"ok"), "image/jpeg")),
+                ("files", ("bad.bmp", io.BytesIO(b"bad"), "image/bmp")),
+            ],
+        )
+
+    assert response.status_code == 200
+    assert response.json()["errors"] == [{"filename": "bad.bmp", "error": "Unsupported file type"}]
+
+def test_upload_batch_requires_input():
+    response = client.post("/api/upload-batch")
+    assert response.status_code == 400
+
+def test_upload_batch_rejects_oversized_batch():
+    with patch("api.routes.MAX_BATCH_ITEMS", 1):
+        response = client.post(
+            "/api/upload-batch",
+            data={"object_keys": ["a.jpg", "b.jpg"]},
+        )
+    assert response.status_code == 413
+
+def test_upload_batch_rejects_oversized_batch_before_uploading():
+    with patch("api.routes.MAX_BATCH_ITEMS", 1), \
+         patch("api.routes.upload_stream", side_effect=_fake_stored) as upload:
+        response = client.post(
+            "/api/upload-batch",
+            files=[
+                ("files", ("a.jpg", io.BytesIO(b"a"), "image/jpeg")),
+                ("files", ("b.jpg", io.BytesIO(b"b"), "image/jpeg")),
+            ],
+        )
+    assert response.status_code == 413
+    upload.assert_not_called()
+
+def test_upload_batch_stops_extracting_archive_at_limit():
+    import zipfile
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name in ("one.jpg", "two.jpg", "three.jpg", "four.jpg"):
+            zf.writestr(name, name.encode())
+    buf.seek(0)
+
+    with patch("api.routes.MAX_BATCH_ITEMS", 3), \
+         patch("api.routes.upload_stream", side_effect=_fake_stored) as upload, \
+         patch("api.routes.submit_batch", return_value=("batch-5", ["t1", "t2"])) as submit:
+        response = client.post(
+            "/api/upload-batch",
+            files=[("files", ("images.zip", buf, "application/zip"))],
+            data={"object_keys": ["existing.jpg"]},
+        )
+
+    assert response.status_code == 200
+    assert upload.call_count == 2
+    assert [i["filename"] for i in submit.call_args[0][0]] == ["one.jpg", "two.jpg", "existing.jpg"]
+    assert response.json()["errors"] == [{"filename": "three.jpg", "error": "Batch exceeds 3 images"}]
+
+# --- Tests for bulk status and status streaming ---
+
+def test_task_status_bulk():
+    metas = {
+        "a": {"status": "SUCCESS", "result": {"label": "cat"}},
+        "b": {"status": "PENDING", "result": None},
+    }
+    with patch("api.routes.fetch_states", return_value=metas) as fetch:
+        resp = client.post("/api/task-status", json={"task_ids": ["a", "b"]})
+
+    assert resp.status_code == 200
+    fetch.assert_called_once_with(["a", "b"])
+    assert resp.json()["tasks"]["a"] == {"state": "SUCCESS", "result": {"label": "cat"}}
+    assert resp.json()["tasks"]["b"]["state"] == "PENDING"
+
+def test_batch_status_counts_states():
+    metas = {
+        "a": {"status": "SUCCESS", "result": {}},
+        "b": {"status": "SUCCESS", "result": {}},
+        "c": {"status": "FAILURE", "result": "boom"},
+    }
+    with patch("api.routes.batch_task_ids", return_value=["a", "b", "c"]), \
+         patch("api.routes.fetch_states", return_value=metas):
+        resp = client.get("/api/batch-status/batch-1")
+
+    body = resp.json()
+    assert body["total"] == 3
+    assert body["counts"] == {"SUCCESS": 2, "FAILURE": 1}
+    assert body["tasks"]["c"] == {"state": "FAILURE", "error": "boom"}
+
+def test_batch_status_unknown_batch():
+    with patch("api.routes.batch_task_ids", return_value=None):
+        resp = client.get("/api/batch-status/nope")
+    assert resp.status_code == 404
+
+def test_batch_events_streams_completions():
+    async def fake_watch(task_ids, timeout, heartbeat=None):
+        yield "a", {"status": "SUCCESS", "result": {"label": "cat"}}
+        yield None, None
+        yield "b", {"status": "FAILURE", "result": "boom"}
+
+    with patch("api.routes.batch_task_ids", return_value=["a", "b"]), \
+         patch("api.routes.supports_streaming", return_value=True), \
+         patch("api.routes.watch_states", fake_watch):
+        resp = client.get("/api/batch-status/batch-1/events")
+
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    chunks = [c for c in resp.text.split("\n\n") if c]
+    assert chunks[0].startswith("event: task\n")
+    assert '"task_id": "a"' in chunks[0]
+    assert chunks[1] == ": keep-alive"
+    assert chunks[-1] == 'event: done\ndata: {"total": 2, "completed": 2}'
+
+def test_task_events_requires_redis_backend():
+    with patch("api.routes.supports_streaming", return_value=False):
+        resp = client.get("/api/task-events", params={"task_ids": ["a"]})
+    assert resp.status_code == 501
+
+# --- Tests for task-status long polling ---
+
+def test_task_status_wait_returns_on_completion():
+    async def fake_watch(task_ids, timeout, heartbeat=None):
+        assert task_ids == ["fake-task"] and timeout == 5
+        yield "fake-task", {"status": "SUCCESS", "result": {"label": "cat"}}
+
+    with patch("api.routes.supports_streaming", return_value=True), \
+         patch("api.routes.watch_states", fake_watch), \
+         patch("services.celery_worker.celery_app.AsyncResult") as mock_res:
+        resp = client.get("/api/task-status/fake-task", params={"wait": 5})
+
+    assert resp.json() == {"state": "SUCCESS", "result": {"label": "cat"}}
+    mock_res.assert_not_called()
+
+def test_task_status_wait_timeout_reports_current_state():
+    async def fake_watch(task_ids, timeout, heartbeat=None):
+        return
+        yield
+
+    with patch("api.routes.supports_streaming", return_value=True), \
+         patch("api.routes.watch_states", fake_watch), \
+         patch("services.celery_worker.celery_app.AsyncResult") as mock_res:
+        mock_res.return_value.state = "STARTED"
+        mock_res.return_value.result = None
+        resp = client.get("/api/task-status/fake-task", params={"wait": 1})
+
+    assert resp.json()["state"] == "STARTED"
+
+def test_task_status_wait_is_capped():
+    timeouts = []
+
+    async def fake_watch(task_ids, timeout, heartbeat=None):
+        timeouts.append(timeout)
+        yield "fake-task", {"status": "SUCCESS", "result": None}
+
+    with patch("api.routes.TASK_STATUS_MAX_WAIT", 30), \
+         patch("api.routes.supports_streaming", return_value=True), \
+         patch("api.routes.watch_states", fake_watch):
+        resp = client.get("/api/task-status/fake-task", params={"wait": 10_000})
+
+    assert resp.status_code == 200
+    assert timeouts == [30]
+
+def test_task_status_rejects_negative_wait():
+    resp = client.get("/api/task-status/fake-task", params={"wait": -1})
+    assert resp.status_code == 422
@@ -0,0 +1,127 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+import torch
+
+from core import shared_weights
+from core.inference_modes import run_model
+from services import celery_worker
+from utils import process_memory
+
+
+def _skeleton():
+    with torch.device("meta"):
+        return torch.nn.Sequential(
+            torch.nn.Conv2d(3, 8, 3, stride=4),
+            torch.nn.BatchNorm2d(8),
+            torch.nn.ReLU(),
+            torch.nn.AdaptiveAvgPool2d(1),
+            torch.nn.Flatten(),
+            torch.nn.Linear(8, 10),
+        )
+
+
+@pytest.fixture
+def weights_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr("core.shared_weights.MODEL_ARTIFACT_DIR", str(tmp_path))
+    monkeypatch.setattr("core.shared_weights.MODEL_CACHE_BUILD", True)
+    return tmp_path
+
+
+# --- mmap sharing ---
+
+@pytest.mark.parametrize("mode", ["fp32", "channels_last"])
+def test_first_load_writes_then_maps_weights(weights_dir, mode, tiny_model):
+    build = mock.Mock(side_effect=tiny_model)
+    batch = torch.randn(2, 3, 64, 64)
+    expected = run_model(tiny_model(), batch, "fp32")
+
+    model, active = shared_weights.load_shared(build, _skeleton, mode, weights="W1")
+    assert active == mode
+    assert (weights_dir / f"{shared_weights.MODEL_NAME}_{mode}.weights.pt").exists()
+
+    mapped, _ = shared_weights.load_shared(build, _skeleton, mode, weights="W1")
+    assert build.call_count == 1
+    assert torch.allclose(run_model(mapped, batch, mode), expected, atol=1e-5)
+
+
+def test_channels_last_weights_are_not_copied(weights_dir, tiny_model):
+    shared_weights.load_shared(tiny_model, _skeleton, "channels_last", weights=None)
+    path = shared_weights.weights_path("channels_last")
+    meta = shared_weights.artifact_meta("channels_last", None)
+
+    mapped = shared_weights.load_weights(_skeleton, path, meta)
+    before = mapped[0].weight.data_ptr()
+    prepared, _ = shared_weights.prepare_model(mapped, "channels_last")
+    assert prepared[0].weight.data_ptr() == before
+
+
+def test_stale_weights_are_rewritten(weights_dir, tiny_model):
+    build = mock.Mock(side_effect=tiny_model)
+    shared_weights.load_shared(build, _skeleton, "fp32", weights="W1")
+    shared_weights.load_shared(build, _skeleton, "fp32", weights="W2")
+    assert build.call_count == 2
+
+    path = shared_weights.weights_path("fp32")
+    assert shared_weights.load_weights(_skeleton, path, shared_weights.artifact_meta("fp32", "W1")) is None
+    assert shared_weights.load_weights(_skeleton, path, shared_weights.artifact_meta("fp32", "W2")) is not None
+
+
+def test_uncovered_tensor_is_rejected(weights_dir, tiny_model):
+    shared_weights.load_shared(tiny_model, _skeleton, "fp32", weights=None)
+
+    def skeleton_with_extra_buffer():
+        model = _skeleton()
+        with torch.device("meta"):
+            model.register_buffer("scale", torch.ones(1), persistent=False)
+        return model
+
+    path, meta = shared_weights.weights_path("fp32"), shared_weights.artifact_meta("fp32", None)
+    assert shared_weights.load_weights(skeleton_with_extra_buffer, path, meta) is None
+
+
+def test_int8_loads_private_copy(weights_dir, tiny_model):
+    with mock.patch("core.shared_weights.load_model", return_value=("model", "int8")) as load:
+        assert shared_weights.load_shared(tiny_model, _skeleton, "int8", weights=None) == ("model", "int8")
+    load.assert_called_once()
+    assert not list(weights_dir.iterdir())
+
+
+# --- Measurement ---
+
+def test_measure_reports_memory_per_child(tiny_model):
+    with mock.patch("core.classifier.build_inference_model", return_value=(tiny_model(), "fp32")):
+        report = shared_weights.measure(2, "off")
+
+    assert report["children"] == 2
+    assert len(report["per_child_mb"]) == 2
+    assert report["mean_child_uss_mb"] > 0
+
+
+def test_process_memory_reads_smaps_rollup():
+    usage = process_memory.process_memory()
+    if not usage:
+        pytest.skip("smaps_rollup is not available")
+    assert 0 < usage["uss"] <= usage["rss"]
+
+
+def test_record_memory_is_throttled(monkeypatch):
+    monkeypatch.setattr("utils.process_memory.MEMORY_SAMPLE_INTERVAL", 60)
+    with mock.patch("utils.process_memory.process_memory", return_value={"rss": 1}) as read:
+        process_memory.record_memory(force=True)
+        process_memory.record_memory()
+    read.assert_called_once()
+    assert process_memory.WORKER_MEMORY.labels(kind="rss")._value.get() == 1
+
+
+# --- Celery wiring ---
+
+@mock.patch("core.shared_weights.share_before_fork")
+def test_fork_sharing_loads_in_prefork_parent(mock_share, monkeypatch):
+    monkeypatch.setattr("services.celery_worker.MODEL_SHARING", "fork")
+    celery_worker.share_model(sender=SimpleNamespace(pool_cls="threads"))
+    mock_share.assert_not_called()
+
+    celery_worker.share_model(sender=SimpleNamespace(pool_cls="prefork"))
+    mock_share.assert_called_once()
@@ -119,3 +119,75 @@ def test_upload_image_put_failure(monkeypatch):
 
     with pytest.raises(S3Error, match="Upload failed"):
         upload_image(b"bytes", "file.jpg")
+
+
+# download_image() / delete_object()
+
+def test_download_image_reads_and_releases(monkeypatch):
+    """download_image returns the object body and releases the connection."""
+    response = mock.MagicMock()
+    response.read.return_value = b"image-bytes"
+    dummy_client = mock.MagicMock()
+    dummy_client.get_object.return_value = response
+    monkeypatch.setattr("services.storage.get_minio_client", lambda: (dummy_client, "host", 1234))
+    monkeypatch.setattr("services.storage.MINIO_BUCKET", "test-bucket")
+
+    assert storage.download_image("abc.jpg") == b"image-bytes"
+    dummy_client.get_object.assert_called_once_with("test-bucket", "abc.jpg")
+    response.close.assert_called_once()
+    response.release_conn.assert_called_once()
+
+def test_delete_object(monkeypatch):
+    dummy_client = mock.MagicMock()
+    monkeypatch.setattr("services.storage.get_minio_client", lambda: (dummy_client, "host", 1234))
+    monkeypatch.setattr("services.storage.MINIO_BUCKET", "test-bucket")
+
+    storage.delete_object("abc.jpg")
+    dummy_client.remove_object.assert_called_once_with("test-bucket", "abc.jpg")
+
+
+# upload_stream()
+
+def test_upload_stream_multipart_with_digest(monkeypatch):
+    """upload_stream passes an unknown length and returns size and SHA-256."""
+    import hashlib
+    import io
+
+    dummy_client = mock.MagicMock()
+    dummy_client.put_object.side_effect = lambda *a, **kw: kw["data"].read(4) + kw["data"].read()
+    monkeypatch.setattr("services.storage.get_minio_client", lambda: (dummy_client, "host", 1234))
+    monkeypatch.setattr("services.storage.MINIO_BUCKET", "test-bucket")
+
+    stored = storage.upload_stream(io.BytesIO(b"streamed-bytes"), "abc.jpg")
+
+    kwargs = dummy_client.put_object.call_args.kwargs
+    assert kwargs["length"] == -1
+    assert kwargs["part_size"] == storage.MINIO_PART_SIZE
+    assert stored.size == len(b"streamed-bytes")
+    assert stored.sha256 == hashlib.sha256(b"streamed-bytes").hexdigest()
+    assert stored.url == "http://host:1234/test-bucket/abc.jpg"
+    assert stored.data is None
+
+@pytest.mark.parametrize("keep_bytes, kept", [(14, b"streamed-bytes"), (13, None)])
+def test_upload_stream_keeps_small_uploads(monkeypatch, keep_bytes, kept):
+    """Bytes read while streaming are returned when the upload fits keep_bytes."""
+    import io
+
+    dummy_client = mock.MagicMock()
+    dummy_client.put_object.side_effect = lambda *a, **kw: kw["data"].read(4) + kw["data"].read()
+    monkeypatch.setattr("services.storage.get_minio_client", lambda: (dummy_client, "host", 1234))
+    monkeypatch.setattr("services.storage.MINIO_BUCKET", "test-bucket")
+
+    stored = storage.upload_stream(io.BytesIO(b"streamed-bytes"), "abc.jpg", keep_bytes=keep_bytes)
+    assert stored.data == kept
+
+def test_upload_stream_enforces_max_size(monkeypatch):
+    import io
+
+    dummy_client = mock.MagicMock()
+    dummy_client.put_object.side_effect = lambda *a, **kw: kw["data"].read()
+    monkeypatch.setattr("services.storage.get_minio_client", lambda: (dummy_client, "host", 1234))
+    monkeypatch.setattr("services.storage.MINIO_BUCKET", "test-bucket")
+
+    with pytest.raises(storage.UploadTooLarge):
+        storage.upload_stream(io.BytesIO(b"x" * 10), "abc.jpg", max_size=5)
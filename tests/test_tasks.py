@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import patch, MagicMock
 from services import task_handler
+from utils.config import MODEL_NAME, TOP_K
 
 # preprocess task
 @patch("services.task_handler.preprocess_image", return_value=b"tensor-bytes")
@@ -36,13 +37,47 @@ def test_classify_failure(mock_classify):
         task_handler.classify_task.run(b"tensor-bytes")
 
 
+# claim-check tasks
+
+@patch("services.task_handler.put_payload", return_value="local:abc.bin")
+@patch("services.task_handler.preprocess_image", return_value=b"tensor-bytes")
+@patch("services.task_handler.download_image", return_value=b"image-bytes")
+def test_preprocess_object_success(mock_download, mock_preprocess, mock_put):
+    """Claim-check preprocess reads the object and returns only the tensor key."""
+    result = task_handler.preprocess_object.run("abc.jpg")
+    assert result == "local:abc.bin"
+    mock_download.assert_called_once_with("abc.jpg")
+    mock_put.assert_called_once_with(b"tensor-bytes")
+
+
+@patch("services.task_handler.delete_payload")
+@patch("services.task_handler.classify", return_value=[("class1", 0.9)])
+@patch("services.task_handler.get_payload", return_value=b"tensor-bytes")
+def test_classify_object_success(mock_get, mock_classify, mock_delete):
+    """Claim-check classify loads the tensor, classifies it and deletes it."""
+    result = task_handler.classify_object.run("local:abc.bin")
+    assert result == [("class1", 0.9)]
+    mock_classify.assert_called_once_with(b"tensor-bytes", MODEL_NAME, TOP_K)
+    mock_delete.assert_called_once_with("local:abc.bin")
+
+
+@patch("services.task_handler.delete_payload")
+@patch("services.task_handler.classify", side_effect=Exception("fail"))
+@patch("services.task_handler.get_payload", return_value=b"tensor-bytes")
+def test_classify_object_failure_keeps_payload(mock_get, mock_classify, mock_delete):
+    """The parked tensor survives a failed attempt so a retry can re-read it."""
+    with pytest.raises(Exception):
+        task_handler.classify_object.run("local:abc.bin")
+    mock_delete.assert_not_called()
+
+
 # store_result
 
-@patch("sqlalchemy.create_engine")
+@patch("services.task_handler.get_engine")
 def test_store_result_success(mock_engine, dummy_result, dummy_metadata):
-    """Test storing result inserts record and returns payload."""
+    """Test storing result inserts record through the pooled engine and returns payload."""
     mock_conn = MagicMock()
-    mock_engine.return_value.connect.return_value.__enter__.return_value = mock_conn
+    mock_engine.return_value.begin.return_value.__enter__.return_value = mock_conn
 
     result = task_handler.store_result.run(dummy_result, dummy_metadata)
 
@@ -52,7 +87,7 @@ def test_store_result_success(mock_engine, dummy_result, dummy_metadata):
     assert mock_conn.execute.called
 
 
-@patch("sqlalchemy.create_engine", side_effect=Exception("db error"))
+@patch("services.task_handler.get_engine", side_effect=Exception("db error"))
 def test_store_result_failure(mock_engine, dummy_result, dummy_metadata):
     """Test store_result raises exception on DB failure."""
     with pytest.raises(Exception):
@@ -80,44 +115,80 @@ def test_send_webhook_failure(mock_post, dummy_result):
         task_handler.send_webhook.run(dummy_result, "https://example.com/callback")
 
 
-# submit_pipeline
-
-from celery import signature
-
-@patch("services.task_handler.celery_app.control.inspect")
-@patch("services.task_handler.send_webhook.s")
-@patch("services.task_handler.store_result.s")
-@patch("services.task_handler.classify_task.s")
-@patch("services.task_handler.preprocess.s")
-def test_submit_pipeline_with_webhook(
-    mock_pre, mock_classify, mock_store, mock_webhook, mock_inspect,
-    dummy_image_bytes, dummy_metadata
-):
-    """Test pipeline chaining with webhook step included."""
-    mock_pre.return_value = signature("step1")
-    mock_classify.return_value = signature("step2")
-    mock_store.return_value = signature("step3")
-    mock_webhook.return_value = signature("step4")
-    mock_inspect.return_value = {"worker": ["task1"]}
-
-    pipeline_result = task_handler.submit_pipeline(dummy_image_bytes, dummy_metadata, "https://callback")
-    assert pipeline_result is not None
-    assert hasattr(pipeline_result, "id")
-
-
-@patch("services.task_handler.celery_app.control.inspect", side_effect=Exception("fail"))
-@patch("services.task_handler.store_result.s")
-@patch("services.task_handler.classify_task.s")
-@patch("services.task_handler.preprocess.s")
-def test_submit_pipeline_without_webhook(
-    mock_pre, mock_classify, mock_store, mock_inspect,
-    dummy_image_bytes, dummy_metadata
-):
-    """Test pipeline chaining without webhook step."""
-    mock_pre.return_value = signature("step1")
-    mock_classify.return_value = signature("step2")
-    mock_store.return_value = signature("step3")
-
-    pipeline_result = task_handler.submit_pipeline(dummy_image_bytes, dummy_metadata)
-    assert pipeline_result is not None
-    assert hasattr(pipeline_result, "id")
+# process_image (fused pipeline)
+
+@patch("services.task_handler._persist_result", side_effect=lambda tid, c, m: {"task_id": tid, "classification": c, "metadata": m})
+@patch("services.task_handler.classify", return_value=[("class1", 0.9)])
+@patch("services.task_handler.preprocess_image", return_value=b"tensor-bytes")
+def test_process_image_fused_success(mock_preprocess, mock_classify, mock_persist, dummy_image_bytes, dummy_metadata):
+    """Fused task runs every stage in-process and returns the stored payload."""
+    result = task_handler.process_image.run(dummy_metadata, image_bytes=dummy_image_bytes)
+
+    mock_preprocess.assert_called_once_with(dummy_image_bytes)
+    mock_classify.assert_called_once_with(b"tensor-bytes", MODEL_NAME, TOP_K)
+    assert result["classification"] == [("class1", 0.9)]
+    assert result["metadata"] == dummy_metadata
+
+
+@patch("services.task_handler._persist_result", return_value={})
+@patch("services.task_handler.classify", return_value=[])
+@patch("services.task_handler.preprocess_image", return_value=b"tensor-bytes")
+@patch("services.task_handler.download_image", return_value=b"image-bytes")
+def test_process_image_fused_from_object(mock_download, mock_preprocess, mock_classify, mock_persist, dummy_metadata):
+    """Given an object key, the fused task reads the upload from MinIO."""
+    task_handler.process_image.run(dummy_metadata, object_name="abc.jpg")
+    mock_download.assert_called_once_with("abc.jpg")
+    mock_preprocess.assert_called_once_with(b"image-bytes")
+
+
+@patch("services.task_handler._persist_result")
+@patch("services.task_handler.preprocess_image", side_effect=Exception("decode error"))
+def test_process_image_fused_failure(mock_preprocess, mock_persist, dummy_image_bytes, dummy_metadata):
+    """A failing stage aborts the fused task before anything is persisted."""
+    with pytest.raises(Exception):
+        task_handler.process_image.run(dummy_metadata, image_bytes=dummy_image_bytes)
+    mock_persist.assert_not_called()
+
+
+def test_process_image_records_stage_latency(dummy_image_bytes, dummy_metadata):
+    """Each fused stage is observed under its standalone task label."""
+    with patch("services.task_handler.preprocess_image", return_value=b"t"), \
+         patch("services.task_handler.classify", return_value=[]), \
+         patch("services.task_handler._persist_result", return_value={}), \
+         patch("services.task_handler.TASK_LATENCY") as latency:
+        task_handler.process_image.run(dummy_metadata, image_bytes=dummy_image_bytes)
+
+    labels = [c.kwargs["task_name"] for c in latency.labels.call_args_list]
+    assert labels == ["preprocess", "classify_task", "store_result", "process_image"]
+
+
+@patch("services.task_handler.requests.post")
+@patch("services.task_handler.get_dispatcher")
+def test_send_webhook_async_dispatcher(mock_dispatcher, mock_post, dummy_result, monkeypatch):
+    """With WEBHOOK_DISPATCHER=async the pooled dispatcher sends the POST."""
+    monkeypatch.setattr("services.task_handler.WEBHOOK_DISPATCHER", "async")
+    mock_dispatcher.return_value.submit.return_value.result.return_value = 200
+
+    result = task_handler.send_webhook.run(dummy_result, "https://example.com/callback")
+
+    assert result == dummy_result
+    mock_dispatcher.return_value.submit.assert_called_once_with("https://example.com/callback", dummy_result)
+    mock_post.assert_not_called()
+
+
+# routing
+
+@pytest.mark.parametrize("task_name, queue", [
+    ("preprocess", "preprocess"),
+    ("preprocess_object", "preprocess"),
+    ("classify_task", "inference"),
+    ("classify_object", "inference"),
+    ("process_image", "inference"),
+    ("store_result", "storage"),
+    ("send_webhook", "webhooks"),
+])
+def test_tasks_route_to_stage_queues(task_name, queue):
+    """Each pipeline stage is published to its own queue."""
+    route = task_handler.celery_app.amqp.router.route({}, f"services.task_handler.{task_name}")
+    assert route["queue"].name == queue
+    assert route["queue"].routing_key == queue
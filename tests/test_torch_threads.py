@@ -0,0 +1,131 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+import torch
+
+from core import torch_threads
+from core.torch_threads import cgroup_cpu_limit, thread_budget, TORCH_THREADS
+from services import celery_worker
+
+
+@pytest.fixture
+def restore_torch_threads():
+    threads = torch.get_num_threads()
+    yield
+    torch.set_num_threads(threads)
+
+
+# --- CPU detection ---
+
+def test_cgroup_v2_quota(tmp_path):
+    (tmp_path / "cpu.max").write_text("250000 100000\n")
+    assert cgroup_cpu_limit(str(tmp_path)) == 2.5
+
+
+def test_cgroup_v2_unlimited(tmp_path):
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert cgroup_cpu_limit(str(tmp_path)) is None
+
+
+def test_cgroup_v1_quota(tmp_path):
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("400000\n")
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    assert cgroup_cpu_limit(str(tmp_path)) == 4
+
+
+def test_cgroup_missing(tmp_path):
+    assert cgroup_cpu_limit(str(tmp_path)) is None
+
+
+def test_available_cpus_respects_quota():
+    with mock.patch("core.torch_threads.os.sched_getaffinity", return_value=set(range(16))), \
+         mock.patch("core.torch_threads.cgroup_cpu_limit", return_value=3.5):
+        assert torch_threads.available_cpus() == 4
+
+
+# --- Budget ---
+
+def test_thread_budget_splits_cpus_between_slots():
+    assert thread_budget(4, cpus=16) == (4, 1)
+    assert thread_budget(3, cpus=16) == (5, 1)
+    assert thread_budget(32, cpus=16) == (1, 1)
+
+
+def test_thread_budget_config_overrides(monkeypatch):
+    monkeypatch.setattr("core.torch_threads.TORCH_NUM_THREADS", 6)
+    monkeypatch.setattr("core.torch_threads.TORCH_INTEROP_THREADS", 2)
+    assert thread_budget(4, cpus=16) == (6, 2)
+
+
+def test_configure_torch_threads_sets_gauges(restore_torch_threads, monkeypatch):
+    monkeypatch.setattr("core.torch_threads.available_cpus", lambda: 4)
+    monkeypatch.setattr("core.torch_threads.set_thread_env", lambda intra: None)
+    intra, _ = torch_threads.configure_torch_threads(2)
+
+    assert intra == torch.get_num_threads() == 2
+    assert TORCH_THREADS.labels(pool="intra_op")._value.get() == 2
+
+
+# --- Celery wiring ---
+
+@mock.patch("core.torch_threads.configure_torch_threads")
+def test_prefork_worker_defers_to_children(mock_configure, monkeypatch):
+    monkeypatch.setattr("core.torch_threads.set_thread_env", lambda intra: None)
+    celery_worker.plan_torch_threads(sender=SimpleNamespace(concurrency=4, pool_cls="prefork"))
+    mock_configure.assert_not_called()
+
+    celery_worker.apply_torch_threads()
+    mock_configure.assert_called_once_with(4)
+
+
+@mock.patch("core.torch_threads.configure_torch_threads")
+def test_thread_pool_configures_parent(mock_configure, monkeypatch):
+    monkeypatch.setattr("services.celery_worker.INFERENCE_BATCH_SIZE", 1)
+    celery_worker.plan_torch_threads(sender=SimpleNamespace(concurrency=8, pool_cls="threads"))
+    mock_configure.assert_called_once_with(8)
+
+    mock_configure.reset_mock()
+    monkeypatch.setattr("services.celery_worker.INFERENCE_BATCH_SIZE", 16)
+    celery_worker.plan_torch_threads(sender=SimpleNamespace(concurrency=8, pool_cls="threads"))
+    mock_configure.assert_called_once_with(1)
+
+
+@pytest.mark.parametrize("pool, concurrency, allowed", [
+    ("prefork", 4, False),
+    ("solo", 1, False),
+    ("threads", 1, False),
+    ("threads", 16, True),
+])
+def test_batching_needs_concurrent_tasks_in_one_process(pool, concurrency, allowed, monkeypatch, caplog):
+    monkeypatch.setattr("services.celery_worker.INFERENCE_BATCH_SIZE", 16)
+    monkeypatch.setattr("services.celery_worker._batching_allowed", True)
+    with caplog.at_level("WARNING"):
+        celery_worker.plan_batching(sender=SimpleNamespace(concurrency=concurrency, pool_cls=pool))
+    assert celery_worker.batching_allowed() is allowed
+    assert ("micro-batching is off" in caplog.text) is not allowed
+
+
+def test_single_task_pool_classifies_directly(monkeypatch):
+    from services import task_handler
+
+    monkeypatch.setattr("services.task_handler.INFERENCE_BATCH_SIZE", 16)
+    monkeypatch.setattr("services.celery_worker._batching_allowed", False)
+    with mock.patch("services.task_handler.get_batcher") as batcher, \
+         mock.patch("services.task_handler.classify", return_value=[]) as direct:
+        task_handler.classify_task.run(b"tensor")
+    batcher.assert_not_called()
+    direct.assert_called_once()
+
+
+@mock.patch("core.classifier.get_inference_model")
+def test_preload_model_in_child(mock_load, monkeypatch):
+    monkeypatch.setattr("services.celery_worker.MODEL_PRELOAD", True)
+    celery_worker.preload_model()
+    mock_load.assert_called_once()
+
+    mock_load.reset_mock()
+    monkeypatch.setattr("services.celery_worker.MODEL_PRELOAD", False)
+    celery_worker.preload_model()
+    mock_load.assert_not_called()
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import threading
+
+import httpx
+import pytest
+
+from services.webhooks import WebhookDispatcher
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Answers every request with `status`, recording bodies and peak concurrency."""
+
+    def __init__(self, status=200, delay=0.0):
+        self.status = status
+        self.delay = delay
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    async def handle_async_request(self, request):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            self.requests.append((str(request.url), json.loads(await request.aread())))
+            return httpx.Response(self.status)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _dispatcher(transport, **kwargs):
+    kwargs.setdefault("host_concurrency", 10)
+    return WebhookDispatcher(timeout=5, max_connections=20, transport=transport, **kwargs)
+
+
+def test_submit_posts_payload():
+    transport = RecordingTransport()
+    dispatcher = _dispatcher(transport)
+    try:
+        assert dispatcher.submit("http://hook.test/cb", {"task_id": "a"}).result(5) == 200
+    finally:
+        dispatcher.stop(timeout=5)
+    assert transport.requests == [("http://hook.test/cb", {"task_id": "a"})]
+
+
+def test_error_status_fails_future():
+    dispatcher = _dispatcher(RecordingTransport(status=503))
+    try:
+        with pytest.raises(httpx.HTTPStatusError):
+            dispatcher.submit("http://hook.test/cb", {"task_id": "a"}).result(5)
+    finally:
+        dispatcher.stop(timeout=5)
+
+
+def test_per_host_concurrency_limit():
+    transport = RecordingTransport(delay=0.05)
+    dispatcher = _dispatcher(transport, host_concurrency=2)
+    try:
+        futures = [dispatcher.submit("http://slow.test/cb", {"i": i}) for i in range(8)]
+        assert [f.result(5) for f in futures] == [200] * 8
+    finally:
+        dispatcher.stop(timeout=5)
+    assert transport.peak == 2
+
+
+def test_coalesces_results_for_same_url():
+    transport = RecordingTransport()
+    dispatcher = _dispatcher(transport, coalesce_ms=100, coalesce_max=3)
+    try:
+        futures = [dispatcher.submit("http://hook.test/a", {"i": i}) for i in range(4)]
+        futures.append(dispatcher.submit("http://hook.test/b", {"i": 9}))
+        assert [f.result(5) for f in futures] == [200] * 5
+    finally:
+        dispatcher.stop(timeout=5)
+
+    bodies = sorted(transport.requests, key=lambda r: (r[0], "results" not in r[1]))
+    assert bodies == [
+        ("http://hook.test/a", {"results": [{"i": 0}, {"i": 1}, {"i": 2}]}),
+        ("http://hook.test/a", {"i": 3}),
+        ("http://hook.test/b", {"i": 9}),
+    ]
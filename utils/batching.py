@@ -0,0 +1,142 @@
+"""
+Generic micro-batching: collects single requests from many callers and hands
+them to one handler call, bounded by batch size and maximum wait.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+
+from prometheus_client import Histogram
+from utils.logger import logger
+
+BATCH_FILL_RATIO = Histogram(
+    "batch_fill_ratio",
+    "Dispatched batch size divided by the configured max batch size",
+    ["batcher"],
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+)
+BATCH_QUEUE_DELAY = Histogram(
+    "batch_queue_delay_seconds",
+    "Time a request waits in the batcher before its batch is dispatched",
+    ["batcher"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Background thread that groups submitted items into batches.
+
+    A batch is dispatched as soon as it holds `max_batch_size` items or the
+    oldest item has waited `max_wait_ms`. `handler` receives the list of items
+    and must return one result per item, in order; returning an Exception
+    instance in place of a result fails only that item.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], List[Any]],
+        max_batch_size: int,
+        max_wait_ms: float,
+        name: str = "default",
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(max_wait_ms, 0) / 1000.0
+        self.name = name
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def submit(self, item: Any) -> Future:
+        """
+        Enqueue one item; the returned Future resolves to its result.
+        """
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((item, future, time.monotonic()))
+        return future
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Dispatch whatever is queued and stop the background thread.
+        """
+        with self._lock:
+            thread = self._thread
+            if thread is None or self._pid != os.getpid():
+                return
+            self._queue.put(_STOP)
+            self._thread = None
+        thread.join(timeout)
+
+    def _ensure_started(self):
+        with self._lock:
+            # Threads do not survive fork (Celery prefork), so restart per process
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name=f"microbatcher-{self.name}", daemon=True
+            )
+            self._thread.start()
+            logger.info(
+                f"Started batcher '{self.name}' "
+                f"(max_batch_size={self.max_batch_size}, max_wait={self.max_wait * 1000:.1f}ms)"
+            )
+
+    def _run(self):
+        q = self._queue
+        stopping = False
+        while not stopping:
+            first = q.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = first[2] + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    nxt = q.get(timeout=remaining) if remaining > 0 else q.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stopping = True
+                    break
+                batch.append(nxt)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        now = time.monotonic()
+        for _, _, enqueued in batch:
+            BATCH_QUEUE_DELAY.labels(batcher=self.name).observe(now - enqueued)
+        BATCH_FILL_RATIO.labels(batcher=self.name).observe(len(batch) / self.max_batch_size)
+
+        items = [item for item, _, _ in batch]
+        try:
+            results = self.handler(items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"Batch handler returned {len(results)} results for {len(items)} items"
+                )
+        except Exception as e:
+            logger.error(f"Batcher '{self.name}' failed on batch of {len(items)}: {e}")
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
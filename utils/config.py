@@ -37,19 +37,151 @@ DATABASE_URL = URL.create(
     database=PG_DB,
 )
 
+# Connection pool for the process-wide results engine
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+logger.info(
+    f"DB_POOL_SIZE={DB_POOL_SIZE}, DB_MAX_OVERFLOW={DB_MAX_OVERFLOW}, "
+    f"DB_POOL_TIMEOUT={DB_POOL_TIMEOUT}, DB_POOL_RECYCLE={DB_POOL_RECYCLE}"
+)
+
+# Write-behind results sink (1 writes each row in its own transaction)
+RESULT_BATCH_SIZE = int(os.getenv("RESULT_BATCH_SIZE", 1))
+RESULT_BATCH_WAIT_MS = float(os.getenv("RESULT_BATCH_WAIT_MS", 50))
+logger.info(f"RESULT_BATCH_SIZE={RESULT_BATCH_SIZE}, RESULT_BATCH_WAIT_MS={RESULT_BATCH_WAIT_MS}")
+
 # Celery
 CELERY_BROKER_URL = log_env_var("CELERY_BROKER_URL", required=False)
 CELERY_RESULT_BACKEND = log_env_var("CELERY_RESULT_BACKEND", required=False)
 
+# Background queue-depth sampler (0 disables); queues default to the default and stage queues
+QUEUE_SAMPLE_INTERVAL = float(os.getenv("QUEUE_SAMPLE_INTERVAL", 15))
+QUEUE_SAMPLE_QUEUES = [q.strip() for q in os.getenv(
+    "QUEUE_SAMPLE_QUEUES", "image_tasks,preprocess,inference,storage,webhooks"
+).split(",") if q.strip()]
+QUEUE_SAMPLE_INSPECT = os.getenv("QUEUE_SAMPLE_INSPECT", "true").lower() in ("1", "true", "yes")
+logger.info(
+    f"QUEUE_SAMPLE_INTERVAL={QUEUE_SAMPLE_INTERVAL}, QUEUE_SAMPLE_QUEUES={QUEUE_SAMPLE_QUEUES}, "
+    f"QUEUE_SAMPLE_INSPECT={QUEUE_SAMPLE_INSPECT}"
+)
+
 # Model
 MODEL_NAME = os.getenv("MODEL_NAME", "resnet18")
 logger.info(f"MODEL_NAME={MODEL_NAME}")
 
+# Models a request may select (MODEL_NAME is the default and always allowed)
+MODELS = [m.strip() for m in os.getenv("MODELS", MODEL_NAME).split(",") if m.strip()]
+if MODEL_NAME not in MODELS:
+    MODELS.insert(0, MODEL_NAME)
+# Models each worker process loads at start; others load on first use
+WARM_MODELS = [m.strip() for m in os.getenv("WARM_MODELS", MODEL_NAME).split(",") if m.strip()]
+# Loaded models kept per worker process, least recently used evicted first
+MAX_LOADED_MODELS = int(os.getenv("MAX_LOADED_MODELS", 2))
+MODEL_MEMORY_BUDGET_MB = int(os.getenv("MODEL_MEMORY_BUDGET_MB", 0))  # 0 = no budget
+# "shared": every model on the inference queue; "per_model": non-default models on inference.<model>
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "shared").lower()
+logger.info(
+    f"MODELS={MODELS}, WARM_MODELS={WARM_MODELS}, MAX_LOADED_MODELS={MAX_LOADED_MODELS}, "
+    f"MODEL_MEMORY_BUDGET_MB={MODEL_MEMORY_BUDGET_MB}, MODEL_ROUTING={MODEL_ROUTING}"
+)
+
+# Labels returned per image (requests may ask for 1..MAX_TOP_K)
+TOP_K = int(os.getenv("TOP_K", 5))
+MAX_TOP_K = int(os.getenv("MAX_TOP_K", 100))
+logger.info(f"TOP_K={TOP_K}, MAX_TOP_K={MAX_TOP_K}")
+
+# Decode JPEGs at reduced DCT scale when the image is much larger than the model input
+FAST_DECODE = os.getenv("FAST_DECODE", "true").lower() in ("1", "true", "yes")
+logger.info(f"FAST_DECODE={FAST_DECODE}")
+
+# Inference micro-batching (1 disables batching)
+INFERENCE_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", 1))
+INFERENCE_BATCH_WAIT_MS = float(os.getenv("INFERENCE_BATCH_WAIT_MS", 10))
+logger.info(f"INFERENCE_BATCH_SIZE={INFERENCE_BATCH_SIZE}, INFERENCE_BATCH_WAIT_MS={INFERENCE_BATCH_WAIT_MS}")
+
+# CPU inference mode: fp32, channels_last, bf16 or int8 (needs a calibrated artifact)
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "fp32").lower()
+MODEL_ARTIFACT_DIR = os.getenv("MODEL_ARTIFACT_DIR", "artifacts")
+QUANTIZED_MODEL_PATH = os.getenv(
+    "QUANTIZED_MODEL_PATH", os.path.join(MODEL_ARTIFACT_DIR, f"{MODEL_NAME}_int8.pt")
+)
+logger.info(f"INFERENCE_MODE={INFERENCE_MODE}, QUANTIZED_MODEL_PATH={QUANTIZED_MODEL_PATH}")
+
+# Load the model in each prefork child at start instead of on its first task
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "true").lower() in ("1", "true", "yes")
+logger.info(f"MODEL_PRELOAD={MODEL_PRELOAD}")
+
+# Compiled model cache: "off" or "torchscript" (traced + frozen, under MODEL_ARTIFACT_DIR)
+MODEL_CACHE = os.getenv("MODEL_CACHE", "off").lower()
+MODEL_CACHE_BUILD = os.getenv("MODEL_CACHE_BUILD", "true").lower() in ("1", "true", "yes")
+logger.info(f"MODEL_CACHE={MODEL_CACHE}, MODEL_CACHE_BUILD={MODEL_CACHE_BUILD}")
+
+# Model weights across prefork children: "off" (one copy each), "fork" (loaded in
+# the parent, shared copy-on-write) or "mmap" (memory-mapped from MODEL_ARTIFACT_DIR)
+MODEL_SHARING = os.getenv("MODEL_SHARING", "off").lower()
+# Seconds between per-process memory samples (worker_memory_bytes); 0 disables
+MEMORY_SAMPLE_INTERVAL = float(os.getenv("MEMORY_SAMPLE_INTERVAL", 30))
+logger.info(f"MODEL_SHARING={MODEL_SHARING}, MEMORY_SAMPLE_INTERVAL={MEMORY_SAMPLE_INTERVAL}")
+
+# Torch threads per worker process (0 derives them from CPUs and pool concurrency)
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", 0))
+TORCH_INTEROP_THREADS = int(os.getenv("TORCH_INTEROP_THREADS", 0))
+logger.info(f"TORCH_NUM_THREADS={TORCH_NUM_THREADS}, TORCH_INTEROP_THREADS={TORCH_INTEROP_THREADS}")
+
+# Result cache for repeat uploads (content hash + model name)
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", 4096))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", 86400))
+RESULT_CACHE_REDIS_URL = log_env_var("RESULT_CACHE_REDIS_URL", required=False)
+logger.info(
+    f"RESULT_CACHE_ENABLED={RESULT_CACHE_ENABLED}, RESULT_CACHE_SIZE={RESULT_CACHE_SIZE}, "
+    f"RESULT_CACHE_TTL={RESULT_CACHE_TTL}"
+)
+
 # MinIO/S3
 MINIO_ENDPOINT = log_env_var("MINIO_ENDPOINT", required=False)
 MINIO_ACCESS_KEY = log_env_var("MINIO_ACCESS_KEY", required=False)
 MINIO_SECRET_KEY = log_env_var("MINIO_SECRET_KEY", required=False)
 MINIO_BUCKET = log_env_var("MINIO_BUCKET", required=False)
+# Streaming uploads: multipart part size (MinIO minimum is 5 MiB) and max accepted upload size
+MINIO_PART_SIZE = int(os.getenv("MINIO_PART_SIZE", 10 * 1024 * 1024))
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", 25 * 1024 * 1024))
+logger.info(f"MINIO_PART_SIZE={MINIO_PART_SIZE}, MAX_UPLOAD_SIZE={MAX_UPLOAD_SIZE}")
+
+# Pipeline transport: "inline" ships bytes through the broker, "claim_check" ships object keys
+PIPELINE_TRANSPORT = os.getenv("PIPELINE_TRANSPORT", "inline").lower()
+# Inline transport: larger uploads are shipped by object key instead of bytes
+INLINE_MAX_SIZE = int(os.getenv("INLINE_MAX_SIZE", 2 * 1024 * 1024))
+logger.info(f"PIPELINE_TRANSPORT={PIPELINE_TRANSPORT}, INLINE_MAX_SIZE={INLINE_MAX_SIZE}")
+
+# Pipeline mode: "chain" runs preprocess/classify/store as separate tasks, "fused" runs them in one
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "chain").lower()
+logger.info(f"PIPELINE_MODE={PIPELINE_MODE}")
+
+# Claim-check store for intermediate tensors: "minio" (shared) or "local" (same-host workers only)
+CLAIM_CHECK_STORE = os.getenv("CLAIM_CHECK_STORE", "minio").lower()
+CLAIM_CHECK_DIR = os.getenv("CLAIM_CHECK_DIR", "/tmp/visionqueue-claims")
+logger.info(f"CLAIM_CHECK_STORE={CLAIM_CHECK_STORE}, CLAIM_CHECK_DIR={CLAIM_CHECK_DIR}")
+
+# API: max blocking MinIO/broker calls running off the event loop at once
+API_IO_CONCURRENCY = int(os.getenv("API_IO_CONCURRENCY", 32))
+logger.info(f"API_IO_CONCURRENCY={API_IO_CONCURRENCY}")
+
+# Batch submission: images per Celery group and max images per request
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", 100))
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", 1000))
+logger.info(f"BATCH_CHUNK_SIZE={BATCH_CHUNK_SIZE}, MAX_BATCH_ITEMS={MAX_BATCH_ITEMS}")
+
+# Server-sent status streams: max lifetime and keep-alive interval (seconds)
+STATUS_STREAM_TIMEOUT = float(os.getenv("STATUS_STREAM_TIMEOUT", 300))
+STATUS_STREAM_HEARTBEAT = float(os.getenv("STATUS_STREAM_HEARTBEAT", 15))
+logger.info(f"STATUS_STREAM_TIMEOUT={STATUS_STREAM_TIMEOUT}, STATUS_STREAM_HEARTBEAT={STATUS_STREAM_HEARTBEAT}")
+
+# Upper bound for the task-status long-poll ?wait= parameter (seconds)
+TASK_STATUS_MAX_WAIT = float(os.getenv("TASK_STATUS_MAX_WAIT", 60))
+logger.info(f"TASK_STATUS_MAX_WAIT={TASK_STATUS_MAX_WAIT}")
 
 # Prometheus
 PROM_PORT = int(os.getenv("PROM_PORT", 8000))
@@ -58,3 +190,16 @@ logger.info(f"PROM_PORT={PROM_PORT}")
 # Webhook
 WEBHOOK_TIMEOUT = int(os.getenv("WEBHOOK_TIMEOUT", 5))
 logger.info(f"WEBHOOK_TIMEOUT={WEBHOOK_TIMEOUT}")
+
+# Webhook delivery: "requests" (one connection per call) or "async" (pooled dispatcher)
+WEBHOOK_DISPATCHER = os.getenv("WEBHOOK_DISPATCHER", "requests").lower()
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", 100))
+WEBHOOK_HOST_CONCURRENCY = int(os.getenv("WEBHOOK_HOST_CONCURRENCY", 10))
+# Coalesce results for the same callback URL into one POST (0 disables)
+WEBHOOK_COALESCE_MS = float(os.getenv("WEBHOOK_COALESCE_MS", 0))
+WEBHOOK_COALESCE_MAX = int(os.getenv("WEBHOOK_COALESCE_MAX", 50))
+logger.info(
+    f"WEBHOOK_DISPATCHER={WEBHOOK_DISPATCHER}, WEBHOOK_MAX_CONNECTIONS={WEBHOOK_MAX_CONNECTIONS}, "
+    f"WEBHOOK_HOST_CONCURRENCY={WEBHOOK_HOST_CONCURRENCY}, WEBHOOK_COALESCE_MS={WEBHOOK_COALESCE_MS}, "
+    f"WEBHOOK_COALESCE_MAX={WEBHOOK_COALESCE_MAX}"
+)
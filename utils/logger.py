@@ -1,13 +1,15 @@
 from loguru import logger
+import os
 import sys
 
-# Configure loguru: stdout + file with rotation
+# Configure loguru: stdout + file with rotation. Messages below both levels
+# are dropped before their arguments are formatted.
 logger.remove()
-logger.add(sys.stdout, level="INFO", enqueue=True)
+logger.add(sys.stdout, level=os.getenv("LOG_LEVEL", "INFO").upper(), enqueue=True)
 logger.add(
     "logs/app_{time:YYYY-MM-DD}.log",
     rotation="10 MB",
     retention="7 days",
-    level="DEBUG",
+    level=os.getenv("LOG_FILE_LEVEL", "DEBUG").upper(),
     enqueue=True,
 )
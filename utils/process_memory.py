@@ -0,0 +1,47 @@
+"""
+Per-process memory from /proc/<pid>/smaps_rollup. RSS counts pages shared
+with other processes in full, PSS divides them between the processes that map
+them, and USS counts only the pages private to the process. The USS and PSS
+of a prefork child show how much memory each additional child really costs.
+"""
+
+import time
+from typing import Dict
+
+from prometheus_client import Gauge
+
+from utils.config import MEMORY_SAMPLE_INTERVAL
+
+WORKER_MEMORY = Gauge("worker_memory_bytes", "Worker process memory", ["kind"])
+
+_FIELDS = {"Rss:": "rss", "Pss:": "pss", "Private_Clean:": "uss", "Private_Dirty:": "uss"}
+_last_sample = 0.0
+
+
+def process_memory(pid="self") -> Dict[str, int]:
+    """
+    Returns {"rss", "pss", "uss"} in bytes, or {} where smaps_rollup is unavailable.
+    """
+    usage = {"rss": 0, "pss": 0, "uss": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if parts and parts[0] in _FIELDS:
+                    usage[_FIELDS[parts[0]]] += int(parts[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        return {}
+    return usage
+
+
+def record_memory(force: bool = False):
+    """
+    Updates WORKER_MEMORY for this process at most every MEMORY_SAMPLE_INTERVAL seconds.
+    """
+    global _last_sample
+    now = time.monotonic()
+    if not force and (MEMORY_SAMPLE_INTERVAL <= 0 or now - _last_sample < MEMORY_SAMPLE_INTERVAL):
+        return
+    _last_sample = now
+    for kind, value in process_memory().items():
+        WORKER_MEMORY.labels(kind=kind).set(value)